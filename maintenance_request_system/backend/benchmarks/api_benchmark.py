@@ -0,0 +1,176 @@
+"""
+Benchmark da API: latência (p50/p95/p99) e consultas por endpoint numa carga mista.
+
+Popula um banco SQLite descartável com ``seed_data`` e repete, no mesmo
+processo (``APIClient``, pilha completa de middleware, autenticação e
+serialização), uma carga com o peso de cada perfil: técnicos consultando a
+fila e o contador de não lidas, solicitantes abrindo e acompanhando
+requisições, gestores no painel de análise e TI no dashboard. Salve o
+resultado com ``--json`` e compare execuções com ``--compare``.
+
+Uso (na pasta backend):
+    python benchmarks/api_benchmark.py --requests 20000 --iterations 2000 --json antes.json
+    python benchmarks/api_benchmark.py --requests 20000 --iterations 2000 --compare antes.json
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'maintenance_request_project.settings')
+os.environ.setdefault('SECRET_KEY', 'benchmark-only')
+
+NEW_REQUEST = {
+    'prazo_limite': '2030-01-01', 'setor_solicitante': 'Produção',
+    'tipo_manutencao': 'MECANICA', 'status_operacional': 'PARCIAL',
+    'equipamentos_impactados': ['PRENSA'], 'titulo_curto': 'Vazamento de óleo',
+    'descricao_problema': 'Vazamento de óleo na prensa',
+}
+# (nome, perfil, método, caminho, peso)
+WORKLOAD = [
+    ('fila_tecnico', 'MANUTENCAO', 'get', '/api/requests/', 20),
+    ('fila_urgencia', 'MANUTENCAO', 'get', '/api/requests/queue/', 10),
+    ('nao_lidas', 'MANUTENCAO', 'get', '/api/notifications/unread_count/', 30),
+    ('notificacoes', 'MANUTENCAO', 'get', '/api/notifications/', 10),
+    ('minhas_requisicoes', 'COMUM', 'get', '/api/requests/my_requests/', 15),
+    ('nova_requisicao', 'COMUM', 'post', '/api/requests/', 5),
+    ('analise', 'GESTOR', 'get', '/api/requests/analytics/', 5),
+    ('dashboard', 'TI', 'get', '/api/requests/dashboard_data/', 5),
+]
+
+
+def setup_django(db_path):
+    import django
+    from django.conf import settings
+
+    settings.DATABASES['default']['NAME'] = db_path
+    settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+    django.setup()
+
+
+def prepare_database(db_path, users, requests, seed):
+    from django.core.management import call_command
+
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    call_command('migrate', verbosity=0)
+    started = time.perf_counter()
+    call_command('seed_data', users=users, requests=requests, seed=seed)
+    return time.perf_counter() - started
+
+
+def clients_by_profile(rng, per_profile):
+    from django.contrib.auth.models import User
+    from rest_framework.authtoken.models import Token
+    from rest_framework.test import APIClient
+
+    clients = {}
+    for profile in {profile for _, profile, *_ in WORKLOAD}:
+        users = list(User.objects.filter(userprofile__profile_type=profile).order_by('pk'))
+        clients[profile] = []
+        for user in rng.sample(users, min(per_profile, len(users))):
+            client = APIClient()
+            token, _ = Token.objects.get_or_create(user=user)
+            client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+            clients[profile].append(client)
+    return clients
+
+
+def percentile(values, point):
+    if len(values) < 2:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[point - 1]
+
+
+def run(iterations, rng, clients):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    samples = {name: ([], []) for name, *_ in WORKLOAD}
+    weights = [weight for *_, weight in WORKLOAD]
+    for name, profile, method, path, _ in rng.choices(WORKLOAD, weights, k=iterations):
+        client = rng.choice(clients[profile])
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            if method == 'post':
+                response = client.post(path, NEW_REQUEST, format='json')
+            else:
+                response = client.get(path)
+            elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            raise RuntimeError(f'{name}: HTTP {response.status_code} {response.content[:200]!r}')
+        samples[name][0].append(elapsed * 1000)
+        samples[name][1].append(len(queries))
+
+    results = {}
+    for name, (latencies, query_counts) in samples.items():
+        if latencies:
+            results[name] = {
+                'calls': len(latencies),
+                'p50_ms': round(percentile(latencies, 50), 2),
+                'p95_ms': round(percentile(latencies, 95), 2),
+                'p99_ms': round(percentile(latencies, 99), 2),
+                'queries': round(statistics.mean(query_counts), 1),
+                'max_queries': max(query_counts),
+            }
+    return results
+
+
+def print_results(results, previous=None):
+    print(f'{"endpoint":<20} {"chamadas":>9} {"p50 (ms)":>9} {"p95 (ms)":>9} {"p99 (ms)":>9} {"consultas":>10}')
+    for name, row in results.items():
+        print(f'{name:<20} {row["calls"]:>9} {row["p50_ms"]:>9} {row["p95_ms"]:>9} '
+              f'{row["p99_ms"]:>9} {row["queries"]:>10.1f}')
+        before = (previous or {}).get(name)
+        if before:
+            deltas = ' '.join(
+                f'{row[key] - before[key]:>+9.2f}' for key in ('p50_ms', 'p95_ms', 'p99_ms')
+            )
+            print(f'{"  vs. anterior":<20} {"":>9} {deltas} {row["queries"] - before["queries"]:>+10.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--db', default='/tmp/maintenance_api_benchmark.sqlite3')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--clients-per-profile', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='Arquivo para salvar os resultados')
+    parser.add_argument('--compare', help='Resultados de uma execução anterior (--json)')
+    args = parser.parse_args()
+
+    setup_django(args.db)
+    seconds = prepare_database(args.db, args.users, args.requests, args.seed)
+    print(f'Massa de dados: {args.requests} requisições em {seconds:.1f}s')
+
+    rng = random.Random(args.seed)
+    clients = clients_by_profile(rng, args.clients_per_profile)
+    # Aquecimento: caches de token, dashboard e não lidas
+    run(len(WORKLOAD) * 5, rng, clients)
+    results = run(args.iterations, rng, clients)
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as source:
+            previous = json.load(source)['endpoints']
+    print_results(results, previous)
+
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump({
+                'parametros': {key: value for key, value in vars(args).items() if key not in ('json', 'compare')},
+                'endpoints': results,
+            }, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,259 @@
+"""
+Benchmark dos índices de ``0005_access_pattern_indexes`` em uma base SQLite grande.
+
+Cria uma base separada, aplica as migrações até ``0004``, popula ~1M
+requisições (com histórico e notificações) e mede as consultas dos principais
+endpoints antes e depois de aplicar ``0005``, exibindo o EXPLAIN QUERY PLAN
+e o tempo mediano de cada consulta.
+
+Uso (na pasta backend):
+    python benchmarks/index_benchmark.py --requests 1000000 --db /tmp/bench.sqlite3
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'maintenance_request_project.settings')
+os.environ.setdefault('SECRET_KEY', 'benchmark-only')
+
+BEFORE_MIGRATION = '0004_maintenance_rollup'
+AFTER_MIGRATION = '0005_access_pattern_indexes'
+OPEN_STATUSES = ['ABERTA', 'VISUALIZADA', 'ACEITA', 'EM_ATENDIMENTO', 'PARADA']
+STATUS_WEIGHTS = {
+    'CONCLUIDA': 70, 'CANCELADA': 8, 'ABERTA': 8, 'VISUALIZADA': 3,
+    'ACEITA': 4, 'EM_ATENDIMENTO': 5, 'PARADA': 2,
+}
+BATCH_SIZE = 50000
+
+# Consultas equivalentes às geradas pelo ORM em cada endpoint
+QUERIES = {
+    'fila_manutencao': (
+        'SELECT * FROM maintenance_maintenancerequest '
+        'WHERE (status IN ({}) OR responsavel_manutencao_id = %s) '
+        'ORDER BY data_criacao DESC, numero_requisicao ASC LIMIT 51'.format(', '.join(['%s'] * len(OPEN_STATUSES)))
+    ),
+    'my_requests': (
+        'SELECT * FROM maintenance_maintenancerequest WHERE solicitante_id = %s '
+        'ORDER BY data_criacao DESC, numero_requisicao ASC LIMIT 51'
+    ),
+    'lista_gestor': (
+        'SELECT * FROM maintenance_maintenancerequest '
+        'ORDER BY data_criacao DESC, numero_requisicao ASC LIMIT 51'
+    ),
+    'lista_gestor_cursor': (
+        'SELECT * FROM maintenance_maintenancerequest WHERE data_criacao < %s '
+        'ORDER BY data_criacao DESC, numero_requisicao ASC LIMIT 51'
+    ),
+    'notificacoes': (
+        'SELECT * FROM maintenance_notification '
+        'WHERE (usuario_id = %s OR (usuario_id IS NULL AND perfil_destino = %s AND data_criacao >= %s)) '
+        'ORDER BY data_criacao DESC, id ASC LIMIT 51'
+    ),
+    'notificacoes_nao_lidas': (
+        'SELECT * FROM maintenance_notification WHERE usuario_id = %s AND lida = 0 '
+        'ORDER BY data_criacao DESC LIMIT 51'
+    ),
+    'historico': (
+        'SELECT * FROM maintenance_requesthistory WHERE request_id = %s ORDER BY data_acao DESC'
+    ),
+}
+
+
+def setup_django(db_path):
+    import django
+    from django.conf import settings
+
+    settings.DATABASES['default']['NAME'] = db_path
+    django.setup()
+
+
+def migrate(target):
+    from django.core.management import call_command
+
+    for app_label in ('contenttypes', 'auth', 'authtoken'):
+        call_command('migrate', app_label, verbosity=0)
+    call_command('migrate', 'maintenance', target, verbosity=0)
+
+
+def timestamp(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S.%f')
+
+
+def seed(cursor, total_requests, total_users, rng):
+    start = datetime(2020, 1, 1)
+    span = (datetime(2026, 1, 1) - start).total_seconds()
+
+    cursor.execute('PRAGMA journal_mode = OFF')
+    cursor.execute('PRAGMA synchronous = OFF')
+
+    profiles = ['COMUM'] * 80 + ['MANUTENCAO'] * 15 + ['GESTOR'] * 4 + ['TI']
+    users = []
+    for user_id in range(1, total_users + 1):
+        profile = profiles[user_id % len(profiles)]
+        # Com poucos usuários a distribuição não chega a MANUTENCAO; o último vira técnico
+        if user_id == total_users and all(other != 'MANUTENCAO' for _, other in users):
+            profile = 'MANUTENCAO'
+        users.append((user_id, profile))
+        cursor.execute(
+            'INSERT INTO auth_user (id, password, is_superuser, username, first_name, last_name, email, '
+            'is_staff, is_active, date_joined) VALUES (%s, %s, 0, %s, %s, %s, %s, 0, 1, %s)',
+            [user_id, '!', f'user{user_id}', '', '', '', timestamp(start)],
+        )
+        cursor.execute(
+            'INSERT INTO maintenance_userprofile (profile_type, setor, user_id) VALUES (%s, %s, %s)',
+            [profile, 'Produção', user_id],
+        )
+    requesters = [user_id for user_id, profile in users if profile == 'COMUM']
+    technicians = [user_id for user_id, profile in users if profile == 'MANUTENCAO']
+    statuses = list(STATUS_WEIGHTS)
+    weights = list(STATUS_WEIGHTS.values())
+
+    def request_rows():
+        for number in range(1, total_requests + 1):
+            created = start + timedelta(seconds=span * number / total_requests)
+            status = rng.choices(statuses, weights)[0]
+            technician = rng.choice(technicians) if status not in ('ABERTA', 'VISUALIZADA', 'CANCELADA') else None
+            yield (
+                number, timestamp(created), timestamp(created), created.date().isoformat(), 'Produção',
+                rng.choice(['ELETRICA', 'MECANICA', 'OUTROS']), 'PARCIAL', '["PRENSA"]', '',
+                f'Requisição {number}', 'Descrição do problema', rng.randint(1, 5), status, '', '', '', '',
+                technician, rng.choice(requesters),
+            )
+
+    def history_rows():
+        for number in range(1, total_requests + 1):
+            created = start + timedelta(seconds=span * number / total_requests)
+            yield ('CRIADA', 'Requisição criada', timestamp(created), number, rng.choice(requesters))
+
+    def notification_rows():
+        for number in range(1, total_requests + 1):
+            created = timestamp(start + timedelta(seconds=span * number / total_requests))
+            if number % 2:
+                yield ('Nova Requisição', f'Nova requisição #{number}', 0, created, number, None, 'MANUTENCAO')
+            else:
+                yield ('Requisição Aceita', f'Requisição #{number} aceita', rng.random() < 0.9, created,
+                       number, rng.choice(requesters), '')
+
+    inserts = [
+        ('INSERT INTO maintenance_maintenancerequest (numero_requisicao, data_criacao, data_atualizacao, '
+         'prazo_limite, setor_solicitante, tipo_manutencao, status_operacional, equipamentos_impactados, '
+         'outros_equipamentos, titulo_curto, descricao_problema, prioridade, status, motivo_cancelamento, '
+         'motivo_parada, descricao_manutencao, materiais_utilizados, responsavel_manutencao_id, solicitante_id) '
+         'VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)', request_rows()),
+        ('INSERT INTO maintenance_requesthistory (acao, descricao, data_acao, request_id, usuario_id) '
+         'VALUES (%s, %s, %s, %s, %s)', history_rows()),
+        ('INSERT INTO maintenance_notification (titulo, mensagem, lida, data_criacao, request_id, usuario_id, '
+         'perfil_destino) VALUES (%s, %s, %s, %s, %s, %s, %s)', notification_rows()),
+    ]
+    for sql, rows in inserts:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == BATCH_SIZE:
+                cursor.executemany(sql, batch)
+                batch = []
+        if batch:
+            cursor.executemany(sql, batch)
+
+    cursor.execute('PRAGMA journal_mode = DELETE')
+    cursor.execute('PRAGMA synchronous = FULL')
+    return {
+        'requester': requesters[0],
+        'technician': technicians[0],
+        'cursor': timestamp(start + timedelta(seconds=span / 2)),
+        'request': total_requests // 2,
+        'joined': timestamp(start),
+    }
+
+
+def query_params(sample):
+    return {
+        'fila_manutencao': OPEN_STATUSES + [sample['technician']],
+        'my_requests': [sample['requester']],
+        'lista_gestor': [],
+        'lista_gestor_cursor': [sample['cursor']],
+        'notificacoes': [sample['technician'], 'MANUTENCAO', sample['joined']],
+        'notificacoes_nao_lidas': [sample['requester']],
+        'historico': [sample['request']],
+    }
+
+
+def measure(cursor, sample, repeat):
+    results = {}
+    for name, params in query_params(sample).items():
+        sql = QUERIES[name]
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        plan = [row[-1] for row in cursor.fetchall()]
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            cursor.execute(sql, params)
+            cursor.fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+        results[name] = {'plan': plan, 'median_ms': statistics.median(timings)}
+    return results
+
+
+def report(before, after):
+    for name in QUERIES:
+        print(f'\n== {name}')
+        for label, results in (('antes', before), ('depois', after)):
+            print(f'  {label}: {results[name]["median_ms"]:.3f} ms')
+            for line in results[name]['plan']:
+                print(f'    {line}')
+        speedup = before[name]['median_ms'] / max(after[name]['median_ms'], 1e-6)
+        print(f'  ganho: {speedup:.1f}x')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--db', default='/tmp/maintenance_index_benchmark.sqlite3')
+    parser.add_argument('--requests', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='Arquivo para salvar os resultados')
+    args = parser.parse_args()
+    if args.users < 2:
+        parser.error('--users precisa ser pelo menos 2 (um solicitante e um técnico)')
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    setup_django(args.db)
+    from django.db import connection
+
+    migrate(BEFORE_MIGRATION)
+    started = time.perf_counter()
+    with connection.cursor() as cursor:
+        sample = seed(cursor, args.requests, args.users, random.Random(args.seed))
+        cursor.execute('ANALYZE')
+    print(f'{args.requests} requisições populadas em {time.perf_counter() - started:.1f} s')
+
+    with connection.cursor() as cursor:
+        before = measure(cursor, sample, args.repeat)
+
+    started = time.perf_counter()
+    migrate(AFTER_MIGRATION)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    print(f'{AFTER_MIGRATION} aplicada em {time.perf_counter() - started:.1f} s')
+
+    with connection.cursor() as cursor:
+        after = measure(cursor, sample, args.repeat)
+
+    report(before, after)
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump({'requests': args.requests, 'before': before, 'after': after}, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""
+Benchmark de escritas concorrentes: mudanças de status por segundo conforme o
+número de técnicos simultâneos.
+
+Cada thread (uma conexão própria) leva suas requisições por
+ABERTA -> ACEITA -> EM_ATENDIMENTO -> CONCLUIDA com ``transitions.apply``,
+o mesmo caminho dos endpoints. No SQLite, compara a configuração padrão do
+SQLite (journal DELETE, sem PRAGMAs) com ``SQLITE_PRAGMAS`` (WAL,
+busy_timeout, synchronous=NORMAL); com DB_ENGINE=postgresql, usa o banco
+configurado, que deve ser um banco descartável.
+
+Uso (na pasta backend):
+    python benchmarks/write_concurrency_benchmark.py --threads 1 2 4 8 16 --requests-per-thread 50
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from datetime import date
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'maintenance_request_project.settings')
+os.environ.setdefault('SECRET_KEY', 'benchmark-only')
+
+WORKFLOW = ['ACEITA', 'EM_ATENDIMENTO', 'CONCLUIDA']
+
+
+def setup_django(db_path):
+    import django
+    from django.conf import settings
+
+    if settings.DATABASES['default']['ENGINE'].endswith('sqlite3'):
+        settings.DATABASES['default']['NAME'] = db_path
+    django.setup()
+
+
+def reset_database(pragmas, db_path):
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.db import connection
+
+    connection.close()
+    if connection.vendor == 'sqlite':
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+        settings.SQLITE_PRAGMAS = pragmas
+    call_command('migrate', verbosity=0)
+    if connection.vendor != 'sqlite':
+        call_command('flush', interactive=False, verbosity=0)
+
+
+def seed(threads, per_thread):
+    from django.contrib.auth.models import User
+    from maintenance.models import Equipment, MaintenanceRequest, UserProfile
+
+    requester = User.objects.create(username='solicitante')
+    UserProfile.objects.create(user=requester, profile_type='COMUM', setor='Produção')
+    technicians = []
+    for index in range(threads):
+        technician = User.objects.create(username=f'tecnico{index}')
+        UserProfile.objects.create(user=technician, profile_type='MANUTENCAO', setor='Manutenção')
+        technicians.append(technician)
+    equipment = Equipment.objects.generic('PRENSA')
+
+    slices = []
+    for technician in technicians:
+        requests = []
+        for _ in range(per_thread):
+            request = MaintenanceRequest(
+                solicitante=requester, prazo_limite=date(2030, 1, 1), setor_solicitante='Produção',
+                tipo_manutencao='MECANICA', status_operacional='PARCIAL',
+                titulo_curto='Benchmark', descricao_problema='Benchmark de escrita',
+            )
+            request.save(equipamentos=[equipment])
+            requests.append(request.pk)
+        slices.append((technician, requests))
+    return slices
+
+
+def worker(technician, request_ids, results, barrier):
+    from django.db import OperationalError, connection
+    from maintenance import transitions
+    from maintenance.models import MaintenanceRequest
+
+    done = locked = conflicts = 0
+    barrier.wait()
+    try:
+        for pk in request_ids:
+            for target in WORKFLOW:
+                request = MaintenanceRequest.objects.prefetch_related('equipamentos').get(pk=pk)
+                fields = {'responsavel_manutencao': technician} if target == 'ACEITA' else {}
+                try:
+                    transitions.apply(request, target, technician, **fields)
+                    done += 1
+                except OperationalError:
+                    locked += 1
+                except transitions.TransitionError:
+                    conflicts += 1
+    finally:
+        connection.close()
+    results.append((done, locked, conflicts))
+
+
+def run(threads, per_thread, pragmas, db_path):
+    reset_database(pragmas, db_path)
+    slices = seed(threads, per_thread)
+    from django.db import connection
+
+    connection.close()
+    results = []
+    barrier = threading.Barrier(threads + 1)
+    workers = [threading.Thread(target=worker, args=(*item, results, barrier)) for item in slices]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    done, locked, conflicts = (sum(values) for values in zip(*results))
+    return {
+        'threads': threads, 'transitions': done, 'locked_errors': locked, 'conflicts': conflicts,
+        'seconds': round(elapsed, 3), 'per_second': round(done / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--db', default='/tmp/maintenance_write_benchmark.sqlite3')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--requests-per-thread', type=int, default=50)
+    parser.add_argument('--json', help='Arquivo para salvar os resultados')
+    args = parser.parse_args()
+
+    setup_django(args.db)
+    from django.conf import settings
+    from django.db import connection
+
+    configurations = {'configurado': dict(settings.SQLITE_PRAGMAS)}
+    if connection.vendor == 'sqlite':
+        configurations = {'padrao': {}, **configurations}
+
+    results = {}
+    for label, pragmas in configurations.items():
+        print(f'\n== {label} ({connection.vendor})')
+        print(f'{"threads":>8} {"transições/s":>14} {"locked":>8} {"conflitos":>10} {"tempo (s)":>10}')
+        results[label] = []
+        for threads in args.threads:
+            row = run(threads, args.requests_per_thread, pragmas, args.db)
+            results[label].append(row)
+            print(f'{threads:>8} {row["per_second"]:>14} {row["locked_errors"]:>8} '
+                  f'{row["conflicts"]:>10} {row["seconds"]:>10}')
+
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
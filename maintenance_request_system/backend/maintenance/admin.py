@@ -1,5 +1,10 @@
 from django.contrib import admin
-from .models import UserProfile, MaintenanceRequest, RequestAttachment, RequestHistory, Notification
+from django.db.models import Q
+from .search import get_search_backend
+from .models import (
+    UserProfile, Equipment, MaintenanceRequest, RequestAttachment, AttachmentUpload, RequestHistory, Notification,
+    NotificationReceipt, MaintenanceRollup, SchedulerCheckpoint, TechnicianWorkload
+)
 
 
 @admin.register(UserProfile)
@@ -9,12 +14,27 @@ class UserProfileAdmin(admin.ModelAdmin):
     search_fields = ['user__username', 'user__first_name', 'user__last_name']
 
 
+@admin.register(Equipment)
+class EquipmentAdmin(admin.ModelAdmin):
+    list_display = ['codigo', 'nome', 'tipo', 'setor', 'ativo']
+    list_filter = ['tipo', 'ativo']
+    search_fields = ['codigo', 'nome', 'setor']
+
+
 @admin.register(MaintenanceRequest)
 class MaintenanceRequestAdmin(admin.ModelAdmin):
     list_display = ['numero_requisicao', 'titulo_curto', 'solicitante', 'status', 'tipo_manutencao', 'data_criacao']
     list_filter = ['status', 'tipo_manutencao', 'prioridade', 'data_criacao']
     search_fields = ['titulo_curto', 'descricao_problema', 'solicitante__username']
     readonly_fields = ['numero_requisicao', 'data_criacao', 'data_atualizacao']
+    filter_horizontal = ['equipamentos']
+
+    def get_search_results(self, request, queryset, search_term):
+        """Usa o índice de texto completo em vez de LIKE '%termo%'"""
+        if not search_term:
+            return queryset, False
+        ids = get_search_backend().search(queryset, search_term)
+        return queryset.filter(Q(pk__in=ids) | Q(solicitante__username=search_term)), False
 
     fieldsets = (
         ('Informações Básicas', {
@@ -22,13 +42,13 @@ class MaintenanceRequestAdmin(admin.ModelAdmin):
         }),
         ('Detalhes da Requisição', {
             'fields': ('prazo_limite', 'setor_solicitante', 'tipo_manutencao', 'status_operacional',
-                      'equipamentos_impactados', 'outros_equipamentos', 'prioridade')
+                      'equipamentos', 'outros_equipamentos', 'prioridade')
         }),
         ('Status e Fluxo', {
             'fields': ('status', 'motivo_cancelamento', 'motivo_parada')
         }),
         ('Execução da Manutenção', {
-            'fields': ('responsavel_manutencao', 'data_prevista_termino', 'hora_inicio',
+            'fields': ('responsavel_manutencao', 'data_prevista_termino', 'hora_aceite', 'hora_inicio',
                       'hora_termino', 'descricao_manutencao', 'materiais_utilizados')
         }),
         ('Timestamps', {
@@ -40,8 +60,15 @@ class MaintenanceRequestAdmin(admin.ModelAdmin):
 
 @admin.register(RequestAttachment)
 class RequestAttachmentAdmin(admin.ModelAdmin):
-    list_display = ['request', 'nome_original', 'data_upload']
-    list_filter = ['data_upload']
+    list_display = ['request', 'nome_original', 'content_type', 'tamanho', 'miniatura_status', 'data_upload']
+    list_filter = ['miniatura_status', 'data_upload']
+    search_fields = ['nome_original', 'sha256']
+
+
+@admin.register(AttachmentUpload)
+class AttachmentUploadAdmin(admin.ModelAdmin):
+    list_display = ['request', 'usuario', 'nome_original', 'recebido', 'tamanho', 'data_atualizacao']
+    readonly_fields = ['recebido']
 
 
 @admin.register(RequestHistory)
@@ -53,6 +80,33 @@ class RequestHistoryAdmin(admin.ModelAdmin):
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
-    list_display = ['usuario', 'titulo', 'lida', 'data_criacao']
-    list_filter = ['lida', 'data_criacao']
+    list_display = ['usuario', 'perfil_destino', 'titulo', 'lida', 'data_criacao']
+    list_filter = ['perfil_destino', 'lida', 'data_criacao']
     search_fields = ['titulo', 'mensagem', 'usuario__username']
+
+
+@admin.register(NotificationReceipt)
+class NotificationReceiptAdmin(admin.ModelAdmin):
+    list_display = ['notification', 'usuario', 'data_leitura']
+    list_filter = ['data_leitura']
+    search_fields = ['notification__titulo', 'usuario__username']
+
+
+@admin.register(MaintenanceRollup)
+class MaintenanceRollupAdmin(admin.ModelAdmin):
+    list_display = ['dimensao', 'chave', 'total_requisicoes', 'total_respondidas', 'total_reparos']
+    list_filter = ['dimensao']
+    search_fields = ['chave']
+
+
+@admin.register(SchedulerCheckpoint)
+class SchedulerCheckpointAdmin(admin.ModelAdmin):
+    list_display = ['nome', 'prazo_ate', 'ultima_requisicao', 'data_atualizacao']
+
+
+@admin.register(TechnicianWorkload)
+class TechnicianWorkloadAdmin(admin.ModelAdmin):
+    list_display = ['usuario', 'especialidade', 'disponivel', 'abertas', 'ultima_atribuicao']
+    list_filter = ['especialidade', 'disponivel']
+    list_editable = ['especialidade', 'disponivel']
+    readonly_fields = ['abertas', 'ultima_atribuicao', 'ultima_requisicao']
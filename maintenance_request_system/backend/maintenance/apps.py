@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class MaintenanceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'maintenance'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import assignment  # noqa: F401 (cria a carga dos perfis MANUTENCAO)
+        from . import authentication  # noqa: F401 (registra os sinais de invalidação)
+        from . import unread  # noqa: F401 (decrementa as não lidas ao excluir notificações)
+        from .db import configure_connection
+        from .profiling import install_query_timer
+
+        connection_created.connect(configure_connection, dispatch_uid='maintenance_configure_connection')
+        connection_created.connect(install_query_timer, dispatch_uid='maintenance_install_query_timer')
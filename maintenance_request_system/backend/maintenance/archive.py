@@ -0,0 +1,155 @@
+"""
+Arquivamento de histórico e notificações antigos.
+
+Notificações diretas já lidas há mais de ``NOTIFICATION_RETENTION_DAYS`` dias e
+o histórico de requisições encerradas há mais de ``HISTORY_RETENTION_MONTHS``
+meses saem do banco para arquivos JSONL comprimidos em ``ARCHIVE_DIR``,
+particionados por dia (``historico/AAAA/MM/AAAA-MM-DD.jsonl.gz``). Cada lote é
+acrescentado ao arquivo como um novo membro gzip e só então apagado do banco;
+se o processo cair entre as duas etapas, a próxima execução grava as linhas de
+novo e a leitura descarta as repetidas pelo ``id``.
+
+O histórico é particionado pela data de encerramento da requisição, registrada
+em ``MaintenanceRequest.arquivo_historico``: abrir uma requisição antiga lê um
+único arquivo.
+"""
+import calendar
+import gzip
+import json
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import MaintenanceRequest, Notification, RequestHistory
+from .serializers import RequestHistorySerializer
+
+BATCH_SIZE = 1000
+CLOSED_STATUSES = ['CONCLUIDA', 'CANCELADA']
+
+
+def months_ago(now, months):
+    year, month = divmod(now.year * 12 + now.month - 1 - months, 12)
+    month += 1
+    return now.replace(year=year, month=month, day=min(now.day, calendar.monthrange(year, month)[1]))
+
+
+def partition_path(kind, value):
+    day = timezone.localdate(value)
+    return f'{kind}/{day:%Y}/{day:%m}/{day:%Y-%m-%d}.jsonl.gz'
+
+
+def _isoformat(value):
+    return value.isoformat()
+
+
+def append_records(partition, records):
+    path = os.path.join(settings.ARCHIVE_DIR, partition)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with gzip.open(path, 'at', encoding='utf-8') as archive:
+        for record in records:
+            archive.write(json.dumps(record, ensure_ascii=False, default=_isoformat) + '\n')
+
+
+def read_records(partition):
+    path = os.path.join(settings.ARCHIVE_DIR, partition)
+    if not os.path.exists(path):
+        return
+    with gzip.open(path, 'rt', encoding='utf-8') as archive:
+        for line in archive:
+            yield json.loads(line)
+
+
+def write_partitions(records_by_partition):
+    for partition, records in records_by_partition.items():
+        append_records(partition, records)
+
+
+def archive_history(cutoff, batch_size=BATCH_SIZE):
+    """Arquiva o histórico das requisições encerradas antes de ``cutoff``; retorna o total arquivado"""
+    history = RequestHistory.objects.filter(
+        request__status__in=CLOSED_STATUSES, request__data_atualizacao__lt=cutoff
+    ).select_related('usuario', 'request').order_by('pk')
+    total = 0
+    last_pk = 0
+    while True:
+        batch = list(history.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return total
+        partitions = {}
+        by_partition = {}
+        for item in batch:
+            request = item.request
+            partition = request.arquivo_historico or partition_path('historico', request.data_atualizacao)
+            partitions.setdefault(partition, set()).add(request.pk)
+            by_partition.setdefault(partition, []).append(
+                {'request': request.pk, **RequestHistorySerializer(item).data}
+            )
+        write_partitions(by_partition)
+        with transaction.atomic():
+            for partition, request_ids in partitions.items():
+                # update() não altera data_atualizacao
+                MaintenanceRequest.objects.filter(pk__in=request_ids).update(arquivo_historico=partition)
+            RequestHistory.objects.filter(pk__in=[item.pk for item in batch]).delete()
+        total += len(batch)
+        last_pk = batch[-1].pk
+
+
+def archive_notifications(cutoff, batch_size=BATCH_SIZE):
+    """
+    Arquiva as notificações diretas lidas criadas antes de ``cutoff``.
+
+    Avisos ao perfil ficam no banco: a leitura deles é por usuário e arquivá-los
+    alteraria a contagem de não lidas de quem ainda não os viu.
+    """
+    notifications = Notification.objects.filter(
+        usuario__isnull=False, lida=True, data_criacao__lt=cutoff
+    ).order_by('pk')
+    total = 0
+    last_pk = 0
+    while True:
+        batch = list(notifications.filter(pk__gt=last_pk).values(
+            'id', 'usuario', 'titulo', 'mensagem', 'request', 'data_criacao', 'chave'
+        )[:batch_size])
+        if not batch:
+            return total
+        by_partition = {}
+        for record in batch:
+            by_partition.setdefault(partition_path('notificacoes', record['data_criacao']), []).append(record)
+        write_partitions(by_partition)
+        Notification.objects.filter(pk__in=[record['id'] for record in batch]).delete()
+        total += len(batch)
+        last_pk = batch[-1]['id']
+
+
+def archive_expired(now=None, notification_days=None, history_months=None, batch_size=BATCH_SIZE):
+    """Aplica a política de retenção; retorna (histórico, notificações) arquivados"""
+    now = now or timezone.now()
+    if notification_days is None:
+        notification_days = settings.NOTIFICATION_RETENTION_DAYS
+    if history_months is None:
+        history_months = settings.HISTORY_RETENTION_MONTHS
+    return (
+        archive_history(months_ago(now, history_months), batch_size),
+        archive_notifications(now - timedelta(days=notification_days), batch_size),
+    )
+
+
+def read_history(request):
+    """Entradas arquivadas do histórico de ``request``, no formato de ``RequestHistorySerializer``"""
+    if not request.arquivo_historico:
+        return []
+    return [
+        {key: value for key, value in record.items() if key != 'request'}
+        for record in read_records(request.arquivo_historico) if record['request'] == request.pk
+    ]
+
+
+def merge_history(current, archived):
+    """Une histórico do banco e arquivado, sem repetições, do mais recente ao mais antigo"""
+    entries = {entry['id']: entry for entry in archived}
+    entries.update((entry['id'], entry) for entry in current)
+    return sorted(entries.values(), key=lambda entry: parse_datetime(entry['data_acao']), reverse=True)
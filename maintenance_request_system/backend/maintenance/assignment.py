@@ -0,0 +1,49 @@
+"""
+Atribuição automática de requisições novas (``AUTO_ASSIGN_REQUESTS``).
+
+``TechnicianWorkload`` guarda, por técnico, quantas requisições ACEITA ou
+EM_ATENDIMENTO estão com ele; a contagem é ajustada com ``F()`` na mesma
+transação de cada gravação de requisição (``record_change``, ``apply_many``,
+importação). Atribuir uma requisição nova lê só essa tabela, uma linha por
+técnico, e nunca conta as requisições: ``TechnicianWorkload.objects.claim``
+escolhe o menos ocupado e soma a requisição à carga dele num único UPDATE, de
+modo que criações simultâneas não enxergam a mesma carga desatualizada.
+
+Linhas são criadas para cada perfil MANUTENCAO gravado; ``rebuild_workload``
+recalcula as cargas a partir das requisições.
+"""
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import transitions
+from .models import RequestHistory, TechnicianWorkload, UserProfile
+
+
+def auto_assign(request):
+    """Leva ``request`` (ABERTA) para ACEITA com o técnico menos ocupado; retorna o técnico ou None"""
+    try:
+        with transaction.atomic():
+            usuario_id = TechnicianWorkload.objects.claim(request, timezone.now())
+            if usuario_id is None:
+                return None
+            technician = User.objects.get(pk=usuario_id)
+            # claim() já somou a requisição à carga; a transição não soma de novo
+            request._workload_user_id = technician.pk
+            transitions.apply(request, 'ACEITA', technician, responsavel_manutencao=technician)
+            RequestHistory.objects.create(
+                request=request, usuario=technician, acao='ATRIBUICAO_AUTOMATICA',
+                descricao=f'Atribuída automaticamente a {technician.username}',
+            )
+    except transitions.TransitionError:
+        # Aceita por alguém entre a criação e a atribuição
+        return None
+    return technician
+
+
+@receiver(post_save, sender=UserProfile)
+def create_workload(sender, instance, **kwargs):
+    if instance.profile_type == 'MANUTENCAO':
+        TechnicianWorkload.objects.get_or_create(usuario_id=instance.user_id)
@@ -0,0 +1,92 @@
+"""
+Autenticação por token com cache do usuário e do perfil.
+
+Cada token resolvido é guardado no cache do Django como um dicionário com os
+campos que as permissões e os filtros por perfil usam (id, nome de usuário,
+flags, ``date_joined``, tipo de perfil e setor), nunca o hash da senha. A
+partir dele é montado um ``User`` com os demais campos adiados e o
+``UserProfile`` já carregado (``user.userprofile`` não consulta o banco). O
+LocMemCache padrão descarta as entradas menos usadas ao atingir
+``MAX_ENTRIES`` e todas expiram após ``AUTH_CACHE_TIMEOUT``; alterações em
+tokens, usuários e perfis removem a entrada na hora.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .models import UserProfile
+
+TOKEN_KEY = 'auth:token:{}'
+USER_FIELDS = ('id', 'username', 'is_active', 'is_staff', 'is_superuser', 'date_joined')
+PROFILE_FIELDS = ('id', 'user_id', 'profile_type', 'setor')
+
+
+def cache_key(key):
+    # O token não vai em claro para o cache (que pode ser um Redis compartilhado)
+    return TOKEN_KEY.format(hashlib.sha256(key.encode()).hexdigest())
+
+
+def get_timeout():
+    return getattr(settings, 'AUTH_CACHE_TIMEOUT', 300)
+
+
+def serialize_user(user):
+    profile = getattr(user, 'userprofile', None)
+    return {
+        'user': {field: getattr(user, field) for field in USER_FIELDS},
+        'profile': {field: getattr(profile, field) for field in PROFILE_FIELDS} if profile else None,
+    }
+
+
+def from_cache(model, values):
+    """Instância só com os campos em ``values``; os demais ficam adiados e ``save()`` grava apenas os carregados"""
+    names = [field.attname for field in model._meta.concrete_fields if field.attname in values]
+    return model.from_db(DEFAULT_DB_ALIAS, names, [values[name] for name in names])
+
+
+def build_user(data):
+    user = from_cache(User, data['user'])
+    if data['profile']:
+        user.userprofile = from_cache(UserProfile, data['profile'])
+    return user
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        data = cache.get(cache_key(key))
+        if data is None:
+            try:
+                token = Token.objects.select_related('user__userprofile').get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed('Token inválido.')
+            data = serialize_user(token.user)
+            cache.set(cache_key(key), data, timeout=get_timeout())
+        user = build_user(data)
+
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('Usuário inativo ou excluído.')
+        return (user, Token(key=key, user=user))
+
+
+def invalidate_user(user_id):
+    keys = Token.objects.filter(user_id=user_id).values_list('key', flat=True)
+    cache.delete_many([cache_key(key) for key in keys])
+
+
+@receiver([post_save, post_delete], sender=Token)
+def token_changed(sender, instance, **kwargs):
+    cache.delete(cache_key(instance.key))
+
+
+@receiver([post_save, post_delete], sender=User)
+@receiver([post_save, post_delete], sender=UserProfile)
+def user_changed(sender, instance, **kwargs):
+    invalidate_user(instance.pk if sender is User else instance.user_id)
@@ -0,0 +1,120 @@
+"""
+Contadores do dashboard mantidos no cache do Django.
+
+Cada mudança de status incrementa/decrementa o contador do status e incrementa
+a versão do dashboard; o payload fica em cache por versão, de modo que uma
+leitura custa apenas consultas ao cache. ``reconcile`` recalcula os contadores
+com um único GROUP BY: ao expirarem (``COUNTER_TIMEOUT``) ou pelo comando
+``reconcile_dashboard``, útil quando o cache é compartilhado entre processos.
+"""
+import time
+from collections import Counter
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import MaintenanceRequest
+from .serializers import MaintenanceRequestListSerializer
+
+VERSION_KEY = 'dashboard:version'
+PAYLOAD_KEY = 'dashboard:payload:{}'
+STATUS_KEY = 'dashboard:status:{}'
+STATUSES = [code for code, _ in MaintenanceRequest.STATUS_CHOICES]
+OPEN_STATUSES = ['ABERTA', 'VISUALIZADA', 'ACEITA', 'EM_ATENDIMENTO']
+PAYLOAD_TIMEOUT = 300
+COUNTER_TIMEOUT = 900
+
+
+def _incr(key, delta):
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # Contador ausente: será recalculado na próxima leitura
+        pass
+
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Valor inicial baseado no relógio para não reaproveitar versões antigas após despejo do cache
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate():
+    """Descarta o payload em cache incrementando a versão"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        get_version()
+
+
+def record_status_change(old_status, new_status):
+    """Chamado após o commit de uma requisição criada, alterada ou excluída"""
+    record_status_changes([(old_status, new_status)])
+
+
+def record_status_changes(changes):
+    """Aplica vários pares (status anterior, novo status) com um incremento por status"""
+    deltas = Counter()
+    for old_status, new_status in changes:
+        if old_status != new_status:
+            if old_status:
+                deltas[old_status] -= 1
+            if new_status:
+                deltas[new_status] += 1
+    for code, delta in deltas.items():
+        if delta:
+            _incr(STATUS_KEY.format(code), delta)
+    invalidate()
+
+
+def reset():
+    """Descarta os contadores; a próxima leitura os recalcula"""
+    cache.delete_many([STATUS_KEY.format(code) for code in STATUSES])
+    invalidate()
+
+
+def reconcile(bump_version=True):
+    """Recalcula os contadores a partir do banco"""
+    counts = dict.fromkeys(STATUSES, 0)
+    rows = MaintenanceRequest.objects.order_by().values('status').annotate(total=Count('pk'))
+    counts.update({row['status']: row['total'] for row in rows})
+    cache.set_many({STATUS_KEY.format(code): total for code, total in counts.items()}, timeout=COUNTER_TIMEOUT)
+    if bump_version:
+        invalidate()
+    return counts
+
+
+def get_status_counts():
+    keys = {STATUS_KEY.format(code): code for code in STATUSES}
+    cached = cache.get_many(keys)
+    if len(cached) != len(keys):
+        # Contadores ausentes não tornam o payload da versão atual inválido
+        return reconcile(bump_version=False)
+    return {code: cached[key] for key, code in keys.items()}
+
+
+def build_payload(counts):
+    recent = MaintenanceRequest.objects.with_related(nested=()).order_by('-data_criacao')[:5]
+    return {
+        'total_requests': sum(counts.values()),
+        'open_requests': sum(counts[code] for code in OPEN_STATUSES),
+        'completed_requests': counts['CONCLUIDA'],
+        'status_counts': counts,
+        'recent_requests': MaintenanceRequestListSerializer(recent, many=True).data,
+    }
+
+
+def get_dashboard():
+    """Retorna (versão, payload), reconstruindo o payload só quando a versão muda"""
+    # A versão é lida antes dos contadores: uma mudança gravada entre as duas
+    # leituras incrementa a versão e o payload antigo não volta a ser servido
+    version = get_version()
+    key = PAYLOAD_KEY.format(version)
+    payload = cache.get(key)
+    if payload is None:
+        payload = build_payload(get_status_counts())
+        cache.set(key, payload, timeout=PAYLOAD_TIMEOUT)
+    return version, payload
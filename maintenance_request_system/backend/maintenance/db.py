@@ -0,0 +1,33 @@
+"""
+Ajustes aplicados a cada nova conexão com o banco.
+
+No SQLite, o modo WAL deixa leituras e a escrita acontecerem ao mesmo tempo e
+``busy_timeout`` faz escritores concorrentes aguardarem o lock em vez de
+falharem com "database is locked". Os valores ficam em ``SQLITE_PRAGMAS``.
+
+``journal_mode=WAL`` é persistente: a conexão grava o modo no cabeçalho do
+arquivo e cria ``<banco>-wal`` e ``<banco>-shm`` ao lado dele (ignorados no
+``.gitignore``). Por isso o modo só é alterado quando difere do atual e nunca
+no ``SQLITE_DEMO_DATABASE``, o ``db.sqlite3`` versionado, que fica no modo de
+journal com que foi gravado.
+"""
+import os
+
+from django.conf import settings
+
+
+def is_demo_database(connection):
+    demo = getattr(settings, 'SQLITE_DEMO_DATABASE', None)
+    return bool(demo) and os.path.realpath(str(connection.settings_dict['NAME'])) == os.path.realpath(str(demo))
+
+
+def configure_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            if name == 'journal_mode':
+                cursor.execute('PRAGMA journal_mode')
+                if cursor.fetchone()[0].lower() == str(value).lower() or is_demo_database(connection):
+                    continue
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,118 @@
+"""
+Aviso de "Prazo Final Próximo" para o solicitante e a manutenção.
+
+Cada execução de ``notify_due_requests`` olha só o que ainda não foi visto, com
+duas varreduras por faixa de índice a partir da marca d'água gravada em
+``SchedulerCheckpoint``:
+
+- requisições cujo ``prazo_limite`` entrou na janela desde a última execução
+  (``prazo_ate`` < prazo <= hoje + janela, índice ``req_prazo_idx``);
+- requisições com prazo na faixa que a última execução já tinha coberto e que
+  foram criadas (``numero_requisicao`` > ``ultima_requisicao``) ou alteradas
+  (``data_atualizacao`` a partir de ``alteracoes_desde``) desde então, como um
+  prazo editado para dentro da janela. A faixa de prazos tem poucos dias, então
+  a varredura segue o índice ``req_prazo_idx``.
+
+As notificações são inseridas em lote; ``Notification.chave`` tem restrição de
+unicidade, então reexecuções e execuções concorrentes não duplicam avisos. O
+``bulk_create`` não chama ``save``: as linhas inseridas são relidas pela chave
+para os contadores de não lidas e para o ``/api/events/`` após o commit.
+"""
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from . import events, unread
+from .models import MaintenanceRequest, MaintenanceRequestQuerySet, Notification, SchedulerCheckpoint
+
+CHECKPOINT_NAME = 'aviso_prazo'
+BATCH_SIZE = 1000
+# Alterações gravadas por transações ainda abertas no início da execução anterior
+EDIT_OVERLAP = timedelta(minutes=5)
+FIELDS = ('numero_requisicao', 'titulo_curto', 'prazo_limite', 'solicitante_id', 'responsavel_manutencao_id')
+
+
+def notification_key(row, recipient):
+    return f"prazo:{row['numero_requisicao']}:{row['prazo_limite']:%Y%m%d}:{recipient}"
+
+
+def build_notifications(row):
+    mensagem = (
+        f"O prazo da requisição #{row['numero_requisicao']} ({row['titulo_curto']}) "
+        f"termina em {row['prazo_limite']:%d/%m/%Y}"
+    )
+    common = {'titulo': 'Prazo Final Próximo', 'mensagem': mensagem, 'request_id': row['numero_requisicao']}
+    # A manutenção é avisada pelo responsável, se houver, ou pelo aviso ao perfil
+    if row['responsavel_manutencao_id']:
+        maintenance = Notification(usuario_id=row['responsavel_manutencao_id'], **common)
+    else:
+        maintenance = Notification(perfil_destino='MANUTENCAO', **common)
+    maintenance.chave = notification_key(row, 'manutencao')
+    requester = Notification(usuario_id=row['solicitante_id'], chave=notification_key(row, 'solicitante'), **common)
+    return [requester, maintenance]
+
+
+def insert_batch(rows):
+    notifications = [notification for row in rows for notification in build_notifications(row)]
+    existing = set(Notification.objects.filter(
+        chave__in=[notification.chave for notification in notifications]
+    ).values_list('chave', flat=True))
+    new = [notification for notification in notifications if notification.chave not in existing]
+    # ignore_conflicts cobre uma execução concorrente que inseriu as mesmas chaves
+    Notification.objects.bulk_create(new, ignore_conflicts=True)
+    # Com ignore_conflicts o banco não devolve as chaves primárias
+    return list(Notification.objects.filter(chave__in=[notification.chave for notification in new]))
+
+
+def due_batches(queryset):
+    """Lotes de linhas (dicts) percorridos pela chave primária"""
+    last_pk = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last_pk).order_by('pk').values(*FIELDS)[:BATCH_SIZE])
+        if not rows:
+            return
+        last_pk = rows[-1]['numero_requisicao']
+        yield rows
+
+
+def notify_due_requests(window_days=None, today=None):
+    """Cria os avisos pendentes e avança a marca d'água; retorna quantas notificações foram criadas"""
+    window_days = settings.DEADLINE_WARNING_DAYS if window_days is None else window_days
+    today = today or timezone.localdate()
+    horizon = today + timedelta(days=window_days)
+    open_requests = MaintenanceRequest.objects.filter(
+        status__in=MaintenanceRequestQuerySet.QUEUE_STATUSES, prazo_limite__lte=horizon
+    )
+
+    with transaction.atomic():
+        checkpoint, _ = SchedulerCheckpoint.objects.select_for_update().get_or_create(nome=CHECKPOINT_NAME)
+        started = timezone.now()
+        last_request = MaintenanceRequest.objects.aggregate(last=Max('pk'))['last'] or 0
+        # Prazos já vencidos não são "próximos"
+        querysets = [open_requests.filter(prazo_limite__gt=checkpoint.prazo_ate or today - timedelta(days=1))]
+        if checkpoint.prazo_ate:
+            # Criadas ou alteradas depois da última execução com prazo na faixa que ela já tinha coberto
+            changed = Q(pk__gt=checkpoint.ultima_requisicao, pk__lte=last_request)
+            if checkpoint.alteracoes_desde:
+                changed |= Q(data_atualizacao__gte=checkpoint.alteracoes_desde - EDIT_OVERLAP)
+            querysets.append(open_requests.filter(
+                changed, prazo_limite__gte=today, prazo_limite__lte=checkpoint.prazo_ate,
+            ))
+
+        created = []
+        for queryset in querysets:
+            for rows in due_batches(queryset):
+                created.extend(insert_batch(rows))
+
+        checkpoint.prazo_ate = max(horizon, checkpoint.prazo_ate or horizon)
+        checkpoint.ultima_requisicao = max(last_request, checkpoint.ultima_requisicao)
+        checkpoint.alteracoes_desde = started
+        checkpoint.save()
+        transaction.on_commit(lambda: unread.record_bulk_created(created))
+        for notification in created:
+            transaction.on_commit(partial(events.publish_notification, notification))
+    return len(created)
@@ -0,0 +1,122 @@
+"""
+Pub/sub de eventos em tempo real (notificações e mudanças de status).
+
+Os eventos são publicados após o commit em canais ``user:<id>`` e
+``perfil:<PROFILE_TYPE>`` e entregues às conexões SSE abertas em
+``/api/events/``. O broker padrão vive na memória do processo; em implantações
+com vários processos, aponte ``MAINTENANCE_EVENT_BROKER`` para outra
+implementação de ``EventBroker`` (ex.: Redis pub/sub).
+"""
+import asyncio
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class EventBroker:
+    """Interface dos brokers de eventos"""
+
+    def publish(self, channels, event):
+        """Entrega ``event`` uma única vez a cada assinante de qualquer um dos ``channels``"""
+        raise NotImplementedError
+
+    def subscribe(self, channels):
+        """Retorna uma ``Subscription`` cujo ``get()`` aguarda o próximo evento"""
+        raise NotImplementedError
+
+
+class Subscription:
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = channels
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def deliver(self, event):
+        """Chamado no loop do assinante; descarta eventos se o cliente estiver lento"""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            pass
+
+    async def get(self, timeout=None):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker(EventBroker):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+
+    def publish(self, channels, event):
+        with self._lock:
+            subscriptions = set().union(*(self._subscriptions.get(channel, ()) for channel in channels))
+        for subscription in subscriptions:
+            # publish pode ser chamado de uma thread de view síncrona
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # Loop já encerrado: conexão caiu antes do unsubscribe
+                subscription.close()
+
+    def subscribe(self, channels):
+        subscription = Subscription(self, channels)
+        with self._lock:
+            for channel in channels:
+                self._subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscriptions.get(channel)
+                if subscribers:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscriptions[channel]
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    path = getattr(settings, 'MAINTENANCE_EVENT_BROKER', None)
+    return import_string(path)() if path else InProcessBroker()
+
+
+def user_channels(user, profile_type=None):
+    channels = [f'user:{user.pk}']
+    if profile_type:
+        channels.append(f'perfil:{profile_type}')
+    return channels
+
+
+def publish_notification(notification):
+    channel = f'user:{notification.usuario_id}' if notification.usuario_id else f'perfil:{notification.perfil_destino}'
+    get_broker().publish([channel], {
+        'type': 'notification',
+        'id': notification.pk,
+        'titulo': notification.titulo,
+        'mensagem': notification.mensagem,
+        'request': notification.request_id,
+        'data_criacao': notification.data_criacao.isoformat(),
+    })
+
+
+def publish_status_change(request, old_status):
+    event = {
+        'type': 'request_status',
+        'numero_requisicao': request.pk,
+        'titulo_curto': request.titulo_curto,
+        'status': request.status,
+        'old_status': old_status,
+    }
+    channels = [f'user:{request.solicitante_id}', 'perfil:MANUTENCAO']
+    if request.responsavel_manutencao_id:
+        channels.append(f'user:{request.responsavel_manutencao_id}')
+    get_broker().publish(channels, event)
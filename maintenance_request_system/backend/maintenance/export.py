@@ -0,0 +1,222 @@
+"""
+Exportação de requisições em CSV e XLSX com memória constante.
+
+As linhas são lidas com ``iterator(chunk_size=...)`` e cada uma é escrita e
+entregue ao ``StreamingHttpResponse`` antes da próxima ser montada. O XLSX é
+gerado sem dependências externas: o zip é escrito em um buffer que é esvaziado
+a cada linha.
+
+Sob ASGI, o Django consome iteradores síncronos com ``sync_to_async(list)``, ou
+seja, junta o arquivo inteiro em memória antes de enviá-lo; ``aiterate`` entrega
+os mesmos pedaços por um iterador assíncrono, lendo alguns por vez em thread.
+
+Textos vêm de qualquer solicitante: no CSV, os que começam como uma fórmula
+(``=``, ``+``, ``-``, ``@``, tabulação ou CR) ganham um ``'`` na frente, que a
+importação remove; no XLSX todo texto é uma string inline, nunca uma fórmula.
+"""
+import csv
+import re
+import zipfile
+from itertools import islice
+from xml.sax.saxutils import escape
+
+from asgiref.sync import sync_to_async
+from django.utils.dateparse import parse_datetime
+
+from . import archive
+
+EXPORT_CHUNK_SIZE = 500
+ASYNC_BATCH_SIZE = 100
+XML_INVALID_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+COLUMNS = [
+    ('numero_requisicao', lambda req: req.numero_requisicao),
+    ('data_criacao', lambda req: req.data_criacao),
+    ('status', lambda req: req.status),
+    ('titulo_curto', lambda req: req.titulo_curto),
+    ('descricao_problema', lambda req: req.descricao_problema),
+    ('solicitante', lambda req: req.solicitante.username),
+    ('setor_solicitante', lambda req: req.setor_solicitante),
+    ('tipo_manutencao', lambda req: req.tipo_manutencao),
+    ('status_operacional', lambda req: req.status_operacional),
+    ('prioridade', lambda req: req.prioridade),
+    ('prazo_limite', lambda req: req.prazo_limite),
+    ('equipamentos', lambda req: ', '.join(equipment.codigo for equipment in req.equipamentos.all())),
+    ('responsavel_manutencao', lambda req: getattr(req.responsavel_manutencao, 'username', '')),
+    ('hora_aceite', lambda req: req.hora_aceite),
+    ('hora_inicio', lambda req: req.hora_inicio),
+    ('hora_termino', lambda req: req.hora_termino),
+    ('tempo_resposta_segundos', lambda req: req.tempo_resposta),
+    ('tempo_reparo_segundos', lambda req: req.tempo_reparo),
+    ('descricao_manutencao', lambda req: req.descricao_manutencao),
+    ('materiais_utilizados', lambda req: req.materiais_utilizados),
+    ('motivo_cancelamento', lambda req: req.motivo_cancelamento),
+    ('motivo_parada', lambda req: req.motivo_parada),
+    ('historico', lambda req: _history(req)),
+]
+HEADERS = [name for name, _ in COLUMNS]
+
+
+def _history(req):
+    """Histórico do banco e do arquivo (requisições encerradas há muito), do mais antigo ao mais recente"""
+    entries = [(item.data_acao, item.usuario.username, item.acao, item.descricao) for item in req.historico.all()]
+    if req.arquivo_historico:
+        current = {item.pk for item in req.historico.all()}
+        entries.extend(
+            (parse_datetime(entry['data_acao']), entry['usuario']['username'], entry['acao'], entry['descricao'])
+            for entry in archive.read_history(req) if entry['id'] not in current
+        )
+    return ' | '.join(
+        f'{data_acao:%Y-%m-%d %H:%M} {username} {acao}: {descricao}'
+        for data_acao, username, acao, descricao in sorted(entries, key=lambda entry: entry[0])
+    )
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def escape_formula(value):
+    """Texto que a planilha leria como fórmula vira texto literal com ``'``"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def unescape_formula(value):
+    """Inverso de ``escape_formula``, para reimportar um CSV exportado"""
+    if value.startswith("'") and value[1:].startswith(FORMULA_PREFIXES):
+        return value[1:]
+    return value
+
+
+def export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Gera uma lista de valores por requisição, lendo o banco em lotes"""
+    for request in queryset.iterator(chunk_size=chunk_size):
+        yield [_cell(getter(request)) for _, getter in COLUMNS]
+
+
+class _Echo:
+    """Objeto tipo arquivo que devolve o que recebe, para o csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo())
+    yield '\ufeff'  # BOM para o Excel reconhecer UTF-8
+    yield writer.writerow(HEADERS)
+    for row in rows:
+        yield writer.writerow([escape_formula(value) for value in row])
+
+
+class _Buffer:
+    """Destino não pesquisável para o ZipFile, esvaziado a cada leitura"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+XLSX_STATIC_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Requisicoes" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _xlsx_row(values):
+    cells = []
+    for value in values:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            cells.append(f'<c t="n"><v>{value}</v></c>')
+        else:
+            text = escape(XML_INVALID_CHARS.sub('', str(value)))
+            cells.append(f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return f'<row>{"".join(cells)}</row>'.encode()
+
+
+def stream_xlsx(rows):
+    buffer = _Buffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_STATIC_PARTS.items():
+            archive.writestr(name, content)
+        yield buffer.drain()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(_xlsx_row(HEADERS))
+            for row in rows:
+                sheet.write(_xlsx_row(row))
+                yield buffer.drain()
+            sheet.write(b'</sheetData></worksheet>')
+    yield buffer.drain()
+
+
+def _take(iterator, size):
+    return list(islice(iterator, size))
+
+
+async def aiterate(chunks, batch_size=None):
+    """
+    Percorre um gerador síncrono (que consulta o banco) a partir de um servidor ASGI.
+
+    Cada lote de ``batch_size`` pedaços é lido na thread compartilhada de código
+    síncrono, a mesma conexão do restante da requisição, e entregue já unido.
+    """
+    batch_size = batch_size or ASYNC_BATCH_SIZE
+    iterator = iter(chunks)
+    take = sync_to_async(_take, thread_sensitive=True)
+    while batch := await take(iterator, batch_size):
+        yield batch[0][:0].join(batch)
@@ -0,0 +1,129 @@
+"""
+Importação de requisições em lote (ex.: planilha do sistema antigo).
+
+As linhas validadas por ``MaintenanceRequestImportSerializer`` são gravadas em
+uma única transação com ``bulk_create``: requisições, ligações com os
+equipamentos e histórico. Os efeitos de ``MaintenanceRequest.save`` são
+aplicados uma vez para o conjunto: índice de busca, análise, contadores do
+dashboard, carga dos técnicos e um único aviso à manutenção. O CSV aceito usa
+as colunas da exportação, então um arquivo exportado pode ser importado em
+outra base.
+"""
+import codecs
+import csv
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import dashboard
+from .export import unescape_formula
+from .models import (
+    Equipment, MaintenanceRequest, MaintenanceRollup, Notification, RequestHistory, TechnicianWorkload
+)
+from .search import get_search_backend
+from .transitions import OPEN_STATUSES
+
+BATCH_SIZE = 1000
+MAX_ROWS = 50000
+LIST_COLUMNS = ('equipamentos', 'equipamentos_impactados')
+
+
+def read_csv(file):
+    """Linhas do CSV como dicionários, sem as colunas vazias; listas vêm separadas por vírgula"""
+    for row in csv.DictReader(codecs.iterdecode(file, 'utf-8-sig')):
+        item = {key: unescape_formula(value) for key, value in row.items() if key and value}
+        for column in LIST_COLUMNS:
+            if column in item:
+                item[column] = [value.strip() for value in item[column].split(',') if value.strip()]
+        yield item
+
+
+def overwrite_timestamps(model, fields, rows):
+    """
+    Grava ``fields`` (tuplas de valores seguidas do pk) com um executemany.
+
+    ``bulk_create`` sempre preenche campos ``auto_now``/``auto_now_add`` com o
+    horário atual; ``bulk_update`` montaria um CASE por lote.
+    """
+    if not rows:
+        return
+    adapt = connection.ops.adapt_datetimefield_value
+    columns = ', '.join(f'{model._meta.get_field(name).column} = %s' for name in fields)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'UPDATE {model._meta.db_table} SET {columns} WHERE {model._meta.pk.column} = %s',
+            [[adapt(value) for value in row[:-1]] + [row[-1]] for row in rows],
+        )
+
+
+def import_requests(rows, user, history=True, notify=True):
+    """
+    Grava as linhas validadas e retorna as requisições criadas.
+
+    ``data_criacao`` das linhas é preservada e ``data_atualizacao`` passa a ser
+    o último horário conhecido da requisição. ``history`` e ``notify`` desligam
+    o histórico "IMPORTADA" e o aviso à manutenção (usado por ``seed_data``).
+    """
+    generic = {}
+    requests = []
+    machines = {}
+    created_at = []
+    today = timezone.localdate()
+    for row in rows:
+        row = dict(row)
+        equipamentos = list(row.pop('equipamentos', []))
+        tipos = {equipment.tipo for equipment in equipamentos}
+        for tipo in row.pop('equipamentos_impactados', []):
+            if tipo not in tipos:
+                if tipo not in generic:
+                    generic[tipo] = Equipment.objects.generic(tipo)
+                equipamentos.append(generic[tipo])
+                tipos.add(tipo)
+        created_at.append(row.pop('data_criacao', None))
+        request = MaintenanceRequest(**row)
+        request.score_urgency(today)
+        requests.append(request)
+        machines[id(request)] = equipamentos
+
+    with transaction.atomic():
+        MaintenanceRequest.objects.bulk_create(requests, batch_size=BATCH_SIZE)
+        machines = {request.pk: machines[id(request)] for request in requests}
+
+        dated = []
+        for request, data_criacao in zip(requests, created_at):
+            if data_criacao:
+                request.data_criacao = data_criacao
+                request.data_atualizacao = max(
+                    value for value in (data_criacao, request.hora_aceite, request.hora_inicio, request.hora_termino)
+                    if value
+                )
+                dated.append((request.data_criacao, request.data_atualizacao, request.pk))
+        overwrite_timestamps(MaintenanceRequest, ['data_criacao', 'data_atualizacao'], dated)
+
+        through = MaintenanceRequest.equipamentos.through
+        through.objects.bulk_create([
+            through(maintenancerequest_id=pk, equipment_id=equipment.pk)
+            for pk, equipamentos in machines.items() for equipment in equipamentos
+        ], batch_size=BATCH_SIZE)
+        if history:
+            RequestHistory.objects.bulk_create([
+                RequestHistory(request=request, usuario=user, acao='IMPORTADA', descricao='Requisição importada')
+                for request in requests
+            ], batch_size=BATCH_SIZE)
+
+        get_search_backend().index_many(requests)
+        MaintenanceRollup.objects.record_many(((request, True, True, True) for request in requests), machines)
+        TechnicianWorkload.objects.record_many(request.workload_move(True) for request in requests)
+
+        open_total = sum(request.status in OPEN_STATUSES for request in requests)
+        if notify and open_total:
+            Notification.objects.create(
+                perfil_destino='MANUTENCAO',
+                titulo='Requisições Importadas',
+                mensagem=f'{open_total} requisições em aberto foram importadas',
+            )
+        statuses = [(None, request.status) for request in requests]
+        transaction.on_commit(lambda: dashboard.record_status_changes(statuses))
+        for request in requests:
+            request._loaded_status = request.status
+    return requests
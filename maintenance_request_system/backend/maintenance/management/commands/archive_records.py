@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from maintenance import archive
+
+
+class Command(BaseCommand):
+    help = 'Move notificações lidas e histórico de requisições encerradas antigos para ARCHIVE_DIR (agendar diariamente)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--notification-days', type=int, default=None,
+                            help='Idade mínima das notificações lidas (padrão: NOTIFICATION_RETENTION_DAYS)')
+        parser.add_argument('--history-months', type=int, default=None,
+                            help='Meses desde o encerramento da requisição (padrão: HISTORY_RETENTION_MONTHS)')
+        parser.add_argument('--batch-size', type=int, default=archive.BATCH_SIZE,
+                            help='Linhas arquivadas e apagadas por transação')
+
+    def handle(self, *args, **options):
+        history, notifications = archive.archive_expired(
+            notification_days=options['notification_days'],
+            history_months=options['history_months'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{history} registros de histórico e {notifications} notificações arquivados'
+        ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from maintenance import thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Gera miniaturas de fotos e quadros de capa de vídeos dos anexos pendentes (agendar periodicamente)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Processos de renderização (padrão: número de CPUs)')
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Anexos lidos por lote')
+        parser.add_argument('--retry', action='store_true',
+                            help='Reprocessa também anexos com erro ou sem prévia')
+
+    def handle(self, *args, **options):
+        statuses = ('PENDENTE', 'ERRO', 'SEM_PREVIA') if options['retry'] else ('PENDENTE',)
+        totals = thumbnails.generate_pending(
+            workers=options['workers'], batch_size=options['batch_size'], statuses=statuses
+        )
+        summary = ', '.join(f'{status}={total}' for status, total in sorted(totals.items())) or 'nenhum anexo pendente'
+        self.stdout.write(self.style.SUCCESS(f'Miniaturas processadas: {summary}'))
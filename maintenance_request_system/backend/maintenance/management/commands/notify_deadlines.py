@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from maintenance import deadlines
+
+
+class Command(BaseCommand):
+    help = 'Cria os avisos de "Prazo Final Próximo" (agendar periodicamente ou rodar com --loop)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Janela em dias antes do prazo (padrão: DEADLINE_WARNING_DAYS)')
+        parser.add_argument('--loop', action='store_true',
+                            help='Continua em execução, repetindo a cada --interval segundos')
+        parser.add_argument('--interval', type=int, default=300,
+                            help='Intervalo entre execuções com --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            created = deadlines.notify_due_requests(window_days=options['days'])
+            self.stdout.write(self.style.SUCCESS(f'{created} avisos de prazo criados'))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
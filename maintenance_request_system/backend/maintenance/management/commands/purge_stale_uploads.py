@@ -0,0 +1,18 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from maintenance import uploads
+
+
+class Command(BaseCommand):
+    help = 'Descarta envios de anexos abandonados e seus arquivos temporários (agendar periodicamente)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24,
+                            help='Horas sem atividade para considerar o envio abandonado')
+
+    def handle(self, *args, **options):
+        removed = uploads.purge_stale(timezone.now() - timedelta(hours=options['hours']))
+        self.stdout.write(self.style.SUCCESS(f'{removed} envios abandonados descartados'))
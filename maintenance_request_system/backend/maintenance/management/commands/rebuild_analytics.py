@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from maintenance.models import MaintenanceRollup
+
+
+class Command(BaseCommand):
+    help = 'Recalcula as tabelas de análise (tempo de resposta e de reparo) a partir das requisições'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Requisições lidas por lote durante a varredura')
+
+    def handle(self, *args, **options):
+        rows = MaintenanceRollup.objects.rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'{rows} linhas de análise recalculadas'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from maintenance.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o índice de busca textual das requisições'
+
+    def handle(self, *args, **options):
+        get_search_backend().rebuild()
+        self.stdout.write(self.style.SUCCESS('Índice de busca reconstruído'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from maintenance.models import TechnicianWorkload
+
+
+class Command(BaseCommand):
+    help = 'Recalcula a carga dos técnicos (requisições ACEITA/EM_ATENDIMENTO) a partir das requisições'
+
+    def handle(self, *args, **options):
+        technicians = TechnicianWorkload.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Carga recalculada; {technicians} técnicos com requisições em andamento'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from maintenance import dashboard
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os contadores do dashboard em cache a partir do banco (agendar periodicamente)'
+
+    def handle(self, *args, **options):
+        counts = dashboard.reconcile()
+        summary = ', '.join(f'{code}={total}' for code, total in counts.items())
+        self.stdout.write(self.style.SUCCESS(f'Contadores do dashboard recalculados: {summary}'))
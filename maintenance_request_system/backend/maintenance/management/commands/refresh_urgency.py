@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from maintenance import urgency
+
+
+class Command(BaseCommand):
+    help = 'Atualiza a pontuação de urgência da fila conforme os prazos se aproximam (agendar diariamente ou usar --loop)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Continua em execução, repetindo a cada --interval segundos')
+        parser.add_argument('--interval', type=int, default=3600,
+                            help='Intervalo entre execuções com --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            changed = urgency.refresh_urgency()
+            self.stdout.write(self.style.SUCCESS(f'{changed} pontuações de urgência atualizadas'))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
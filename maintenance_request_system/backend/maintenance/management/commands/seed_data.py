@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from maintenance import seed
+
+
+class Command(BaseCommand):
+    help = 'Popula o banco com usuários, requisições, histórico, anexos e notificações sintéticos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100,
+                            help='Usuários criados (mínimo 4, um de cada perfil)')
+        parser.add_argument('--requests', type=int, default=5000,
+                            help='Requisições criadas')
+        parser.add_argument('--days', type=int, default=365,
+                            help='Período, em dias até hoje, das datas de criação')
+        parser.add_argument('--seed', type=int, default=42,
+                            help='Semente do gerador; a mesma semente gera os mesmos dados')
+        parser.add_argument('--batch-size', type=int, default=seed.BATCH_SIZE,
+                            help='Requisições gravadas por transação')
+
+    def handle(self, *args, **options):
+        if options['users'] < 4:
+            raise CommandError('Informe ao menos 4 usuários (um de cada perfil).')
+        totals = seed.seed(
+            users=options['users'], requests=options['requests'], days=options['days'],
+            seed=options['seed'], batch_size=options['batch_size'],
+        )
+        summary = ', '.join(f'{total} {name}' for name, total in totals.items())
+        self.stdout.write(self.style.SUCCESS(f'Dados gerados: {summary}'))
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('maintenance', '0002_alter_maintenancerequest_status_operacional'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='perfil_destino',
+            field=models.CharField(blank=True, choices=[('COMUM', 'Comum (Requisitante)'), ('MANUTENCAO', 'Manutenção (Recebe Chamado)'), ('GESTOR', 'Gestor (Analisa Dados)'), ('TI', 'T.I (Admin)')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='usuario',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.CreateModel(
+            name='NotificationReceipt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data_leitura', models.DateTimeField(auto_now_add=True)),
+                ('notification', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recibos', to='maintenance.notification')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='notificationreceipt',
+            constraint=models.UniqueConstraint(fields=('notification', 'usuario'), name='unique_notification_receipt'),
+        ),
+    ]
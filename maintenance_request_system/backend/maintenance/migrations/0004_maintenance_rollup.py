@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0003_broadcast_notifications'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaintenanceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimensao', models.CharField(choices=[('GERAL', 'Geral'), ('TIPO', 'Tipo de manutenção'), ('SETOR', 'Setor solicitante'), ('EQUIPAMENTO', 'Equipamento'), ('EQUIPAMENTO_TIPO', 'Equipamento e tipo de manutenção')], max_length=20)),
+                ('chave', models.CharField(blank=True, max_length=150)),
+                ('total_requisicoes', models.PositiveIntegerField(default=0)),
+                ('total_respondidas', models.PositiveIntegerField(default=0)),
+                ('soma_tempo_resposta', models.FloatField(default=0)),
+                ('total_reparos', models.PositiveIntegerField(default=0)),
+                ('soma_tempo_reparo', models.FloatField(default=0)),
+            ],
+            options={
+                'ordering': ['dimensao', 'chave'],
+            },
+        ),
+        migrations.AddField(
+            model_name='maintenancerequest',
+            name='hora_aceite',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='maintenancerollup',
+            constraint=models.UniqueConstraint(fields=('dimensao', 'chave'), name='unique_rollup_key'),
+        ),
+    ]
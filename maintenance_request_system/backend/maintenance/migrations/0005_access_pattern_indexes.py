@@ -0,0 +1,45 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0004_maintenance_rollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='maintenancerequest',
+            index=models.Index(fields=['-data_criacao', 'numero_requisicao'], name='req_criacao_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancerequest',
+            index=models.Index(fields=['status', '-data_criacao'], name='req_status_criacao_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancerequest',
+            index=models.Index(fields=['responsavel_manutencao', '-data_criacao'], name='req_resp_criacao_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancerequest',
+            index=models.Index(fields=['solicitante', '-data_criacao'], name='req_solic_criacao_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['usuario', 'lida', '-data_criacao'], name='notif_usuario_lida_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['usuario', '-data_criacao'], name='notif_usuario_criacao_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('usuario__isnull', True)), fields=['perfil_destino', '-data_criacao'], name='notif_broadcast_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requesthistory',
+            index=models.Index(fields=['request', '-data_acao'], name='hist_request_acao_idx'),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:11
+
+from django.db import migrations, models
+
+EQUIPMENT_TYPES = {
+    'PRENSA': 'Prensa',
+    'ROSQUEADEIRA': 'Rosqueadeira',
+    'RECORTADOR': 'Recortador',
+    'FRESA': 'Fresa',
+    'OUTROS': 'Outros',
+}
+BATCH_SIZE = 5000
+
+
+def copy_json_to_equipment(apps, schema_editor):
+    """Cria um equipamento genérico por código usado e liga as requisições a ele"""
+    Equipment = apps.get_model('maintenance', 'Equipment')
+    MaintenanceRequest = apps.get_model('maintenance', 'MaintenanceRequest')
+    Link = MaintenanceRequest.equipamentos.through
+
+    equipment_ids = {}
+    links = []
+    rows = MaintenanceRequest.objects.order_by().values_list('numero_requisicao', 'equipamentos_impactados')
+    for request_id, codes in rows.iterator(chunk_size=BATCH_SIZE):
+        for code in dict.fromkeys(codes or []):
+            if code not in equipment_ids:
+                equipment, _ = Equipment.objects.get_or_create(
+                    codigo=code,
+                    defaults={
+                        'nome': EQUIPMENT_TYPES.get(code, code),
+                        'tipo': code if code in EQUIPMENT_TYPES else 'OUTROS',
+                    },
+                )
+                equipment_ids[code] = equipment.pk
+            links.append(Link(maintenancerequest_id=request_id, equipment_id=equipment_ids[code]))
+        if len(links) >= BATCH_SIZE:
+            Link.objects.bulk_create(links, ignore_conflicts=True)
+            links = []
+    Link.objects.bulk_create(links, ignore_conflicts=True)
+
+
+def copy_equipment_to_json(apps, schema_editor):
+    MaintenanceRequest = apps.get_model('maintenance', 'MaintenanceRequest')
+    Link = MaintenanceRequest.equipamentos.through
+
+    codes = {}
+    for request_id, tipo in Link.objects.values_list('maintenancerequest_id', 'equipment__tipo').iterator():
+        codes.setdefault(request_id, []).append(tipo)
+    for request_id, tipos in codes.items():
+        MaintenanceRequest.objects.filter(pk=request_id).update(equipamentos_impactados=list(dict.fromkeys(tipos)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0005_access_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Equipment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('codigo', models.CharField(max_length=50, unique=True)),
+                ('nome', models.CharField(max_length=100)),
+                ('tipo', models.CharField(choices=[('PRENSA', 'Prensa'), ('ROSQUEADEIRA', 'Rosqueadeira'), ('RECORTADOR', 'Recortador'), ('FRESA', 'Fresa'), ('OUTROS', 'Outros')], max_length=20)),
+                ('setor', models.CharField(blank=True, max_length=100)),
+                ('ativo', models.BooleanField(default=True)),
+            ],
+            options={
+                'ordering': ['tipo', 'codigo'],
+            },
+        ),
+        migrations.AddField(
+            model_name='maintenancerequest',
+            name='equipamentos',
+            field=models.ManyToManyField(blank=True, related_name='requisicoes', to='maintenance.equipment'),
+        ),
+        migrations.RunPython(copy_json_to_equipment, copy_equipment_to_json),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0006_equipment_registry'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='maintenancerequest',
+            name='equipamentos_impactados',
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    from maintenance.search import SQLiteFTS5Backend
+
+    SQLiteFTS5Backend().rebuild()
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    from maintenance.search import SQLiteFTS5Backend
+
+    schema_editor.execute(f'DROP TABLE IF EXISTS {SQLiteFTS5Backend.table}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0007_remove_maintenancerequest_equipamentos_impactados'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
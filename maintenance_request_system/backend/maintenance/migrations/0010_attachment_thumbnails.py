@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0009_chunked_attachment_upload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='requestattachment',
+            name='miniatura',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='requestattachment',
+            name='miniatura_status',
+            field=models.CharField(choices=[('PENDENTE', 'Pendente'), ('PRONTA', 'Pronta'), ('SEM_PREVIA', 'Sem prévia'), ('ERRO', 'Erro')], default='PENDENTE', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='requestattachment',
+            index=models.Index(condition=models.Q(('miniatura_status', 'PENDENTE')), fields=['miniatura_status'], name='anexo_miniatura_pendente_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0010_attachment_thumbnails'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchedulerCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=50, unique=True)),
+                ('prazo_ate', models.DateField(blank=True, null=True)),
+                ('ultima_requisicao', models.BigIntegerField(default=0)),
+                ('data_atualizacao', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='chave',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancerequest',
+            index=models.Index(fields=['prazo_limite'], name='req_prazo_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(condition=models.Q(('chave', ''), _negated=True), fields=('chave',), name='unique_notification_chave'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0011_deadline_notifications'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='maintenancerequest',
+            name='arquivo_historico',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:56
+
+from django.db import migrations, models
+from django.utils import timezone
+
+# Pontuação de urgency.py na data desta migração
+QUEUE_STATUSES = ['ABERTA', 'VISUALIZADA', 'ACEITA', 'EM_ATENDIMENTO', 'PARADA']
+OPERATIONAL_POINTS = {'INOPERANTE': 300, 'PARCIAL': 100, 'FUNCIONANDO': 0}
+DEADLINE_POINTS = ((0, 400), (1, 300), (2, 200), (7, 100))
+BATCH_SIZE = 1000
+
+
+def score_open_requests(apps, schema_editor):
+    MaintenanceRequest = apps.get_model('maintenance', 'MaintenanceRequest')
+    today = timezone.localdate()
+    requests = MaintenanceRequest.objects.filter(status__in=QUEUE_STATUSES).only(
+        'prioridade', 'status_operacional', 'prazo_limite'
+    ).order_by('pk')
+    last_pk = 0
+    while True:
+        batch = list(requests.filter(pk__gt=last_pk)[:BATCH_SIZE])
+        if not batch:
+            return
+        for request in batch:
+            days = (request.prazo_limite - today).days
+            deadline = next((points for limit, points in DEADLINE_POINTS if days <= limit), 0)
+            request.urgencia = (
+                request.prioridade * 100 + OPERATIONAL_POINTS.get(request.status_operacional, 0) + deadline
+            )
+        MaintenanceRequest.objects.bulk_update(batch, ['urgencia'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0012_request_history_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='maintenancerequest',
+            name='urgencia',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancerequest',
+            index=models.Index(condition=models.Q(('urgencia__isnull', False)), fields=['-urgencia', 'numero_requisicao'], name='req_urgencia_idx'),
+        ),
+        migrations.RunPython(score_open_requests, migrations.RunPython.noop),
+    ]
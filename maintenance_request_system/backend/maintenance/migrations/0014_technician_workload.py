@@ -0,0 +1,50 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:01
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+WORKLOAD_STATUSES = ['ACEITA', 'EM_ATENDIMENTO']
+
+
+def count_workload(apps, schema_editor):
+    """Uma linha por técnico com as requisições ACEITA/EM_ATENDIMENTO que estão com ele"""
+    MaintenanceRequest = apps.get_model('maintenance', 'MaintenanceRequest')
+    TechnicianWorkload = apps.get_model('maintenance', 'TechnicianWorkload')
+    UserProfile = apps.get_model('maintenance', 'UserProfile')
+
+    counts = dict(MaintenanceRequest.objects.filter(
+        status__in=WORKLOAD_STATUSES, responsavel_manutencao__isnull=False
+    ).order_by().values_list('responsavel_manutencao').annotate(total=models.Count('pk')))
+    technicians = UserProfile.objects.filter(profile_type='MANUTENCAO').values_list('user_id', flat=True)
+    TechnicianWorkload.objects.bulk_create([
+        TechnicianWorkload(usuario_id=usuario_id, abertas=counts.get(usuario_id, 0))
+        for usuario_id in {*technicians, *counts}
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('maintenance', '0013_request_urgency'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TechnicianWorkload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('especialidade', models.CharField(blank=True, choices=[('ELETRICA', 'Elétrica'), ('MECANICA', 'Mecânica'), ('OUTROS', 'Outros')], max_length=20)),
+                ('disponivel', models.BooleanField(default=True)),
+                ('abertas', models.IntegerField(default=0)),
+                ('ultima_atribuicao', models.DateTimeField(blank=True, null=True)),
+                ('ultima_requisicao', models.BigIntegerField(db_index=True, default=0)),
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='carga', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['abertas', 'usuario'],
+            },
+        ),
+        migrations.RunPython(count_workload, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0014_technician_workload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedulercheckpoint',
+            name='alteracoes_desde',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
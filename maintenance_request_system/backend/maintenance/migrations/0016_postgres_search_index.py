@@ -0,0 +1,28 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    from maintenance.search import PostgresFullTextBackend
+
+    PostgresFullTextBackend().rebuild()
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    from maintenance.search import PostgresFullTextBackend
+
+    schema_editor.execute(f'DROP TABLE IF EXISTS {PostgresFullTextBackend.table}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0015_schedulercheckpoint_alteracoes_desde'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
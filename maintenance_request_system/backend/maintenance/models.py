@@ -1,4 +1,7 @@
-from django.db import models
+import uuid
+from collections import Counter
+
+from django.db import connection, models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 
@@ -19,6 +22,79 @@ class UserProfile(models.Model):
         return f"{self.user.username} - {self.get_profile_type_display()}"
 
 
+class EquipmentManager(models.Manager):
+    def generic(self, tipo):
+        """Equipamento genérico de um tipo, usado quando a máquina específica não é informada"""
+        equipment, _ = self.get_or_create(
+            codigo=tipo,
+            defaults={'nome': dict(Equipment.TYPE_CHOICES).get(tipo, tipo), 'tipo': tipo},
+        )
+        return equipment
+
+
+class Equipment(models.Model):
+    TYPE_CHOICES = [
+        ('PRENSA', 'Prensa'),
+        ('ROSQUEADEIRA', 'Rosqueadeira'),
+        ('RECORTADOR', 'Recortador'),
+        ('FRESA', 'Fresa'),
+        ('OUTROS', 'Outros'),
+    ]
+
+    codigo = models.CharField(max_length=50, unique=True)
+    nome = models.CharField(max_length=100)
+    tipo = models.CharField(max_length=20, choices=TYPE_CHOICES)
+    setor = models.CharField(max_length=100, blank=True)
+    ativo = models.BooleanField(default=True)
+
+    objects = EquipmentManager()
+
+    class Meta:
+        ordering = ['tipo', 'codigo']
+
+    def __str__(self):
+        return f"{self.codigo} - {self.nome}"
+
+
+class MaintenanceRequestQuerySet(models.QuerySet):
+    # Status em que a requisição aparece na fila da manutenção
+    QUEUE_STATUSES = ['ABERTA', 'VISUALIZADA', 'ACEITA', 'EM_ATENDIMENTO', 'PARADA']
+
+    def visible_to(self, user):
+        """Filtrar requisições baseado no perfil do usuário"""
+        # Check if user has a profile, otherwise default to a safe queryset
+        profile = getattr(user, 'userprofile', None)
+        if not profile or profile.profile_type == 'COMUM':
+            # Usuários comuns só veem suas próprias requisições
+            return self.filter(solicitante=user)
+        elif profile.profile_type == 'MANUTENCAO':
+            # Manutenção vê requisições abertas ou atribuídas a eles
+            return self.filter(
+                models.Q(status__in=self.QUEUE_STATUSES) |
+                models.Q(responsavel_manutencao=user)
+            )
+        # Gestores e TI veem todas
+        return self.all()
+
+    def touch(self):
+        """Avança ``data_atualizacao`` sem passar por ``save``: anexos e miniaturas entram nos ETags"""
+        return self.update(data_atualizacao=timezone.now())
+
+    def with_related(self, nested=('anexos', 'historico')):
+        """Carrega usuários e as relações aninhadas pedidas em número fixo de consultas"""
+        lookups = []
+        if 'anexos' in nested:
+            lookups.append('anexos')
+        if 'historico' in nested:
+            lookups.append(models.Prefetch(
+                'historico',
+                queryset=RequestHistory.objects.select_related('usuario')
+            ))
+        return self.select_related(
+            'solicitante', 'responsavel_manutencao'
+        ).prefetch_related('equipamentos', *lookups)
+
+
 class MaintenanceRequest(models.Model):
     STATUS_CHOICES = [
         ('ABERTA', 'Aberta'),
@@ -42,13 +118,12 @@ class MaintenanceRequest(models.Model):
         ('INOPERANTE', 'Inoperante'),
     ]
 
-    EQUIPMENT_CHOICES = [
-        ('PRENSA', 'Prensa'),
-        ('ROSQUEADEIRA', 'Rosqueadeira'),
-        ('RECORTADOR', 'Recortador'),
-        ('FRESA', 'Fresa'),
-        ('OUTROS', 'Outros'),
-    ]
+    EQUIPMENT_CHOICES = Equipment.TYPE_CHOICES
+
+    # Status a partir dos quais a requisição foi respondida pela manutenção
+    RESPONDED_STATUSES = ['ACEITA', 'EM_ATENDIMENTO', 'PARADA', 'CONCLUIDA']
+    # Status que contam na carga do responsável (TechnicianWorkload)
+    WORKLOAD_STATUSES = ['ACEITA', 'EM_ATENDIMENTO']
 
     # Campos automáticos
     numero_requisicao = models.AutoField(primary_key=True)
@@ -61,7 +136,7 @@ class MaintenanceRequest(models.Model):
     setor_solicitante = models.CharField(max_length=100)
     tipo_manutencao = models.CharField(max_length=20, choices=MAINTENANCE_TYPE_CHOICES)
     status_operacional = models.CharField(max_length=20, choices=OPERATIONAL_STATUS_CHOICES)
-    equipamentos_impactados = models.JSONField(default=list)  # Lista de equipamentos
+    equipamentos = models.ManyToManyField(Equipment, related_name='requisicoes', blank=True)
     outros_equipamentos = models.TextField(blank=True)
     titulo_curto = models.CharField(max_length=200)
     descricao_problema = models.TextField()
@@ -81,39 +156,306 @@ class MaintenanceRequest(models.Model):
         related_name='requisicoes_atendidas'
     )
     data_prevista_termino = models.DateField(null=True, blank=True)
+    hora_aceite = models.DateTimeField(null=True, blank=True)
     hora_inicio = models.DateTimeField(null=True, blank=True)
     hora_termino = models.DateTimeField(null=True, blank=True)
     descricao_manutencao = models.TextField(blank=True)
     materiais_utilizados = models.TextField(blank=True)
 
+    # Partição de ARCHIVE_DIR com o histórico já arquivado (ver archive.py)
+    arquivo_historico = models.CharField(max_length=100, blank=True)
+
+    # Pontuação da fila da manutenção, nula fora dos status em aberto (ver urgency.py)
+    urgencia = models.IntegerField(null=True, blank=True, editable=False)
+
+    objects = MaintenanceRequestQuerySet.as_manager()
+
     class Meta:
         ordering = ['-data_criacao']
+        indexes = [
+            # Listagem paginada (Gestor/TI) e ordenação padrão
+            models.Index(fields=['-data_criacao', 'numero_requisicao'], name='req_criacao_idx'),
+            # Fila da manutenção: status__in OR responsavel_manutencao
+            models.Index(fields=['status', '-data_criacao'], name='req_status_criacao_idx'),
+            models.Index(fields=['responsavel_manutencao', '-data_criacao'], name='req_resp_criacao_idx'),
+            # my_requests e perfil comum
+            models.Index(fields=['solicitante', '-data_criacao'], name='req_solic_criacao_idx'),
+            # Varredura por faixa do aviso de prazo (notify_deadlines)
+            models.Index(fields=['prazo_limite'], name='req_prazo_idx'),
+            # Fila por urgência (/api/requests/queue/); só as requisições em aberto
+            models.Index(
+                fields=['-urgencia', 'numero_requisicao'], name='req_urgencia_idx',
+                condition=models.Q(urgencia__isnull=False),
+            ),
+        ]
 
     def __str__(self):
         return f"Req #{self.numero_requisicao} - {self.titulo_curto}"
 
-    def save(self, *args, **kwargs):
+    @property
+    def equipamentos_impactados(self):
+        """Tipos dos equipamentos afetados (formato da antiga lista de códigos)"""
+        return list(dict.fromkeys(equipment.tipo for equipment in self.equipamentos.all()))
+
+    @property
+    def tempo_resposta(self):
+        """Segundos entre a abertura e a primeira resposta da manutenção"""
+        respondida = self.hora_aceite or self.hora_inicio
+        if not respondida:
+            return None
+        return (respondida - self.data_criacao).total_seconds()
+
+    @property
+    def tempo_reparo(self):
+        """Segundos entre o início e o término da manutenção"""
+        if not (self.hora_inicio and self.hora_termino):
+            return None
+        return (self.hora_termino - self.hora_inicio).total_seconds()
+
+    def rollup_keys(self, equipamentos=None):
+        """Chaves (dimensão, valor) das tabelas de análise afetadas por esta requisição"""
+        keys = [
+            ('GERAL', ''),
+            ('TIPO', self.tipo_manutencao),
+            ('SETOR', self.setor_solicitante),
+        ]
+        for equipment in self.equipamentos.all() if equipamentos is None else equipamentos:
+            keys.append(('EQUIPAMENTO', equipment.codigo))
+            keys.append(('EQUIPAMENTO_TIPO', f'{equipment.codigo}:{self.tipo_manutencao}'))
+        return keys
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Status carregado do banco, usado para manter os contadores do dashboard
+        loaded = dict(zip(field_names, (value for value in values if value is not models.DEFERRED)))
+        instance._loaded_status = loaded.get('status')
+        if 'status' in loaded and 'responsavel_manutencao_id' in loaded:
+            instance._workload_user_id = instance.workload_user_id()
+        return instance
+
+    def workload_user_id(self):
+        """Técnico cuja carga inclui esta requisição, se houver"""
+        return self.responsavel_manutencao_id if self.status in self.WORKLOAD_STATUSES else None
+
+    def workload_move(self, created):
+        """
+        (técnico anterior, técnico atual) na carga; sem mudança se o estado
+        anterior é desconhecido (instância não carregada do banco)
+        """
+        new = self.workload_user_id()
+        old = None if created else getattr(self, '_workload_user_id', new)
+        self._workload_user_id = new
+        return old, new
+
+    def stamp_times(self, now):
+        """Preenche hora_aceite/hora_inicio/hora_termino conforme o status; retorna (aceita, concluída)"""
+        # Registrar a primeira resposta da manutenção
+        accepted = self.status in self.RESPONDED_STATUSES and not self.hora_aceite
+        if accepted:
+            self.hora_aceite = now
+
         # Atualizar hora de início quando status muda para EM_ATENDIMENTO
         if self.status == 'EM_ATENDIMENTO' and not self.hora_inicio:
-            self.hora_inicio = timezone.now()
+            self.hora_inicio = now
 
         # Atualizar hora de término quando status muda para CONCLUIDA
-        if self.status == 'CONCLUIDA' and not self.hora_termino:
-            self.hora_termino = timezone.now()
+        completed = self.status == 'CONCLUIDA' and not self.hora_termino
+        if completed:
+            self.hora_termino = now
+        return accepted, completed
 
-        super().save(*args, **kwargs)
+    def score_urgency(self, today):
+        """Recalcula ``urgencia`` para a data ``today``"""
+        from . import urgency
+
+        self.urgencia = urgency.score(self.status, self.prioridade, self.status_operacional, self.prazo_limite, today)
+        return self.urgencia
+
+    def record_change(self, created, old_status, accepted=False, completed=False, reindex=True):
+        """Efeitos de uma gravação: índice de busca, análise, contadores e eventos (dentro da transação)"""
+        from . import dashboard, events
+        from .search import get_search_backend
+
+        if reindex:
+            get_search_backend().index(self)
+        MaintenanceRollup.objects.record(self, created=created, accepted=accepted, completed=completed)
+        TechnicianWorkload.objects.record_many([self.workload_move(created)])
+        if created or old_status:
+            new_status = self.status
+            transaction.on_commit(lambda: dashboard.record_status_change(old_status, new_status))
+            if old_status and old_status != new_status:
+                transaction.on_commit(lambda: events.publish_status_change(self, old_status))
+        else:
+            # Status anterior desconhecido (instância não carregada do banco)
+            transaction.on_commit(dashboard.reset)
+        self._loaded_status = self.status
+
+    def save(self, *args, equipamentos=None, **kwargs):
+        """``equipamentos`` define as máquinas afetadas na mesma transação do salvamento"""
+        created = self._state.adding
+        old_status = None if created else getattr(self, '_loaded_status', None)
+        now = timezone.now()
+        accepted, completed = self.stamp_times(now)
+        self.score_urgency(timezone.localdate(now))
+
+        if kwargs.get('update_fields') is not None:
+            # Campos preenchidos aqui e pelo auto_now também precisam ser gravados
+            kwargs['update_fields'] = {
+                *kwargs['update_fields'], 'data_atualizacao', 'hora_aceite', 'hora_inicio', 'hora_termino', 'urgencia'
+            }
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if equipamentos is not None:
+                self.equipamentos.set(equipamentos)
+            self.record_change(created, old_status, accepted, completed)
+
+    def delete(self, *args, **kwargs):
+        from . import dashboard
+        from .search import get_search_backend
+
+        old_status = getattr(self, '_loaded_status', None) or self.status
+        workload_user = getattr(self, '_workload_user_id', self.workload_user_id())
+        pk = self.pk
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            get_search_backend().remove(pk)
+            TechnicianWorkload.objects.record_many([(workload_user, None)])
+        transaction.on_commit(lambda: dashboard.record_status_change(old_status, None))
+        return result
+
+
+class TechnicianWorkloadManager(models.Manager):
+    def record_many(self, moves):
+        """
+        Aplica pares (técnico anterior, técnico atual) de requisições cuja carga
+        pode ter mudado; grava um UPDATE com F() por técnico afetado.
+        """
+        deltas = Counter()
+        for old, new in moves:
+            if old != new:
+                if old:
+                    deltas[old] -= 1
+                if new:
+                    deltas[new] += 1
+        for usuario_id, delta in deltas.items():
+            if delta:
+                row, _ = self.get_or_create(usuario_id=usuario_id)
+                self.filter(pk=row.pk).update(abertas=models.F('abertas') + delta)
+
+    def claim(self, request, now):
+        """
+        Soma ``request`` à carga do técnico disponível menos ocupado e retorna o
+        id dele (ou None), num único UPDATE.
+
+        Empates vão para quem tem a especialidade do ``tipo_manutencao`` e depois
+        para a atribuição mais antiga. A escolha e o incremento acontecem na mesma
+        instrução; no PostgreSQL, ``SKIP LOCKED`` faz criações simultâneas
+        escolherem técnicos diferentes em vez de esperarem pela mesma linha.
+        """
+        candidates = self.filter(disponivel=True, usuario__userprofile__profile_type='MANUTENCAO').annotate(
+            fora_da_especialidade=models.Case(
+                models.When(especialidade=request.tipo_manutencao, then=0), default=1
+            )
+        ).order_by('abertas', 'fora_da_especialidade', models.F('ultima_atribuicao').asc(nulls_first=True), 'pk')
+        if connection.features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True, of=('self',))
+        claimed = self.filter(pk=models.Subquery(candidates.values('pk')[:1])).update(
+            abertas=models.F('abertas') + 1, ultima_atribuicao=now, ultima_requisicao=request.pk
+        )
+        if not claimed:
+            return None
+        return self.filter(ultima_requisicao=request.pk).values_list('usuario_id', flat=True).first()
+
+    def rebuild(self):
+        """Recalcula as cargas a partir das requisições e cria as linhas que faltam"""
+        counts = dict(MaintenanceRequest.objects.filter(
+            status__in=MaintenanceRequest.WORKLOAD_STATUSES, responsavel_manutencao__isnull=False
+        ).order_by().values_list('responsavel_manutencao').annotate(total=models.Count('pk')))
+        technicians = UserProfile.objects.filter(profile_type='MANUTENCAO').values_list('user_id', flat=True)
+        with transaction.atomic():
+            existing = set(self.values_list('usuario_id', flat=True))
+            self.bulk_create([
+                self.model(usuario_id=usuario_id) for usuario_id in {*technicians, *counts} - existing
+            ])
+            self.exclude(usuario_id__in=counts).update(abertas=0)
+            for usuario_id, total in counts.items():
+                self.filter(usuario_id=usuario_id).update(abertas=total)
+        return len(counts)
+
+
+class TechnicianWorkload(models.Model):
+    """Carga de cada técnico (requisições ACEITA/EM_ATENDIMENTO), mantida a cada gravação"""
+    usuario = models.OneToOneField(User, on_delete=models.CASCADE, related_name='carga')
+    especialidade = models.CharField(
+        max_length=20, choices=MaintenanceRequest.MAINTENANCE_TYPE_CHOICES, blank=True
+    )
+    # Fora da atribuição automática (férias, afastamento)
+    disponivel = models.BooleanField(default=True)
+    abertas = models.IntegerField(default=0)
+    ultima_atribuicao = models.DateTimeField(null=True, blank=True)
+    # Requisição da última atribuição automática; identifica a linha escolhida por claim()
+    ultima_requisicao = models.BigIntegerField(default=0, db_index=True)
+
+    objects = TechnicianWorkloadManager()
+
+    class Meta:
+        ordering = ['abertas', 'usuario']
+
+    def __str__(self):
+        return f"{self.usuario.username} - {self.abertas} em andamento"
 
 
 class RequestAttachment(models.Model):
     request = models.ForeignKey(MaintenanceRequest, on_delete=models.CASCADE, related_name='anexos')
+    # Anexos enviados por /api/uploads/ apontam para anexos/sha256/..., compartilhado entre requisições
     arquivo = models.FileField(upload_to='anexos/')
     nome_original = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    tamanho = models.PositiveBigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True)
     data_upload = models.DateTimeField(auto_now_add=True)
 
+    PREVIEW_STATUS_CHOICES = [
+        ('PENDENTE', 'Pendente'),
+        ('PRONTA', 'Pronta'),
+        ('SEM_PREVIA', 'Sem prévia'),
+        ('ERRO', 'Erro'),
+    ]
+
+    # Miniatura (fotos) ou quadro de capa (vídeos), gerada pelo comando generate_thumbnails
+    miniatura = models.CharField(max_length=255, blank=True)
+    miniatura_status = models.CharField(max_length=20, choices=PREVIEW_STATUS_CHOICES, default='PENDENTE')
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['miniatura_status'], name='anexo_miniatura_pendente_idx',
+                condition=models.Q(miniatura_status='PENDENTE')
+            ),
+        ]
+
     def __str__(self):
         return f"Anexo - {self.nome_original}"
 
 
+class AttachmentUpload(models.Model):
+    """Envio de anexo em partes; ``recebido`` é o deslocamento a partir do qual o cliente retoma"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    request = models.ForeignKey(MaintenanceRequest, on_delete=models.CASCADE, related_name='envios')
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE)
+    nome_original = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    tamanho = models.PositiveBigIntegerField()
+    recebido = models.PositiveBigIntegerField(default=0)
+    data_criacao = models.DateTimeField(auto_now_add=True)
+    data_atualizacao = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Envio - {self.nome_original} ({self.recebido}/{self.tamanho})"
+
+
 class RequestHistory(models.Model):
     request = models.ForeignKey(MaintenanceRequest, on_delete=models.CASCADE, related_name='historico')
     usuario = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -123,21 +465,214 @@ class RequestHistory(models.Model):
 
     class Meta:
         ordering = ['-data_acao']
+        indexes = [
+            models.Index(fields=['request', '-data_acao'], name='hist_request_acao_idx'),
+        ]
 
     def __str__(self):
         return f"{self.request.numero_requisicao} - {self.acao} - {self.usuario.username}"
 
 
+class NotificationQuerySet(models.QuerySet):
+    def for_user(self, user):
+        """
+        Notificações diretas do usuário e avisos enviados ao seu perfil.
+
+        ``lida_usuario`` indica a leitura pelo usuário: o campo ``lida`` nas
+        diretas e a existência de um recibo nas enviadas ao perfil.
+        """
+        audience = models.Q(usuario=user)
+        profile = getattr(user, 'userprofile', None)
+        if profile:
+            audience |= models.Q(
+                usuario__isnull=True,
+                perfil_destino=profile.profile_type,
+                data_criacao__gte=user.date_joined,
+            )
+        read_receipt = models.Exists(
+            NotificationReceipt.objects.filter(notification=models.OuterRef('pk'), usuario=user)
+        )
+        return self.filter(audience).annotate(
+            lida_usuario=models.Case(
+                models.When(usuario__isnull=True, then=read_receipt),
+                default=models.F('lida'),
+                output_field=models.BooleanField(),
+            )
+        )
+
+
 class Notification(models.Model):
-    usuario = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Notificações diretas têm ``usuario``; avisos ao perfil têm ``perfil_destino``
+    # e uma única linha por evento, com leitura registrada em NotificationReceipt.
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    perfil_destino = models.CharField(max_length=20, choices=UserProfile.PROFILE_CHOICES, blank=True)
     titulo = models.CharField(max_length=200)
     mensagem = models.TextField()
     request = models.ForeignKey(MaintenanceRequest, on_delete=models.CASCADE, null=True, blank=True)
     lida = models.BooleanField(default=False)
     data_criacao = models.DateTimeField(auto_now_add=True)
+    # Identifica notificações geradas por rotinas (ex.: aviso de prazo) para não duplicá-las
+    chave = models.CharField(max_length=100, blank=True)
+
+    objects = NotificationQuerySet.as_manager()
 
     class Meta:
         ordering = ['-data_criacao']
+        indexes = [
+            models.Index(fields=['usuario', 'lida', '-data_criacao'], name='notif_usuario_lida_idx'),
+            models.Index(fields=['usuario', '-data_criacao'], name='notif_usuario_criacao_idx'),
+            # Avisos enviados ao perfil (usuario nulo)
+            models.Index(
+                fields=['perfil_destino', '-data_criacao'],
+                name='notif_broadcast_idx',
+                condition=models.Q(usuario__isnull=True),
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['chave'], condition=~models.Q(chave=''), name='unique_notification_chave'),
+        ]
+
+    def __str__(self):
+        destino = self.usuario.username if self.usuario_id else self.get_perfil_destino_display()
+        return f"{self.titulo} - {destino}"
+
+    def save(self, *args, **kwargs):
+        from . import events, unread
+
+        created = self._state.adding
+        super().save(*args, **kwargs)
+        if created:
+            transaction.on_commit(lambda: unread.record_created(self))
+            transaction.on_commit(lambda: events.publish_notification(self))
+
+    @property
+    def is_broadcast(self):
+        return self.usuario_id is None
+
+
+class NotificationReceipt(models.Model):
+    notification = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name='recibos')
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE)
+    data_leitura = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['notification', 'usuario'], name='unique_notification_receipt'),
+        ]
+
+    def __str__(self):
+        return f"{self.notification.titulo} - lida por {self.usuario.username}"
+
+
+class MaintenanceRollupManager(models.Manager):
+    def record(self, request, created=False, accepted=False, completed=False):
+        """Atualiza de forma incremental as linhas de análise de uma requisição"""
+        self.record_many([(request, created, accepted, completed)])
+
+    def record_many(self, changes, equipamentos=None):
+        """
+        Soma as mudanças de várias requisições e grava um UPDATE por linha afetada.
+
+        ``changes`` traz tuplas (requisição, criada, aceita, concluída);
+        ``equipamentos`` opcionalmente mapeia o pk da requisição às suas
+        máquinas, evitando uma consulta por requisição.
+        """
+        totals = {}
+        for request, created, accepted, completed in changes:
+            delta = Counter()
+            if created:
+                delta['total_requisicoes'] += 1
+            if accepted and request.tempo_resposta is not None:
+                delta['total_respondidas'] += 1
+                delta['soma_tempo_resposta'] += request.tempo_resposta
+            if completed and request.tempo_reparo is not None:
+                delta['total_reparos'] += 1
+                delta['soma_tempo_reparo'] += request.tempo_reparo
+            if not delta:
+                continue
+            for key in request.rollup_keys(None if equipamentos is None else equipamentos[request.pk]):
+                totals.setdefault(key, Counter()).update(delta)
+
+        for (dimensao, chave), delta in totals.items():
+            rollup, _ = self.get_or_create(dimensao=dimensao, chave=chave)
+            self.filter(pk=rollup.pk).update(**{field: models.F(field) + value for field, value in delta.items()})
+
+    def rebuild(self, chunk_size=2000):
+        """Recalcula todas as linhas a partir das requisições (uma varredura)"""
+        totals = {}
+        requests = MaintenanceRequest.objects.order_by().only(
+            'data_criacao', 'setor_solicitante', 'tipo_manutencao',
+            'hora_aceite', 'hora_inicio', 'hora_termino',
+        ).prefetch_related(models.Prefetch('equipamentos', queryset=Equipment.objects.only('codigo')))
+        for request in requests.iterator(chunk_size=chunk_size):
+            tempo_resposta = request.tempo_resposta
+            tempo_reparo = request.tempo_reparo
+            for key in request.rollup_keys():
+                row = totals.setdefault(key, self.model(dimensao=key[0], chave=key[1]))
+                row.total_requisicoes += 1
+                if tempo_resposta is not None:
+                    row.total_respondidas += 1
+                    row.soma_tempo_resposta += tempo_resposta
+                if tempo_reparo is not None:
+                    row.total_reparos += 1
+                    row.soma_tempo_reparo += tempo_reparo
+
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(totals.values(), batch_size=500)
+        return len(totals)
+
+
+class MaintenanceRollup(models.Model):
+    """Totais pré-agregados para os dados de análise, mantidos a cada mudança de status"""
+    DIMENSION_CHOICES = [
+        ('GERAL', 'Geral'),
+        ('TIPO', 'Tipo de manutenção'),
+        ('SETOR', 'Setor solicitante'),
+        ('EQUIPAMENTO', 'Equipamento'),
+        ('EQUIPAMENTO_TIPO', 'Equipamento e tipo de manutenção'),
+    ]
+
+    dimensao = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    chave = models.CharField(max_length=150, blank=True)
+    total_requisicoes = models.PositiveIntegerField(default=0)
+    total_respondidas = models.PositiveIntegerField(default=0)
+    soma_tempo_resposta = models.FloatField(default=0)  # segundos
+    total_reparos = models.PositiveIntegerField(default=0)
+    soma_tempo_reparo = models.FloatField(default=0)  # segundos
+
+    objects = MaintenanceRollupManager()
+
+    class Meta:
+        ordering = ['dimensao', 'chave']
+        constraints = [
+            models.UniqueConstraint(fields=['dimensao', 'chave'], name='unique_rollup_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_dimensao_display()} - {self.chave or 'todas'}"
+
+    @property
+    def tempo_medio_resposta(self):
+        if not self.total_respondidas:
+            return None
+        return self.soma_tempo_resposta / self.total_respondidas
+
+    @property
+    def tempo_medio_reparo(self):
+        if not self.total_reparos:
+            return None
+        return self.soma_tempo_reparo / self.total_reparos
+
+
+class SchedulerCheckpoint(models.Model):
+    """Marca d'água das rotinas periódicas: até onde a última execução já processou"""
+    nome = models.CharField(max_length=50, unique=True)
+    prazo_ate = models.DateField(null=True, blank=True)
+    ultima_requisicao = models.BigIntegerField(default=0)
+    # Início da última execução: requisições alteradas depois dele são revistas
+    alteracoes_desde = models.DateTimeField(null=True, blank=True)
+    data_atualizacao = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"{self.titulo} - {self.usuario.username}"
+        return f"{self.nome} - {self.prazo_ate}"
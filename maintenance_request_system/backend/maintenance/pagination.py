@@ -0,0 +1,33 @@
+from rest_framework.pagination import CursorPagination
+
+
+class ViewConfigurableCursorPagination(CursorPagination):
+    """
+    Cursor (keyset) pagination whose page size cap can be overridden per view.
+
+    Views may define ``max_page_size`` to change the cap applied to the
+    ``page_size`` query parameter.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.max_page_size = getattr(view, 'max_page_size', self.max_page_size)
+        return super().paginate_queryset(queryset, request, view)
+
+
+class MaintenanceRequestPagination(ViewConfigurableCursorPagination):
+    ordering = ('-data_criacao', 'numero_requisicao')
+
+
+class QueuePagination(ViewConfigurableCursorPagination):
+    ordering = ('-urgencia', 'numero_requisicao')
+
+
+class NotificationPagination(ViewConfigurableCursorPagination):
+    ordering = ('-data_criacao', 'id')
+
+
+class RequestHistoryPagination(ViewConfigurableCursorPagination):
+    ordering = ('-data_acao', 'id')
@@ -1,5 +1,11 @@
 from rest_framework import permissions
-from .models import UserProfile
+
+
+def get_profile_type(user):
+    """Profile type from the profile loaded with the user (cached by CachedTokenAuthentication)"""
+    profile = getattr(user, 'userprofile', None)
+    return profile.profile_type if profile else None
+
 
 class IsAdminOrReadOnly(permissions.BasePermission):
     """
@@ -20,7 +26,7 @@ class IsOwnerOrAssignedOrAdmin(permissions.BasePermission):
             return True
 
         # Check if the user is the creator or the person responsible for maintenance
-        return obj.solicitante == request.user or obj.responsavel_manutencao == request.user
+        return request.user.pk in (obj.solicitante_id, obj.responsavel_manutencao_id)
 
 class IsMaintenanceUser(permissions.BasePermission):
     """
@@ -29,11 +35,7 @@ class IsMaintenanceUser(permissions.BasePermission):
     def has_permission(self, request, view):
         if not request.user or not request.user.is_authenticated:
             return False
-        try:
-            profile = request.user.userprofile
-            return profile.profile_type in ['MANUTENCAO', 'TI']
-        except UserProfile.DoesNotExist:
-            return False
+        return get_profile_type(request.user) in ['MANUTENCAO', 'TI']
 
 class IsAdminUser(permissions.BasePermission):
     """
@@ -42,8 +44,13 @@ class IsAdminUser(permissions.BasePermission):
     def has_permission(self, request, view):
         if not request.user or not request.user.is_authenticated:
             return False
-        try:
-            profile = request.user.userprofile
-            return profile.profile_type == 'TI'
-        except UserProfile.DoesNotExist:
+        return get_profile_type(request.user) == 'TI'
+
+class IsManagerUser(permissions.BasePermission):
+    """
+    Allows access only to users with the 'GESTOR' or 'TI' profile.
+    """
+    def has_permission(self, request, view):
+        if not request.user or not request.user.is_authenticated:
             return False
+        return get_profile_type(request.user) in ['GESTOR', 'TI']
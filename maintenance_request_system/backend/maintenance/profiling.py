@@ -0,0 +1,255 @@
+"""
+Perfil de cada requisição: consultas, tempo de banco, autenticação/permissões,
+serialização e tempo total por view.
+
+``ProfilingMiddleware`` abre um perfil por requisição e o devolve no cabeçalho
+``Server-Timing`` (visível na aba Rede do navegador). As consultas são medidas
+por um ``execute_wrapper`` instalado em cada conexão; como o perfil vive num
+``ContextVar``, a medição também funciona sob ASGI, em que as views síncronas
+rodam em outra thread. ``ProfiledViewMixin`` separa, nas views do DRF, o tempo
+de ``initial()`` (autenticação, permissões) do restante; a serialização é o
+tempo de Python da view e da renderização, fora do banco.
+
+Os tempos são agregados em histogramas na memória do processo e expostos em
+``/metrics`` no formato texto do Prometheus. Cada processo tem os próprios
+histogramas: com vários workers, cada um deve ser coletado separadamente.
+Consultas acima de ``SLOW_QUERY_THRESHOLD_MS`` são registradas no log
+``maintenance.profiling`` com o nome da view.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SLOW_QUERY_SQL_LENGTH = 1000
+UNRESOLVED_VIEW = 'nao_resolvida'
+
+_current = ContextVar('maintenance_profile', default=None)
+
+
+class Profile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view = UNRESOLVED_VIEW
+        self.queries = 0
+        self.db_time = 0.0
+        self.auth_time = 0.0
+        # (instante, tempo de banco acumulado) ao fim de initial() e ao fim da view
+        self.handler_start = None
+        self.handler_end = None
+
+    def mark(self):
+        return time.perf_counter(), self.db_time
+
+    def timings(self, finished):
+        """Durações em segundos: total, db, auth e serializacao"""
+        timings = {'total': finished - self.started, 'db': self.db_time, 'auth': self.auth_time}
+        if self.handler_start and self.handler_end:
+            handler = self.handler_end[0] - self.handler_start[0]
+            handler_db = self.handler_end[1] - self.handler_start[1]
+            timings['serializacao'] = max(handler - handler_db, 0) + finished - self.handler_end[0]
+        return timings
+
+
+def record_query(execute, sql, params, many, context):
+    """``execute_wrapper`` das conexões: soma as consultas ao perfil da requisição atual"""
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        profile = _current.get()
+        if profile is not None:
+            profile.queries += 1
+            profile.db_time += elapsed
+        if elapsed * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+            logger.warning(
+                'Consulta lenta (%.0f ms) em %s: %s', elapsed * 1000,
+                profile.view if profile else '-', sql[:SLOW_QUERY_SQL_LENGTH],
+            )
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """Handler de ``connection_created``; conexões reabertas reaproveitam o mesmo objeto"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+
+
+class Registry:
+    """Histogramas e contadores por (métrica, rótulos), compartilhados pelas threads do processo"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+
+    def observe(self, name, labels, value, buckets=SECONDS_BUCKETS):
+        with self._lock:
+            key = (name, labels)
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(buckets)
+            self.histograms[key].observe(value)
+
+    def increment(self, name, labels):
+        with self._lock:
+            key = (name, labels)
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            histograms = {key: (list(item.counts), item.total, item.buckets) for key, item in self.histograms.items()}
+            return histograms, dict(self.counters)
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+
+registry = Registry()
+
+METRICS = {
+    'maintenance_http_request_duration_seconds': ('histogram', 'Tempo total da requisição'),
+    'maintenance_http_request_db_seconds': ('histogram', 'Tempo gasto em consultas ao banco'),
+    'maintenance_http_request_auth_seconds': ('histogram', 'Tempo de autenticação e permissões (DRF)'),
+    'maintenance_http_request_serialization_seconds': (
+        'histogram', 'Tempo de Python da view e da renderização, fora do banco'
+    ),
+    'maintenance_http_request_queries': ('histogram', 'Consultas ao banco por requisição'),
+    'maintenance_http_responses_total': ('counter', 'Respostas por view, método e status'),
+}
+TIMING_METRICS = {
+    'total': 'maintenance_http_request_duration_seconds',
+    'db': 'maintenance_http_request_db_seconds',
+    'auth': 'maintenance_http_request_auth_seconds',
+    'serializacao': 'maintenance_http_request_serialization_seconds',
+}
+
+
+def record(profile, method, status_code, timings):
+    labels = (('view', profile.view), ('method', method))
+    for key, value in timings.items():
+        registry.observe(TIMING_METRICS[key], labels, value)
+    registry.observe('maintenance_http_request_queries', labels, profile.queries, QUERY_BUCKETS)
+    registry.increment('maintenance_http_responses_total', (*labels, ('status', str(status_code))))
+
+
+def server_timing(profile, timings):
+    entries = [f'db;dur={timings["db"] * 1000:.1f};desc="{profile.queries} consultas"']
+    for key in ('auth', 'serializacao', 'total'):
+        if key in timings:
+            entries.append(f'{key};dur={timings[key] * 1000:.1f}')
+    return ', '.join(entries)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, **extra):
+    pairs = [*labels, *extra.items()]
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}' if pairs else ''
+
+
+def render_metrics():
+    """Métricas no formato texto de exposição do Prometheus (0.0.4)"""
+    histograms, counters = registry.snapshot()
+    lines = []
+    for name, (kind, description) in METRICS.items():
+        lines += [f'# HELP {name} {description}', f'# TYPE {name} {kind}']
+        if kind == 'counter':
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{_labels(labels)} {value}')
+            continue
+        for (metric, labels), (counts, total, buckets) in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip((*buckets, '+Inf'), counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(labels, le=bound)} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {total}')
+            lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+class ProfilingMiddleware:
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile = Profile()
+        token = _current.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, profile)
+
+    async def __acall__(self, request):
+        profile = Profile()
+        token = _current.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, profile)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = _current.get()
+        if profile is not None and request.resolver_match:
+            profile.view = request.resolver_match.view_name or request.resolver_match._func_path
+
+    def finish(self, request, response, profile):
+        timings = profile.timings(time.perf_counter())
+        record(profile, request.method, response.status_code, timings)
+        response['Server-Timing'] = server_timing(profile, timings)
+        return response
+
+
+class ProfiledViewMixin:
+    """Mede, nas views do DRF, ``initial()`` (autenticação e permissões) e o fim da view"""
+
+    def initial(self, request, *args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return super().initial(request, *args, **kwargs)
+        started = time.perf_counter()
+        try:
+            super().initial(request, *args, **kwargs)
+        finally:
+            profile.auth_time += time.perf_counter() - started
+            profile.handler_start = profile.mark()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        profile = _current.get()
+        if profile is not None:
+            profile.handler_end = profile.mark()
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,184 @@
+"""
+Busca textual em requisições.
+
+O backend padrão depende do banco: SQLite usa uma tabela virtual FTS5
+(``maintenance_request_fts``) mantida em sincronia por ``MaintenanceRequest.save``
+e ``delete``; PostgreSQL usa uma tabela de ``tsvector`` com índice GIN,
+mantida do mesmo modo. ``MAINTENANCE_SEARCH_BACKEND`` nas settings permite
+indicar outra classe.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+SEARCH_FIELDS = ['titulo_curto', 'descricao_problema', 'descricao_manutencao', 'materiais_utilizados']
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class SearchBackend:
+    """Interface dos backends de busca"""
+
+    def index(self, request):
+        """Inclui ou atualiza a requisição no índice"""
+
+    def index_many(self, requests):
+        """Inclui ou atualiza várias requisições (importações e operações em lote)"""
+        for request in requests:
+            self.index(request)
+
+    def remove(self, pk):
+        """Remove a requisição do índice"""
+
+    def rebuild(self):
+        """Reconstrói o índice a partir da tabela de requisições"""
+
+    def search(self, queryset, text, limit=None):
+        """Retorna os ids de ``queryset`` que casam com ``text``, do mais ao menos relevante"""
+        raise NotImplementedError
+
+
+class SQLiteFTS5Backend(SearchBackend):
+    table = 'maintenance_request_fts'
+
+    def create_table(self, cursor):
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5("
+            f"{', '.join(SEARCH_FIELDS)}, tokenize='unicode61 remove_diacritics 2')"
+        )
+
+    def index(self, request):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [request.pk])
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, {', '.join(SEARCH_FIELDS)}) "
+                f"VALUES (%s, {', '.join(['%s'] * len(SEARCH_FIELDS))})",
+                [request.pk] + [getattr(request, field) for field in SEARCH_FIELDS],
+            )
+
+    def index_many(self, requests):
+        rows = [[request.pk] + [getattr(request, field) for field in SEARCH_FIELDS] for request in requests]
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [row[:1] for row in rows])
+            cursor.executemany(
+                f"INSERT INTO {self.table} (rowid, {', '.join(SEARCH_FIELDS)}) "
+                f"VALUES (%s, {', '.join(['%s'] * len(SEARCH_FIELDS))})",
+                rows,
+            )
+
+    def remove(self, pk):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [pk])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            self.create_table(cursor)
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, {', '.join(SEARCH_FIELDS)}) "
+                f"SELECT numero_requisicao, {', '.join(SEARCH_FIELDS)} FROM maintenance_maintenancerequest"
+            )
+
+    @staticmethod
+    def match_expression(text):
+        """Cada palavra vira um prefixo entre aspas, o que neutraliza a sintaxe do FTS5"""
+        return ' '.join(f'"{token}"*' for token in TOKEN_RE.findall(text))
+
+    def search(self, queryset, text, limit=None):
+        expression = self.match_expression(text)
+        if not expression:
+            return []
+        visible_sql, visible_params = queryset.order_by().values('pk').query.sql_with_params()
+        sql = (
+            f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s '
+            f'AND rowid IN ({visible_sql}) ORDER BY rank'
+        )
+        params = [expression, *visible_params]
+        if limit:
+            sql += ' LIMIT %s'
+            params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresFullTextBackend(SearchBackend):
+    """
+    Tabela ``maintenance_request_tsv`` com o ``tsvector`` de cada requisição e
+    índice GIN, mantida como a tabela FTS5 do SQLite.
+    """
+    table = 'maintenance_request_tsv'
+    config = 'portuguese'
+
+    @property
+    def document(self):
+        placeholders = ', '.join(['%s::text'] * len(SEARCH_FIELDS))
+        return f"to_tsvector(%s::regconfig, concat_ws(' ', {placeholders}))"
+
+    def create_table(self, cursor):
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {self.table} (request_id bigint PRIMARY KEY, documento tsvector NOT NULL)'
+        )
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {self.table}_gin ON {self.table} USING gin (documento)')
+
+    def row(self, request):
+        return [request.pk, self.config, *(getattr(request, field) for field in SEARCH_FIELDS)]
+
+    def index(self, request):
+        self.index_many([request])
+
+    def index_many(self, requests):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {self.table} (request_id, documento) VALUES (%s, {self.document}) '
+                f'ON CONFLICT (request_id) DO UPDATE SET documento = EXCLUDED.documento',
+                [self.row(request) for request in requests],
+            )
+
+    def remove(self, pk):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE request_id = %s', [pk])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            self.create_table(cursor)
+            cursor.execute(f'TRUNCATE {self.table}')
+            cursor.execute(
+                f"INSERT INTO {self.table} (request_id, documento) "
+                f"SELECT numero_requisicao, to_tsvector(%s::regconfig, concat_ws(' ', {', '.join(SEARCH_FIELDS)})) "
+                f"FROM maintenance_maintenancerequest",
+                [self.config],
+            )
+
+    @staticmethod
+    def match_expression(text):
+        """Prefixo de cada palavra unido por ``&``; as palavras de ``TOKEN_RE`` não trazem operadores do tsquery"""
+        return ' & '.join(f'{token}:*' for token in TOKEN_RE.findall(text))
+
+    def search(self, queryset, text, limit=None):
+        expression = self.match_expression(text)
+        if not expression:
+            return []
+        visible_sql, visible_params = queryset.order_by().values('pk').query.sql_with_params()
+        sql = (
+            f'SELECT request_id FROM {self.table}, to_tsquery(%s::regconfig, %s) AS consulta '
+            f'WHERE documento @@ consulta AND request_id IN ({visible_sql}) '
+            f'ORDER BY ts_rank(documento, consulta) DESC, request_id'
+        )
+        params = [self.config, expression, *visible_params]
+        if limit:
+            sql += ' LIMIT %s'
+            params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
+
+
+def get_search_backend():
+    path = getattr(settings, 'MAINTENANCE_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    if connection.vendor == 'postgresql':
+        return PostgresFullTextBackend()
+    return SQLiteFTS5Backend()
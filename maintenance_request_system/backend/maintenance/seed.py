@@ -0,0 +1,237 @@
+"""
+Massa de dados sintética para testes de carga e benchmarks (comando ``seed_data``).
+
+Gera usuários dos quatro perfis, um parque de equipamentos e requisições com
+uma distribuição de status próxima da produção: horários coerentes (aceite,
+início, término), histórico de cada passo do fluxo, metadados de anexos e
+notificações com leituras. As requisições passam por
+``imports.import_requests``, de modo que índice de busca, análise e
+contadores do dashboard ficam consistentes. Com a mesma semente, a mesma
+chamada gera sempre os mesmos dados.
+"""
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .imports import import_requests, overwrite_timestamps
+from .models import (
+    Equipment, Notification, NotificationReceipt, RequestAttachment, RequestHistory, TechnicianWorkload, UserProfile
+)
+from .transitions import OPEN_STATUSES
+
+USERNAME_PREFIX = 'carga'
+BATCH_SIZE = 2000
+PROFILE_WEIGHTS = {'COMUM': 80, 'MANUTENCAO': 15, 'GESTOR': 4, 'TI': 1}
+STATUS_WEIGHTS = {
+    'CONCLUIDA': 70, 'CANCELADA': 8, 'ABERTA': 8, 'VISUALIZADA': 3,
+    'ACEITA': 4, 'EM_ATENDIMENTO': 5, 'PARADA': 2,
+}
+# Passos do fluxo a partir de ABERTA até cada status
+STATUS_PATHS = {
+    'ABERTA': [],
+    'VISUALIZADA': ['VISUALIZADA'],
+    'ACEITA': ['VISUALIZADA', 'ACEITA'],
+    'EM_ATENDIMENTO': ['VISUALIZADA', 'ACEITA', 'EM_ATENDIMENTO'],
+    'PARADA': ['VISUALIZADA', 'ACEITA', 'EM_ATENDIMENTO', 'PARADA'],
+    'CONCLUIDA': ['VISUALIZADA', 'ACEITA', 'EM_ATENDIMENTO', 'CONCLUIDA'],
+    'CANCELADA': ['CANCELADA'],
+}
+# Intervalo (minutos) entre o passo anterior e cada status
+STEP_MINUTES = {
+    'VISUALIZADA': (2, 120), 'ACEITA': (5, 480), 'EM_ATENDIMENTO': (10, 1440),
+    'PARADA': (30, 600), 'CONCLUIDA': (30, 2880), 'CANCELADA': (10, 4320),
+}
+SECTORS = ['Produção', 'Estamparia', 'Usinagem', 'Montagem', 'Ferramentaria', 'Logística']
+PROBLEMS = [
+    ('Vazamento de óleo', 'Vazamento de óleo hidráulico na base da máquina'),
+    ('Ruído no motor', 'Ruído anormal no motor principal durante o ciclo'),
+    ('Painel sem energia', 'Painel elétrico desarmando ao ligar a máquina'),
+    ('Sensor de segurança', 'Cortina de luz não libera o ciclo'),
+    ('Ferramenta quebrada', 'Ferramenta quebrou durante a produção'),
+    ('Superaquecimento', 'Temperatura do cabeçote acima do normal'),
+    ('Correia gasta', 'Correia de transmissão patinando'),
+    ('Falha no CLP', 'CLP apresenta alarme de comunicação'),
+]
+MACHINES_PER_TYPE = 4
+SPECIALTIES = ['ELETRICA', 'MECANICA', 'MECANICA', '']
+
+
+def create_users(total, rng, joined):
+    """Cria ``total`` usuários; os quatro primeiros cobrem todos os perfis"""
+    offset = User.objects.filter(username__startswith=USERNAME_PREFIX).count()
+    profiles = list(PROFILE_WEIGHTS)[:total]
+    profiles += rng.choices(list(PROFILE_WEIGHTS), list(PROFILE_WEIGHTS.values()), k=total - len(profiles))
+    password = make_password(None)
+    users = User.objects.bulk_create([
+        User(username=f'{USERNAME_PREFIX}{offset + index:06d}', password=password, date_joined=joined)
+        for index in range(total)
+    ], batch_size=BATCH_SIZE)
+    user_profiles = UserProfile.objects.bulk_create([
+        UserProfile(user=user, profile_type=profile, setor=rng.choice(SECTORS))
+        for user, profile in zip(users, profiles)
+    ], batch_size=BATCH_SIZE)
+    by_profile = {profile: [] for profile in PROFILE_WEIGHTS}
+    for user, profile in zip(users, user_profiles):
+        user.userprofile = profile
+        by_profile[profile.profile_type].append(user)
+    # bulk_create não dispara o sinal que cria a carga dos técnicos
+    TechnicianWorkload.objects.bulk_create([
+        TechnicianWorkload(usuario=user, especialidade=rng.choice(SPECIALTIES))
+        for user in by_profile['MANUTENCAO']
+    ])
+    return by_profile
+
+
+def create_equipment():
+    machines = []
+    for tipo, nome in Equipment.TYPE_CHOICES:
+        for index in range(1, MACHINES_PER_TYPE + 1):
+            equipment, _ = Equipment.objects.get_or_create(
+                codigo=f'{tipo}-{index:02d}', defaults={'nome': f'{nome} {index}', 'tipo': tipo}
+            )
+            machines.append(equipment)
+    return machines
+
+
+def plan_request(rng, now, days, requesters, technicians, machines):
+    """Linha de importação e os passos do fluxo (status, horário, usuário) de uma requisição"""
+    created = now - timedelta(seconds=rng.random() * days * 86400)
+    status = rng.choices(list(STATUS_WEIGHTS), list(STATUS_WEIGHTS.values()))[0]
+    if status in OPEN_STATUSES and now - created > timedelta(days=30) and rng.random() < 0.8:
+        # Requisições antigas raramente continuam abertas
+        status = 'CONCLUIDA'
+    requester = rng.choice(requesters)
+    technician = rng.choice(technicians)
+    titulo, descricao = rng.choice(PROBLEMS)
+
+    steps = []
+    moment = created
+    for step in STATUS_PATHS[status]:
+        moment = min(moment + timedelta(minutes=rng.uniform(*STEP_MINUTES[step])), now)
+        steps.append((step, moment, requester if step == 'CANCELADA' else technician))
+    times = {step: moment for step, moment, _ in steps}
+
+    row = {
+        'data_criacao': created,
+        'solicitante': requester,
+        'prazo_limite': (created + timedelta(days=rng.randint(1, 14))).date(),
+        'setor_solicitante': requester.userprofile.setor,
+        'tipo_manutencao': rng.choice(['ELETRICA', 'MECANICA', 'MECANICA', 'OUTROS']),
+        'status_operacional': rng.choice(['FUNCIONANDO', 'PARCIAL', 'INOPERANTE']),
+        'equipamentos': rng.sample(machines, rng.choice([1, 1, 1, 2])),
+        'titulo_curto': titulo,
+        'descricao_problema': descricao,
+        'prioridade': rng.randint(1, 5),
+        'status': status,
+        'responsavel_manutencao': technician if 'ACEITA' in times else None,
+        'hora_aceite': times.get('ACEITA'),
+        'hora_inicio': times.get('EM_ATENDIMENTO'),
+        'hora_termino': times.get('CONCLUIDA'),
+    }
+    if status == 'PARADA':
+        row['motivo_parada'] = 'Aguardando peça de reposição'
+    elif status == 'CANCELADA':
+        row['motivo_cancelamento'] = 'Problema resolvido pelo operador'
+    elif status == 'CONCLUIDA':
+        row['descricao_manutencao'] = f'Corrigido: {descricao.lower()}'
+        row['materiais_utilizados'] = rng.choice(['', 'Retentor', 'Correia', 'Fusível', 'Sensor indutivo'])
+    return row, steps
+
+
+def create_related(rng, now, requests, plans, technicians):
+    """Histórico, anexos, notificações e recibos de leitura de um lote de requisições"""
+    history = []
+    attachments = []
+    notifications = []
+    for request, steps in zip(requests, plans):
+        history.append((RequestHistory(
+            request=request, usuario=request.solicitante, acao='CRIADA', descricao='Requisição criada'
+        ), request.data_criacao))
+        previous = 'ABERTA'
+        for step, moment, user in steps:
+            history.append((RequestHistory(
+                request=request, usuario=user, acao='STATUS_ALTERADO',
+                descricao=f'Status alterado de {previous} para {step}'
+            ), moment))
+            previous = step
+
+        for index in range(rng.choice([0, 0, 0, 1, 1, 2, 3])):
+            video = rng.random() < 0.1
+            attachments.append((RequestAttachment(
+                request=request,
+                arquivo=f'anexos/carga/{request.pk}_{index}.{"mp4" if video else "jpg"}',
+                nome_original=f'{"video" if video else "foto"}_{index + 1}.{"mp4" if video else "jpg"}',
+                content_type='video/mp4' if video else 'image/jpeg',
+                tamanho=rng.randint(5, 50) * 1024 * 1024 if video else rng.randint(200, 5000) * 1024,
+                sha256=f'{rng.getrandbits(256):064x}',
+                miniatura_status='SEM_PREVIA',
+            ), request.data_criacao + timedelta(minutes=rng.uniform(0, 10))))
+
+        notifications.append((Notification(
+            perfil_destino='MANUTENCAO',
+            titulo='Nova Requisição de Manutenção',
+            mensagem=f'Nova requisição #{request.pk}: {request.titulo_curto}',
+            request=request,
+        ), request.data_criacao))
+        for step, titulo, mensagem in (
+            ('ACEITA', 'Requisição Aceita', f'Sua requisição #{request.pk} foi aceita'),
+            ('CONCLUIDA', 'Manutenção Concluída', f'A manutenção da requisição #{request.pk} foi concluída'),
+        ):
+            moment = next((moment for name, moment, _ in steps if name == step), None)
+            if moment:
+                old = now - moment > timedelta(days=7)
+                notifications.append((Notification(
+                    usuario=request.solicitante, titulo=titulo, mensagem=mensagem, request=request,
+                    lida=rng.random() < (0.95 if old else 0.3),
+                ), moment))
+
+    for model, items, field in (
+        (RequestHistory, history, 'data_acao'),
+        (RequestAttachment, attachments, 'data_upload'),
+        (Notification, notifications, 'data_criacao'),
+    ):
+        created = model.objects.bulk_create([item for item, _ in items], batch_size=BATCH_SIZE)
+        overwrite_timestamps(model, [field], [(moment, item.pk) for item, (_, moment) in zip(created, items)])
+
+    # Técnicos leram quase todos os avisos com mais de uma semana
+    receipts = [
+        NotificationReceipt(notification=notification, usuario=technician)
+        for notification, moment in notifications
+        if notification.perfil_destino and now - moment > timedelta(days=7)
+        for technician in technicians if rng.random() < 0.9
+    ]
+    NotificationReceipt.objects.bulk_create(receipts, batch_size=BATCH_SIZE)
+    return {
+        'historico': len(history), 'anexos': len(attachments),
+        'notificacoes': len(notifications), 'recibos': len(receipts),
+    }
+
+
+def seed(users=100, requests=5000, days=365, seed=42, batch_size=BATCH_SIZE):
+    """Gera a massa de dados; retorna o total criado por tipo de registro"""
+    rng = random.Random(seed)
+    now = timezone.now()
+    totals = {'usuarios': users, 'requisicoes': 0}
+    with transaction.atomic():
+        by_profile = create_users(users, rng, joined=now - timedelta(days=days + 30))
+        machines = create_equipment()
+    importer = by_profile['TI'][0]
+    requesters = by_profile['COMUM'] + by_profile['GESTOR']
+    technicians = by_profile['MANUTENCAO']
+
+    for start in range(0, requests, batch_size):
+        planned = [
+            plan_request(rng, now, days, requesters, technicians, machines)
+            for _ in range(min(batch_size, requests - start))
+        ]
+        with transaction.atomic():
+            created = import_requests([row for row, _ in planned], importer, history=False, notify=False)
+            counts = create_related(rng, now, created, [steps for _, steps in planned], technicians)
+        totals['requisicoes'] += len(created)
+        for name, total in counts.items():
+            totals[name] = totals.get(name, 0) + total
+    return totals
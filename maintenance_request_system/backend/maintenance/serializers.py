@@ -1,6 +1,42 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth.models import User
-from .models import UserProfile, MaintenanceRequest, RequestAttachment, RequestHistory, Notification
+from django.core.files.storage import default_storage
+from .models import (
+    UserProfile, Equipment, MaintenanceRequest, RequestAttachment, AttachmentUpload, RequestHistory, Notification,
+    MaintenanceRollup
+)
+
+
+def split_query_param(request, name):
+    """Lê um parâmetro separado por vírgulas (ex.: ?expand=anexos,historico) como conjunto"""
+    if request is None:
+        return set()
+    value = request.query_params.get(name, '')
+    return {item.strip() for item in value.split(',') if item.strip()}
+
+
+class DynamicFieldsMixin:
+    """
+    Permite ao cliente escolher os campos retornados.
+
+    ``?fields=a,b`` limita a resposta aos campos listados e ``?expand=x`` inclui
+    relações aninhadas declaradas em ``Meta.expandable_fields``.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        expand = split_query_param(request, 'expand') & expandable.keys()
+        for name in expand:
+            serializer_class, options = expandable[name]
+            self.fields[name] = serializer_class(**options)
+
+        fields = split_query_param(request, 'fields')
+        if fields:
+            for name in set(self.fields) - fields - expand:
+                self.fields.pop(name)
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -17,10 +53,49 @@ class UserProfileSerializer(serializers.ModelSerializer):
         fields = ['user', 'profile_type', 'setor']
 
 
+class EquipmentSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Equipment
+        fields = ['id', 'codigo', 'nome', 'tipo', 'setor', 'ativo']
+
+
 class RequestAttachmentSerializer(serializers.ModelSerializer):
+    miniatura_url = serializers.SerializerMethodField()
+
     class Meta:
         model = RequestAttachment
-        fields = ['id', 'arquivo', 'nome_original', 'data_upload']
+        fields = [
+            'id', 'arquivo', 'nome_original', 'content_type', 'tamanho', 'data_upload',
+            'miniatura_url', 'miniatura_status'
+        ]
+
+    def get_miniatura_url(self, obj):
+        if obj.miniatura_status != 'PRONTA':
+            return None
+        url = default_storage.url(obj.miniatura)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
+class AttachmentUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AttachmentUpload
+        fields = ['id', 'request', 'nome_original', 'content_type', 'tamanho', 'recebido', 'data_criacao']
+        read_only_fields = ['request', 'recebido']
+
+    def validate_content_type(self, value):
+        if not value.startswith(settings.ATTACHMENT_CONTENT_TYPES):
+            raise serializers.ValidationError('Envie apenas fotos ou vídeos.')
+        return value
+
+    def validate_tamanho(self, value):
+        if value <= 0:
+            raise serializers.ValidationError('Arquivo vazio.')
+        if value > settings.ATTACHMENT_MAX_SIZE:
+            raise serializers.ValidationError(
+                f'O arquivo excede o limite de {settings.ATTACHMENT_MAX_SIZE // (1024 * 1024)} MB.'
+            )
+        return value
 
 
 class RequestHistorySerializer(serializers.ModelSerializer):
@@ -31,9 +106,11 @@ class RequestHistorySerializer(serializers.ModelSerializer):
         fields = ['id', 'usuario', 'acao', 'descricao', 'data_acao']
 
 
-class MaintenanceRequestSerializer(serializers.ModelSerializer):
+class MaintenanceRequestSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     solicitante = UserSerializer(read_only=True)
     responsavel_manutencao = UserSerializer(read_only=True)
+    equipamentos = EquipmentSerializer(many=True, read_only=True)
+    equipamentos_impactados = serializers.ListField(read_only=True)
     anexos = RequestAttachmentSerializer(many=True, read_only=True)
     historico = RequestHistorySerializer(many=True, read_only=True)
 
@@ -42,25 +119,153 @@ class MaintenanceRequestSerializer(serializers.ModelSerializer):
         fields = [
             'numero_requisicao', 'data_criacao', 'data_atualizacao',
             'solicitante', 'prazo_limite', 'setor_solicitante',
-            'tipo_manutencao', 'status_operacional', 'equipamentos_impactados',
+            'tipo_manutencao', 'status_operacional', 'equipamentos', 'equipamentos_impactados',
             'outros_equipamentos', 'titulo_curto', 'descricao_problema',
-            'prioridade', 'status', 'motivo_cancelamento', 'motivo_parada',
+            'prioridade', 'urgencia', 'status', 'motivo_cancelamento', 'motivo_parada',
             'responsavel_manutencao', 'data_prevista_termino', 'hora_inicio',
             'hora_termino', 'descricao_manutencao', 'materiais_utilizados',
             'anexos', 'historico'
         ]
         read_only_fields = ['numero_requisicao', 'data_criacao', 'data_atualizacao']
 
+    def to_representation(self, instance):
+        """Requisições antigas trazem também o histórico arquivado"""
+        from . import archive
+
+        data = super().to_representation(instance)
+        if 'historico' in data and instance.arquivo_historico:
+            data['historico'] = archive.merge_history(data['historico'], archive.read_history(instance))
+        return data
+
+
+class MaintenanceRequestListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """Representação compacta para listagens; anexos e histórico só via ?expand="""
+    solicitante = UserSerializer(read_only=True)
+    responsavel_manutencao = UserSerializer(read_only=True)
+    equipamentos = EquipmentSerializer(many=True, read_only=True)
+    equipamentos_impactados = serializers.ListField(read_only=True)
+
+    class Meta:
+        model = MaintenanceRequest
+        fields = [
+            'numero_requisicao', 'data_criacao', 'data_atualizacao',
+            'solicitante', 'prazo_limite', 'setor_solicitante',
+            'tipo_manutencao', 'status_operacional', 'equipamentos', 'equipamentos_impactados',
+            'titulo_curto', 'prioridade', 'urgencia', 'status', 'responsavel_manutencao',
+            'data_prevista_termino'
+        ]
+        read_only_fields = fields
+        expandable_fields = {
+            'anexos': (RequestAttachmentSerializer, {'many': True, 'read_only': True}),
+            'historico': (RequestHistorySerializer, {'many': True, 'read_only': True}),
+        }
+
+
+class RequestSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MaintenanceRequest
+        fields = ['numero_requisicao', 'titulo_curto', 'status']
+
 
 class MaintenanceRequestCreateSerializer(serializers.ModelSerializer):
+    equipamentos = serializers.PrimaryKeyRelatedField(
+        many=True, required=False, queryset=Equipment.objects.filter(ativo=True)
+    )
+    # Tipos de equipamento sem máquina específica (formato antigo do formulário)
+    equipamentos_impactados = serializers.ListField(
+        child=serializers.ChoiceField(choices=Equipment.TYPE_CHOICES), required=False
+    )
+
     class Meta:
         model = MaintenanceRequest
         fields = [
             'prazo_limite', 'setor_solicitante', 'tipo_manutencao',
-            'status_operacional', 'equipamentos_impactados', 'outros_equipamentos',
+            'status_operacional', 'equipamentos', 'equipamentos_impactados', 'outros_equipamentos',
             'titulo_curto', 'descricao_problema', 'prioridade'
         ]
 
+    def create(self, validated_data):
+        equipamentos = list(validated_data.pop('equipamentos', []))
+        tipos = {equipment.tipo for equipment in equipamentos}
+        for tipo in validated_data.pop('equipamentos_impactados', []):
+            if tipo not in tipos:
+                equipamentos.append(Equipment.objects.generic(tipo))
+                tipos.add(tipo)
+
+        request = MaintenanceRequest(**validated_data)
+        request.save(equipamentos=equipamentos)
+        return request
+
+
+class MaintenanceRequestImportListSerializer(serializers.ListSerializer):
+    """Resolve usuários e equipamentos de todas as linhas com uma consulta por tabela"""
+
+    def validate(self, attrs):
+        usernames = {
+            row[name] for row in attrs for name in ('solicitante', 'responsavel_manutencao') if row.get(name)
+        }
+        users = {user.username: user for user in User.objects.filter(username__in=usernames)}
+        codes = {code for row in attrs for code in row.get('equipamentos', ())}
+        machines = {equipment.codigo: equipment for equipment in Equipment.objects.filter(codigo__in=codes)}
+        errors = {}
+        if usernames - users.keys():
+            errors['usuarios'] = f'Usuários não encontrados: {", ".join(sorted(usernames - users.keys()))}'
+        if codes - machines.keys():
+            errors['equipamentos'] = f'Equipamentos não encontrados: {", ".join(sorted(codes - machines.keys()))}'
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        default_requester = self.context['request'].user
+        for row in attrs:
+            row['solicitante'] = users[row['solicitante']] if row.get('solicitante') else default_requester
+            if row.get('responsavel_manutencao'):
+                row['responsavel_manutencao'] = users[row['responsavel_manutencao']]
+            row['equipamentos'] = [machines[code] for code in row.get('equipamentos', ())]
+        return attrs
+
+    def create(self, validated_data):
+        from . import imports
+
+        return imports.import_requests(validated_data, self.context['request'].user)
+
+
+class MaintenanceRequestImportSerializer(serializers.ModelSerializer):
+    """Uma linha da importação em lote; aceita as colunas da exportação"""
+    data_criacao = serializers.DateTimeField(required=False)
+    solicitante = serializers.CharField(required=False)
+    responsavel_manutencao = serializers.CharField(required=False)
+    equipamentos = serializers.ListField(child=serializers.CharField(), required=False)
+    equipamentos_impactados = serializers.ListField(
+        child=serializers.ChoiceField(choices=Equipment.TYPE_CHOICES), required=False
+    )
+
+    class Meta:
+        model = MaintenanceRequest
+        list_serializer_class = MaintenanceRequestImportListSerializer
+        fields = [
+            'data_criacao', 'solicitante', 'prazo_limite', 'setor_solicitante', 'tipo_manutencao',
+            'status_operacional', 'equipamentos', 'equipamentos_impactados', 'outros_equipamentos',
+            'titulo_curto', 'descricao_problema', 'prioridade', 'status', 'motivo_cancelamento',
+            'motivo_parada', 'responsavel_manutencao', 'data_prevista_termino', 'hora_aceite',
+            'hora_inicio', 'hora_termino', 'descricao_manutencao', 'materiais_utilizados'
+        ]
+
+
+class BulkIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=1000
+    )
+
+
+class BulkTransitionSerializer(BulkIdsSerializer):
+    status = serializers.ChoiceField(
+        choices=[choice for choice in MaintenanceRequest.STATUS_CHOICES if choice[0] != 'ABERTA']
+    )
+    motivo_parada = serializers.CharField(required=False)
+    motivo_cancelamento = serializers.CharField(required=False)
+    descricao_manutencao = serializers.CharField(required=False)
+    materiais_utilizados = serializers.CharField(required=False)
+
 
 class MaintenanceRequestUpdateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -71,11 +276,41 @@ class MaintenanceRequestUpdateSerializer(serializers.ModelSerializer):
             'descricao_manutencao', 'materiais_utilizados'
         ]
 
+    def update(self, instance, validated_data):
+        """Grava só os campos enviados, sem sobrescrever um status alterado em paralelo"""
+        for name, value in validated_data.items():
+            setattr(instance, name, value)
+        instance.save(update_fields=list(validated_data))
+        return instance
+
 
 class NotificationSerializer(serializers.ModelSerializer):
     usuario = UserSerializer(read_only=True)
-    request = MaintenanceRequestSerializer(read_only=True)
+    request = RequestSummarySerializer(read_only=True)
+    lida = serializers.BooleanField(source='lida_usuario', read_only=True)
 
     class Meta:
         model = Notification
-        fields = ['id', 'usuario', 'titulo', 'mensagem', 'request', 'lida', 'data_criacao']
+        fields = ['id', 'usuario', 'perfil_destino', 'titulo', 'mensagem', 'request', 'lida', 'data_criacao']
+
+
+class EquipmentHistorySerializer(serializers.ModelSerializer):
+    usuario = UserSerializer(read_only=True)
+    request = RequestSummarySerializer(read_only=True)
+
+    class Meta:
+        model = RequestHistory
+        fields = ['id', 'request', 'usuario', 'acao', 'descricao', 'data_acao']
+
+
+class MaintenanceRollupSerializer(serializers.ModelSerializer):
+    tempo_medio_resposta = serializers.FloatField(read_only=True)
+    tempo_medio_reparo = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = MaintenanceRollup
+        fields = [
+            'dimensao', 'chave', 'total_requisicoes',
+            'total_respondidas', 'tempo_medio_resposta',
+            'total_reparos', 'tempo_medio_reparo'
+        ]
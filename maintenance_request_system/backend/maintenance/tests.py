@@ -1,3 +1,1480 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+import os
+import tempfile
+import warnings
+import zipfile
+from datetime import date, timedelta
+from xml.etree import ElementTree
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import AsyncClient, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from PIL import Image
+
+from .models import (
+    UserProfile, Equipment, MaintenanceRequest, RequestAttachment, AttachmentUpload, RequestHistory, Notification,
+    NotificationReceipt, MaintenanceRollup, SchedulerCheckpoint, TechnicianWorkload
+)
+from . import (
+    archive, authentication, dashboard, deadlines, events, export, imports, profiling, transitions, unread, uploads,
+    urgency
+)
+from .search import get_search_backend
+from .views import MaintenanceRequestViewSet, event_stream
+
+
+def create_user(username, profile_type='COMUM'):
+    user = User.objects.create(username=username)
+    UserProfile.objects.create(user=user, profile_type=profile_type, setor='Produção')
+    return user
+
+
+def create_request(solicitante, equipamentos=('PRENSA',), **kwargs):
+    fields = {
+        'prazo_limite': date(2030, 1, 1),
+        'setor_solicitante': 'Produção',
+        'tipo_manutencao': 'MECANICA',
+        'status_operacional': 'PARCIAL',
+        'titulo_curto': 'Vazamento de óleo',
+        'descricao_problema': 'Vazamento na prensa 3',
+    }
+    fields.update(kwargs)
+    request = MaintenanceRequest(solicitante=solicitante, **fields)
+    request.save(equipamentos=[
+        equipment if isinstance(equipment, Equipment) else Equipment.objects.generic(equipment)
+        for equipment in equipamentos
+    ])
+    return request
+
+
+def authenticated_client(user):
+    client = APIClient()
+    token, _ = Token.objects.get_or_create(user=user)
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+class QueryBudgetTests(TestCase):
+    """O número de consultas por endpoint não pode crescer com o número de linhas"""
+
+    def setUp(self):
+        cache.clear()
+        self.comum = create_user('comum')
+        self.tecnico = create_user('tecnico', 'MANUTENCAO')
+        self.gestor = create_user('gestor', 'GESTOR')
+        self.ti = create_user('ti', 'TI')
+
+    def add_requests(self, count):
+        for _ in range(count):
+            req = create_request(self.comum, responsavel_manutencao=self.tecnico)
+            RequestAttachment.objects.create(request=req, arquivo='anexos/foto.jpg', nome_original='foto.jpg')
+            RequestHistory.objects.create(request=req, usuario=self.comum, acao='CRIADA', descricao='Requisição criada')
+            RequestHistory.objects.create(request=req, usuario=self.tecnico, acao='STATUS_ALTERADO', descricao='Aceita')
+            Notification.objects.create(usuario=self.tecnico, titulo='Nova', mensagem='Nova', request=req)
+
+    def count_queries(self, user, url):
+        client = authenticated_client(user)
+        client.get(url)  # aquece o cache do token
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(ctx.captured_queries)
+
+    def assertConstantQueries(self, user, url, expected):
+        self.add_requests(1)
+        self.assertEqual(self.count_queries(user, url), expected)
+        self.add_requests(10)
+        self.assertEqual(self.count_queries(user, url), expected)
+
+    def test_list_comum(self):
+        # validadores (ETag), requisições, equipamentos; token e perfil vêm do cache
+        self.assertConstantQueries(self.comum, '/api/requests/', 3)
+
+    def test_list_manutencao(self):
+        self.assertConstantQueries(self.tecnico, '/api/requests/', 3)
+
+    def test_list_gestor(self):
+        self.assertConstantQueries(self.gestor, '/api/requests/', 3)
+
+    def test_list_expanded(self):
+        # validadores (ETag), requisições, equipamentos, anexos, histórico
+        self.assertConstantQueries(self.gestor, '/api/requests/?expand=anexos,historico', 5)
+
+    def test_retrieve(self):
+        self.add_requests(1)
+        req = MaintenanceRequest.objects.first()
+        self.assertEqual(self.count_queries(self.comum, f'/api/requests/{req.pk}/'), 5)
+
+    def test_my_requests(self):
+        # requisições, equipamentos
+        self.assertConstantQueries(self.comum, '/api/requests/my_requests/', 2)
+
+    def test_dashboard_data(self):
+        # Token, perfil, contadores e payload vêm do cache
+        for count in (1, 10):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.add_requests(count)
+            self.assertEqual(self.count_queries(self.ti, '/api/requests/dashboard_data/'), 0)
+
+    def test_notifications(self):
+        # validadores (ETag), notificações
+        self.assertConstantQueries(self.tecnico, '/api/notifications/', 2)
+
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        self.gestor = create_user('gestor', 'GESTOR')
+        self.client = authenticated_client(self.gestor)
+        for _ in range(7):
+            create_request(self.gestor)
+
+    def collect_pages(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row['numero_requisicao'] for row in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_pages_cover_all_rows_once(self):
+        ids = self.collect_pages('/api/requests/?page_size=3')
+        expected = list(MaintenanceRequest.objects.order_by('-data_criacao', 'numero_requisicao')
+                        .values_list('numero_requisicao', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_page_size_is_capped_by_view(self):
+        with mock.patch.object(MaintenanceRequestViewSet, 'max_page_size', 2):
+            response = self.client.get('/api/requests/my_requests/?page_size=1000')
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        self.gestor = create_user('gestor', 'GESTOR')
+        self.client = authenticated_client(self.gestor)
+        self.req = create_request(self.gestor)
+        RequestHistory.objects.create(request=self.req, usuario=self.gestor, acao='CRIADA', descricao='Requisição criada')
+
+    def test_list_is_compact_by_default(self):
+        row = self.client.get('/api/requests/').data['results'][0]
+        self.assertNotIn('historico', row)
+        self.assertNotIn('anexos', row)
+        self.assertNotIn('descricao_problema', row)
+
+    def test_expand_and_fields(self):
+        row = self.client.get('/api/requests/?fields=numero_requisicao,status&expand=historico').data['results'][0]
+        self.assertEqual(set(row), {'numero_requisicao', 'status', 'historico'})
+        self.assertEqual(row['historico'][0]['acao'], 'CRIADA')
+
+    def test_detail_keeps_nested_data(self):
+        data = self.client.get(f'/api/requests/{self.req.pk}/').data
+        self.assertIn('historico', data)
+        self.assertIn('anexos', data)
+
+    def test_notification_carries_request_summary(self):
+        Notification.objects.create(usuario=self.gestor, titulo='Nova', mensagem='Nova', request=self.req)
+        row = self.client.get('/api/notifications/').data['results'][0]
+        self.assertEqual(row['request'], {
+            'numero_requisicao': self.req.pk,
+            'titulo_curto': self.req.titulo_curto,
+            'status': 'ABERTA',
+        })
+
+
+class BroadcastNotificationTests(TestCase):
+    def setUp(self):
+        self.comum = create_user('comum')
+        self.tecnicos = [create_user(f'tecnico{i}', 'MANUTENCAO') for i in range(3)]
+
+    def create_via_api(self):
+        payload = {
+            'prazo_limite': '2030-01-01', 'setor_solicitante': 'Produção',
+            'tipo_manutencao': 'ELETRICA', 'status_operacional': 'INOPERANTE',
+            'equipamentos_impactados': ['FRESA'], 'titulo_curto': 'Motor queimado',
+            'descricao_problema': 'Motor da fresa não liga',
+        }
+        response = authenticated_client(self.comum).post('/api/requests/', payload, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+
+    def test_new_request_writes_single_notification(self):
+        self.create_via_api()
+        self.create_via_api()
+        self.assertEqual(Notification.objects.count(), 2)
+        for tecnico in self.tecnicos:
+            rows = authenticated_client(tecnico).get('/api/notifications/').data['results']
+            self.assertEqual(len(rows), 2)
+            self.assertFalse(any(row['lida'] for row in rows))
+        self.assertEqual(authenticated_client(self.comum).get('/api/notifications/').data['results'], [])
+
+    def test_read_receipts_are_per_user(self):
+        self.create_via_api()
+        notification = Notification.objects.get()
+        client = authenticated_client(self.tecnicos[0])
+        client.post(f'/api/notifications/{notification.pk}/mark_as_read/')
+        self.assertTrue(client.get('/api/notifications/').data['results'][0]['lida'])
+        other = authenticated_client(self.tecnicos[1]).get('/api/notifications/').data['results'][0]
+        self.assertFalse(other['lida'])
+
+    def test_mark_all_as_read_merges_direct_and_broadcast(self):
+        self.create_via_api()
+        tecnico = self.tecnicos[0]
+        Notification.objects.create(usuario=tecnico, titulo='Direta', mensagem='Direta')
+        client = authenticated_client(tecnico)
+        client.post('/api/notifications/mark_all_as_read/')
+        client.post('/api/notifications/mark_all_as_read/')
+        rows = client.get('/api/notifications/').data['results']
+        self.assertEqual(len(rows), 2)
+        self.assertTrue(all(row['lida'] for row in rows))
+        self.assertEqual(NotificationReceipt.objects.filter(usuario=tecnico).count(), 1)
+
+    def test_broadcast_cannot_be_changed_by_one_recipient(self):
+        self.create_via_api()
+        notification = Notification.objects.get()
+        client = authenticated_client(self.tecnicos[0])
+        url = f'/api/notifications/{notification.pk}/'
+        self.assertEqual(client.patch(url, {'mensagem': 'alterada'}, format='json').status_code, 405)
+        self.assertEqual(client.delete(url).status_code, 404)
+        client.post(f'{url}mark_as_read/')
+        self.assertEqual(client.post('/api/notifications/', {'titulo': 'x'}, format='json').status_code, 405)
+
+        notification.refresh_from_db()
+        self.assertFalse(notification.lida)
+        rows = authenticated_client(self.tecnicos[1]).get('/api/notifications/').data['results']
+        self.assertEqual([(row['id'], row['mensagem'], row['lida']) for row in rows],
+                         [(notification.pk, notification.mensagem, False)])
+
+        direct = Notification.objects.create(usuario=self.tecnicos[0], titulo='Direta', mensagem='Direta')
+        self.assertEqual(client.delete(f'/api/notifications/{direct.pk}/').status_code, 204)
+        self.assertFalse(Notification.objects.filter(pk=direct.pk).exists())
+
+
+class AnalyticsRollupTests(TestCase):
+    def setUp(self):
+        self.comum = create_user('comum')
+        self.gestor = create_user('gestor', 'GESTOR')
+
+    def run_workflow(self, **kwargs):
+        req = create_request(self.comum, **kwargs)
+        for status in ('ACEITA', 'EM_ATENDIMENTO', 'CONCLUIDA'):
+            req.status = status
+            req.save()
+        return req
+
+    def snapshot(self):
+        return {
+            (row.dimensao, row.chave): (row.total_requisicoes, row.total_respondidas, row.total_reparos,
+                                        round(row.soma_tempo_resposta, 6), round(row.soma_tempo_reparo, 6))
+            for row in MaintenanceRollup.objects.all()
+        }
+
+    def test_incremental_rollup_matches_rebuild(self):
+        self.run_workflow(equipamentos=['PRENSA', 'FRESA'])
+        self.run_workflow(tipo_manutencao='ELETRICA', setor_solicitante='Estamparia')
+        create_request(self.comum)
+        incremental = self.snapshot()
+        self.assertEqual(incremental[('GERAL', '')][:3], (3, 2, 2))
+        self.assertEqual(incremental[('EQUIPAMENTO_TIPO', 'FRESA:MECANICA')][:3], (1, 1, 1))
+
+        MaintenanceRollup.objects.rebuild()
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_analytics_endpoint(self):
+        self.run_workflow()
+        client = authenticated_client(self.gestor)
+        response = client.get('/api/requests/analytics/?dimensao=TIPO')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.data), ['TIPO'])
+        row = response.data['TIPO'][0]
+        self.assertEqual(row['chave'], 'MECANICA')
+        self.assertEqual(row['total_reparos'], 1)
+        self.assertIsNotNone(row['tempo_medio_reparo'])
+
+        self.assertEqual(authenticated_client(self.comum).get('/api/requests/analytics/').status_code, 403)
+
+
+class DashboardCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.comum = create_user('comum')
+        self.client = authenticated_client(create_user('ti', 'TI'))
+
+    def create(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return create_request(self.comum, **kwargs)
+
+    def test_counters_follow_status_changes(self):
+        self.create()
+        data = self.client.get('/api/requests/dashboard_data/').data
+        self.assertEqual((data['total_requests'], data['open_requests']), (1, 1))
+
+        req = self.create()
+        with self.captureOnCommitCallbacks(execute=True):
+            req = MaintenanceRequest.objects.get(pk=req.pk)
+            req.status = 'CONCLUIDA'
+            req.save()
+        data = self.client.get('/api/requests/dashboard_data/').data
+        self.assertEqual((data['total_requests'], data['open_requests'], data['completed_requests']), (2, 1, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            req.delete()
+        data = self.client.get('/api/requests/dashboard_data/').data
+        self.assertEqual((data['total_requests'], data['completed_requests']), (1, 0))
+
+    def test_etag_returns_not_modified(self):
+        self.create()
+        response = self.client.get('/api/requests/dashboard_data/')
+        etag = response['ETag']
+        self.assertEqual(self.client.get('/api/requests/dashboard_data/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(
+            '/api/requests/dashboard_data/', HTTP_IF_NONE_MATCH=f'"outro", W/{etag}'
+        ).status_code, 304)
+        self.create()
+        self.assertEqual(self.client.get('/api/requests/dashboard_data/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertEqual(self.client.get('/api/requests/dashboard_data/', HTTP_IF_NONE_MATCH='*').status_code, 304)
+
+    def test_change_during_rebuild_is_not_cached_under_new_version(self):
+        self.create()
+        dashboard.get_dashboard()
+        get_version = dashboard.get_version
+        changes = [self.create]
+
+        def change_then_read():
+            # Mudança gravada no meio da reconstrução do payload
+            while changes:
+                changes.pop()()
+            return get_version()
+
+        with mock.patch('maintenance.dashboard.get_version', change_then_read):
+            version, payload = dashboard.get_dashboard()
+        self.assertEqual(version, dashboard.get_version())
+        self.assertEqual(payload['total_requests'], 2)
+        self.assertEqual(dashboard.get_dashboard()[1]['total_requests'], 2)
+
+    def test_reconcile_fixes_drift(self):
+        self.create()
+        self.client.get('/api/requests/dashboard_data/')
+        MaintenanceRequest.objects.update(status='CONCLUIDA')
+        call_command('reconcile_dashboard', stdout=StringIO())
+        data = self.client.get('/api/requests/dashboard_data/').data
+        self.assertEqual(data['completed_requests'], 1)
+
+
+class EquipmentRegistryTests(TestCase):
+    def setUp(self):
+        self.comum = create_user('comum')
+        self.outro = create_user('outro')
+        self.prensa = Equipment.objects.create(codigo='PRENSA-03', nome='Prensa 3', tipo='PRENSA')
+        self.fresa = Equipment.objects.create(codigo='FRESA-01', nome='Fresa 1', tipo='FRESA')
+
+    def test_create_with_machines_and_legacy_types(self):
+        payload = {
+            'prazo_limite': '2030-01-01', 'setor_solicitante': 'Produção',
+            'tipo_manutencao': 'MECANICA', 'status_operacional': 'PARCIAL',
+            'equipamentos': [self.prensa.pk], 'equipamentos_impactados': ['PRENSA', 'ROSQUEADEIRA'],
+            'titulo_curto': 'Ruído', 'descricao_problema': 'Ruído anormal',
+        }
+        response = authenticated_client(self.comum).post('/api/requests/', payload, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        req = MaintenanceRequest.objects.get()
+        self.assertEqual(set(req.equipamentos.values_list('codigo', flat=True)), {'PRENSA-03', 'ROSQUEADEIRA'})
+        self.assertEqual(sorted(response.data['equipamentos_impactados']), ['PRENSA', 'ROSQUEADEIRA'])
+
+    def test_equipment_requests_and_history_are_scoped(self):
+        mine = create_request(self.comum, equipamentos=[self.prensa])
+        create_request(self.outro, equipamentos=[self.prensa])
+        create_request(self.comum, equipamentos=[self.fresa])
+        RequestHistory.objects.create(request=mine, usuario=self.comum, acao='CRIADA', descricao='Requisição criada')
+
+        client = authenticated_client(self.comum)
+        rows = client.get(f'/api/equipment/{self.prensa.pk}/requests/').data['results']
+        self.assertEqual([row['numero_requisicao'] for row in rows], [mine.pk])
+        self.assertEqual(rows[0]['equipamentos'][0]['codigo'], 'PRENSA-03')
+
+        history = client.get(f'/api/equipment/{self.prensa.pk}/history/').data['results']
+        self.assertEqual([(row['request']['numero_requisicao'], row['acao']) for row in history], [(mine.pk, 'CRIADA')])
+
+        filtered = client.get(f'/api/requests/?equipamento={self.fresa.pk}').data['results']
+        self.assertEqual(len(filtered), 1)
+
+    def test_only_staff_can_edit_registry(self):
+        response = authenticated_client(self.comum).post('/api/equipment/', {'codigo': 'X', 'nome': 'X', 'tipo': 'OUTROS'})
+        self.assertEqual(response.status_code, 403)
+
+
+class FullTextSearchTests(TestCase):
+    def setUp(self):
+        self.comum = create_user('comum')
+        self.outro = create_user('outro')
+        self.hidraulica = create_request(self.comum, titulo_curto='Prensa hidráulica', descricao_problema='Vazamento')
+        self.motor = create_request(self.comum, titulo_curto='Motor', descricao_problema='Motor hidráulico travado')
+        create_request(self.outro, titulo_curto='Hidráulica do vizinho', descricao_problema='Não é minha')
+
+    def search(self, user, q):
+        response = authenticated_client(user).get('/api/requests/search/', {'q': q})
+        self.assertEqual(response.status_code, 200)
+        return [row['numero_requisicao'] for row in response.data['results']]
+
+    def test_prefix_match_is_ranked_and_scoped(self):
+        self.assertEqual(set(self.search(self.comum, 'hidraul')), {self.hidraulica.pk, self.motor.pk})
+
+    def test_index_follows_save_and_delete(self):
+        self.motor.materiais_utilizados = 'Rolamento 6205'
+        self.motor.save()
+        self.assertEqual(self.search(self.comum, 'rolam 6205'), [self.motor.pk])
+        self.motor.delete()
+        self.assertEqual(self.search(self.comum, 'rolamento'), [])
+
+    def test_limit_is_clamped(self):
+        client = authenticated_client(self.comum)
+        for limit, expected in (('0', 1), ('-1', 1), ('1000', 2), ('x', 2)):
+            response = client.get('/api/requests/search/', {'q': 'hidraul', 'limit': limit})
+            self.assertEqual(len(response.data['results']), expected, limit)
+
+    def test_fts_syntax_is_neutralized(self):
+        self.assertEqual(self.search(self.comum, '"prensa" hidr*'), [self.hidraulica.pk])
+        self.assertEqual(self.search(self.comum, '---'), [])
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.comum = create_user('comum')
+        self.outro = create_user('outro')
+        self.aberta = create_request(self.comum, titulo_curto='Linha; com "aspas"')
+        self.concluida = create_request(self.comum, status='CONCLUIDA')
+        RequestHistory.objects.create(request=self.concluida, usuario=self.comum, acao='CRIADA', descricao='Criada')
+        create_request(self.outro)
+        self.client = authenticated_client(self.comum)
+
+    def test_csv_is_streamed_and_scoped(self):
+        response = self.client.get('/api/requests/export/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        rows = list(csv.reader(StringIO(b''.join(response.streaming_content).decode('utf-8-sig'))))
+        self.assertEqual(rows[0][0], 'numero_requisicao')
+        self.assertEqual([int(row[0]) for row in rows[1:]], [self.aberta.pk, self.concluida.pk])
+        self.assertEqual(rows[1][3], 'Linha; com "aspas"')
+        self.assertIn('comum CRIADA: Criada', rows[2][-1])
+
+    def test_formulas_are_neutralized(self):
+        formula = '=HYPERLINK("http://exemplo", "x")'
+        create_request(self.comum, titulo_curto=formula, descricao_problema='-1+2')
+        response = self.client.get('/api/requests/export/')
+        rows = list(csv.reader(StringIO(b''.join(response.streaming_content).decode('utf-8-sig'))))
+        self.assertEqual(rows[-1][3:5], [f"'{formula}", "'-1+2"])
+        self.assertEqual(rows[1][3], 'Linha; com "aspas"')
+
+        # A importação devolve o texto original
+        exported = b''.join(self.client.get('/api/requests/export/').streaming_content)
+        items = list(imports.read_csv(BytesIO(exported)))
+        self.assertEqual([item['titulo_curto'] for item in items[::2]], ['Linha; com "aspas"', formula])
+        self.assertEqual(items[-1]['descricao_problema'], '-1+2')
+
+        response = self.client.get('/api/requests/export/', {'formato': 'xlsx'})
+        sheet = zipfile.ZipFile(BytesIO(b''.join(response.streaming_content))).read('xl/worksheets/sheet1.xml')
+        self.assertNotIn(b'<f>', sheet)
+
+    def test_filters(self):
+        response = self.client.get('/api/requests/export/', {'status': 'CONCLUIDA', 'data_inicio': '2000-01-01'})
+        rows = list(csv.reader(StringIO(b''.join(response.streaming_content).decode('utf-8-sig'))))
+        self.assertEqual([int(row[0]) for row in rows[1:]], [self.concluida.pk])
+        self.assertEqual(self.client.get('/api/requests/export/', {'data_fim': '2000-13-01'}).status_code, 400)
+
+    async def test_asgi_export_streams_async_iterator(self):
+        token = await Token.objects.aget(user=self.comum)
+        with mock.patch.object(export, 'ASYNC_BATCH_SIZE', 1), warnings.catch_warnings():
+            # Com iterador síncrono, o Django avisaria que juntou tudo em memória
+            warnings.simplefilter('error')
+            response = await AsyncClient().get(
+                '/api/requests/export/', headers={'Authorization': f'Token {token.key}'}
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.is_async)
+            chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(len(chunks), 4)
+        rows = list(csv.reader(StringIO(b''.join(chunks).decode('utf-8-sig'))))
+        self.assertEqual([int(row[0]) for row in rows[1:]], [self.aberta.pk, self.concluida.pk])
+
+    def test_xlsx_is_valid_archive(self):
+        response = self.client.get('/api/requests/export/', {'formato': 'xlsx'})
+        archive = zipfile.ZipFile(BytesIO(b''.join(response.streaming_content)))
+        sheet = ElementTree.fromstring(archive.read('xl/worksheets/sheet1.xml'))
+        namespace = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+        rows = sheet.findall(f'{namespace}sheetData/{namespace}row')
+        self.assertEqual(len(rows), 3)
+        self.assertIn('Linha; com "aspas"', [text.text for text in rows[1].iter(f'{namespace}t')])
+
+
+class EventStreamTests(TestCase):
+    def setUp(self):
+        self.comum = create_user('comum')
+        self.tecnico = create_user('tecnico', 'MANUTENCAO')
+
+    async def test_broker_delivers_once_across_channels(self):
+        broker = events.InProcessBroker()
+        subscription = broker.subscribe(['user:1', 'perfil:MANUTENCAO'])
+        await asyncio.to_thread(broker.publish, ['user:1', 'perfil:MANUTENCAO'], {'type': 'teste'})
+        self.assertEqual(await subscription.get(timeout=1), {'type': 'teste'})
+        self.assertTrue(subscription.queue.empty())
+        subscription.close()
+        broker.publish(['user:1'], {'type': 'teste'})
+        self.assertTrue(subscription.queue.empty())
+
+    def test_stream_requires_token(self):
+        self.assertEqual(self.client.get('/api/events/').status_code, 401)
+        self.assertEqual(self.client.get('/api/events/?token=invalido').status_code, 401)
+
+    async def test_stream_receives_profile_notification(self):
+        token = await Token.objects.acreate(user=self.tecnico)
+        broker = events.InProcessBroker()
+        with mock.patch.object(events, 'get_broker', return_value=broker):
+            response = await event_stream(RequestFactory().get('/api/events/', {'token': token.key}))
+        self.assertEqual(set(broker._subscriptions), {f'user:{self.tecnico.pk}', 'perfil:MANUTENCAO'})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = response.streaming_content
+        self.assertTrue((await anext(stream)).startswith(b'retry:'))
+
+        notification = await Notification.objects.acreate(
+            perfil_destino='MANUTENCAO', titulo='Nova Requisição', mensagem='Nova requisição #1'
+        )
+        with mock.patch.object(events, 'get_broker', return_value=broker):
+            await asyncio.to_thread(events.publish_notification, notification)
+        chunk = (await asyncio.wait_for(anext(stream), 1)).decode()
+        event_line, data_line = chunk.strip().split('\n')
+        self.assertEqual(event_line, 'event: notification')
+        self.assertEqual(json.loads(data_line[len('data: '):])['id'], notification.pk)
+        await stream.aclose()
+
+    def test_events_are_published_after_commit(self):
+        request = create_request(self.comum)
+        with mock.patch.object(events, 'publish_status_change') as publish_status_change, \
+                mock.patch.object(events, 'publish_notification') as publish_notification:
+            with self.captureOnCommitCallbacks(execute=True):
+                request.status = 'ACEITA'
+                request.save()
+                Notification.objects.create(usuario=self.comum, titulo='Aceita', mensagem='Aceita')
+            with self.captureOnCommitCallbacks(execute=True):
+                request.save()
+        publish_status_change.assert_called_once_with(request, 'ABERTA')
+        publish_notification.assert_called_once()
+
+
+class UnreadCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.comum = create_user('comum')
+        self.tecnico = create_user('tecnico', 'MANUTENCAO')
+        self.client = authenticated_client(self.tecnico)
+
+    def unread_count(self):
+        return self.client.get('/api/notifications/unread_count/').data['unread_count']
+
+    def notify(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Notification.objects.create(titulo='Aviso', mensagem='Aviso', **kwargs)
+
+    def test_counter_follows_creation_and_reads(self):
+        self.assertEqual(self.unread_count(), 0)
+        direct = self.notify(usuario=self.tecnico)
+        broadcast = self.notify(perfil_destino='MANUTENCAO')
+        self.notify(usuario=self.comum)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.unread_count(), 2)
+        self.assertEqual(len(queries), 0)
+
+        for notification in (direct, broadcast, broadcast):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(f'/api/notifications/{notification.pk}/mark_as_read/')
+        self.assertEqual(self.unread_count(), 0)
+
+        self.notify(perfil_destino='MANUTENCAO')
+        self.notify(usuario=self.tecnico)
+        self.assertEqual(self.unread_count(), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/notifications/mark_all_as_read/')
+        self.assertEqual(self.unread_count(), 0)
+
+    def test_bulk_broadcasts_skip_later_users_and_deletes_decrement(self):
+        self.assertEqual(self.unread_count(), 0)
+        old = Notification(perfil_destino='MANUTENCAO', titulo='Antigo', mensagem='Antigo')
+        new = Notification(perfil_destino='MANUTENCAO', titulo='Novo', mensagem='Novo')
+        direct = Notification(usuario=self.tecnico, titulo='Direta', mensagem='Direta')
+        created = Notification.objects.bulk_create([old, new, direct])
+        Notification.objects.filter(pk=old.pk).update(data_criacao=self.tecnico.date_joined - timedelta(days=1))
+        old.data_criacao = self.tecnico.date_joined - timedelta(days=1)
+        unread.record_bulk_created(created)
+        self.assertEqual(self.unread_count(), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/notifications/{new.pk}/mark_as_read/')
+        self.assertEqual(self.unread_count(), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            new.delete()
+            self.client.delete(f'/api/notifications/{direct.pk}/')
+        self.assertEqual(self.unread_count(), 0)
+        self.assertEqual(self.unread_count(), unread.rebuild(self.tecnico))
+
+        broadcast = self.notify(perfil_destino='MANUTENCAO', request=create_request(self.comum))
+        self.assertEqual(self.unread_count(), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            broadcast.request.delete()
+        self.assertEqual(self.unread_count(), 0)
+
+    def test_counter_rebuilds_on_cache_miss(self):
+        Notification.objects.create(usuario=self.tecnico, titulo='Direta', mensagem='Direta')
+        Notification.objects.create(perfil_destino='MANUTENCAO', titulo='Aviso', mensagem='Aviso')
+        Notification.objects.create(perfil_destino='GESTOR', titulo='Aviso', mensagem='Aviso')
+        self.assertEqual(self.unread_count(), 2)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.comum = create_user('comum')
+        self.tecnico = create_user('tecnico', 'MANUTENCAO')
+        self.request = create_request(self.comum)
+        self.client = authenticated_client(self.comum)
+
+    def assertNotModified(self, url, **headers):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        return len(ctx.captured_queries)
+
+    def test_request_list_and_detail(self):
+        for url in ('/api/requests/', f'/api/requests/{self.request.pk}/'):
+            response = self.client.get(url)
+            self.assertIn('Authorization', response['Vary'])
+            # token, perfil, validadores: sem carregar nem serializar as requisições
+            self.assertLessEqual(self.assertNotModified(url, HTTP_IF_NONE_MATCH=response['ETag']), 3)
+            self.assertNotModified(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+
+            self.request.prioridade = 5
+            self.request.save()
+            changed = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(changed.status_code, 200)
+            self.assertNotEqual(changed['ETag'], response['ETag'])
+
+        response = self.client.get('/api/requests/')
+        create_request(self.comum)
+        self.assertEqual(self.client.get('/api/requests/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+    def test_list_etag_covers_the_page_and_query(self):
+        older = self.request
+        create_request(self.comum)
+        with CaptureQueriesContext(connection) as ctx:
+            first = self.client.get('/api/requests/', {'page_size': 1})
+        self.assertFalse([q for q in ctx.captured_queries if 'COUNT(' in q['sql']])
+        for params in ({'page_size': 2}, {'page_size': 1, 'fields': 'status'}):
+            self.assertNotEqual(self.client.get('/api/requests/', params)['ETag'], first['ETag'])
+
+        # Alterações fora da janela não invalidam a página
+        older.prioridade = 5
+        older.save()
+        self.assertNotModified('/api/requests/?page_size=1', HTTP_IF_NONE_MATCH=first['ETag'])
+        second = self.client.get(first.data['next'])
+        self.assertEqual([row['numero_requisicao'] for row in second.data['results']], [older.pk])
+        older.prioridade = 2
+        older.save()
+        self.assertEqual(self.client.get(first.data['next'], HTTP_IF_NONE_MATCH=second['ETag']).status_code, 200)
+
+    def test_detail_checks_permissions_before_304(self):
+        response = self.client.get(f'/api/requests/{self.request.pk}/')
+        tecnico = authenticated_client(self.tecnico)
+        denied = tecnico.get(f'/api/requests/{self.request.pk}/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(denied.status_code, 403)
+
+    def test_notifications_change_on_read(self):
+        client = authenticated_client(self.tecnico)
+        notification = Notification.objects.create(perfil_destino='MANUTENCAO', titulo='Aviso', mensagem='Aviso')
+        for url in ('/api/notifications/', f'/api/notifications/{notification.pk}/'):
+            etag = client.get(url)['ETag']
+            self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        etag = client.get('/api/notifications/')['ETag']
+        client.post(f'/api/notifications/{notification.pk}/mark_as_read/')
+        self.assertEqual(client.get('/api/notifications/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_notifications_change_with_request_status(self):
+        client = authenticated_client(self.tecnico)
+        Notification.objects.create(
+            perfil_destino='MANUTENCAO', titulo='Nova', mensagem='Nova', request=self.request
+        )
+        etag = client.get('/api/notifications/')['ETag']
+        transitions.apply(self.request, 'ACEITA', self.tecnico, responsavel_manutencao=self.tecnico)
+        response = client.get('/api/notifications/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['request']['status'], 'ACEITA')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user('gestor', 'GESTOR')
+        self.client = authenticated_client(self.user)
+
+    def test_token_and_profile_come_from_cache(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/profiles/me/')
+        # Primeira chamada: token, usuário e perfil em uma consulta, mais a do endpoint
+        self.assertEqual(len([q for q in ctx.captured_queries if 'authtoken_token' in q['sql']]), 1)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/requests/analytics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q for q in ctx.captured_queries if 'authtoken_token' in q['sql'] or
+                          'maintenance_userprofile' in q['sql']])
+
+    def test_cache_holds_no_password(self):
+        self.user.set_password('segredo')
+        self.user.save()
+        self.assertEqual(self.client.get('/api/notifications/').status_code, 200)
+        key = Token.objects.get(user=self.user).key
+        cached = cache.get(authentication.cache_key(key))
+        self.assertNotIn(self.user.password, repr(cached))
+
+        user = authentication.build_user(cached)
+        with self.assertNumQueries(0):
+            self.assertEqual((user.pk, user.userprofile.profile_type), (self.user.pk, 'GESTOR'))
+        self.assertIn('password', user.get_deferred_fields())
+
+    def test_profile_change_invalidates_cache(self):
+        self.assertEqual(self.client.get('/api/requests/analytics/').status_code, 200)
+        self.user.userprofile.profile_type = 'COMUM'
+        self.user.userprofile.save()
+        self.assertEqual(self.client.get('/api/requests/analytics/').status_code, 403)
+
+    def test_token_deletion_and_deactivation_invalidate_cache(self):
+        self.assertEqual(self.client.get('/api/notifications/').status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/notifications/').status_code, 401)
+
+        self.user.is_active = True
+        self.user.save()
+        self.assertEqual(self.client.get('/api/notifications/').status_code, 200)
+        Token.objects.filter(user=self.user).delete()
+        self.assertEqual(self.client.get('/api/notifications/').status_code, 401)
+
+
+class ChunkedUploadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        settings = override_settings(
+            MEDIA_ROOT=self.media.name, ATTACHMENT_UPLOAD_TEMP_DIR=os.path.join(self.media.name, 'parciais'),
+            ATTACHMENT_MAX_SIZE=1024,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.comum = create_user('comum')
+        self.request = create_request(self.comum)
+        self.client = authenticated_client(self.comum)
+
+    def start(self, request=None, **kwargs):
+        payload = {'nome_original': 'foto.JPG', 'content_type': 'image/jpeg', 'tamanho': 10, **kwargs}
+        return self.client.post(f'/api/requests/{(request or self.request).pk}/uploads/', payload, format='json')
+
+    def send(self, upload_id, offset, data):
+        return self.client.patch(
+            f'/api/uploads/{upload_id}/', data, content_type='application/offset+octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset)
+        )
+
+    def test_resume_and_deduplicate(self):
+        upload_id = self.start().data['id']
+        self.assertEqual(self.send(upload_id, 0, b'0123').data['recebido'], 4)
+        conflict = self.send(upload_id, 0, b'0123')
+        self.assertEqual(conflict.status_code, 409)
+        self.assertEqual(conflict['Upload-Offset'], '4')
+        self.assertEqual(self.client.get(f'/api/uploads/{upload_id}/')['Upload-Offset'], '4')
+
+        response = self.send(upload_id, 4, b'456789')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.data['tamanho'], 10)
+        self.assertFalse(AttachmentUpload.objects.exists())
+
+        other = create_request(self.comum)
+        upload_id = self.start(other).data['id']
+        self.send(upload_id, 0, b'0123456789')
+        first, second = RequestAttachment.objects.order_by('pk')
+        self.assertEqual(first.arquivo.name, second.arquivo.name)
+        self.assertTrue(first.arquivo.name.startswith('anexos/sha256/') and first.arquivo.name.endswith('.jpg'))
+        self.assertEqual(first.arquivo.read(), b'0123456789')
+        self.assertEqual(os.listdir(os.path.dirname(first.arquivo.path)), [os.path.basename(first.arquivo.name)])
+        self.assertEqual(os.listdir(os.path.join(self.media.name, 'parciais')), [])
+
+    def test_size_limit_is_enforced_while_streaming(self):
+        self.assertEqual(self.start(tamanho=2048).status_code, 400)
+        self.assertEqual(self.start(content_type='text/plain').status_code, 400)
+
+        upload = AttachmentUpload.objects.get(pk=self.start().data['id'])
+        self.assertEqual(self.send(upload.pk, 0, b'x' * 11).status_code, 413)
+        uploads.append_chunk(upload, 0, BytesIO(b'0123'))
+        with self.assertRaises(uploads.UploadTooLarge):
+            # Sem Content-Length o excesso só é percebido durante a leitura
+            uploads.append_chunk(upload, 4, BytesIO(b'x' * 100))
+        upload.refresh_from_db()
+        self.assertEqual(upload.recebido, 4)
+        self.assertEqual(os.path.getsize(uploads.temp_path(upload)), 4)
+
+    def test_completed_upload_invalidates_detail_etag(self):
+        url = f'/api/requests/{self.request.pk}/'
+        etag = self.client.get(url)['ETag']
+        upload_id = self.start().data['id']
+        self.send(upload_id, 0, b'0123456789')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['anexos']), 1)
+
+        etag = response['ETag']
+        call_command('generate_thumbnails', workers=1, stdout=StringIO())
+        self.assertNotEqual(RequestAttachment.objects.get().miniatura_status, 'PENDENTE')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_uploads_are_private_to_their_owner(self):
+        upload_id = self.start().data['id']
+        other = authenticated_client(create_user('outro'))
+        self.assertEqual(other.get(f'/api/uploads/{upload_id}/').status_code, 404)
+        self.assertEqual(other.post(f'/api/requests/{self.request.pk}/uploads/', {}, format='json').status_code, 404)
+        self.assertEqual(self.client.delete(f'/api/uploads/{upload_id}/').status_code, 204)
+
+
+class ThumbnailTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        settings = override_settings(MEDIA_ROOT=self.media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.comum = create_user('comum')
+        self.request = create_request(self.comum)
+
+    def attach(self, name, content, content_type, sha256=''):
+        path = os.path.join(self.media.name, 'anexos', name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as output:
+            output.write(content)
+        return RequestAttachment.objects.create(
+            request=self.request, arquivo=f'anexos/{name}', nome_original=name, content_type=content_type,
+            tamanho=len(content), sha256=sha256,
+        )
+
+    def test_pipeline_generates_thumbnails_and_stores_status(self):
+        buffer = BytesIO()
+        Image.new('RGB', (1600, 1200), 'red').save(buffer, 'PNG')
+        photo = self.attach('foto.png', buffer.getvalue(), 'image/png', sha256='ab' * 32)
+        video = self.attach('video.mp4', b'nao e um video', 'video/mp4')
+        broken = self.attach('quebrada.jpg', b'nao e uma imagem', 'image/jpeg')
+
+        call_command('generate_thumbnails', workers=2, stdout=StringIO())
+        photo.refresh_from_db()
+        video.refresh_from_db()
+        broken.refresh_from_db()
+        self.assertEqual(photo.miniatura_status, 'PRONTA')
+        self.assertIn(video.miniatura_status, ('SEM_PREVIA', 'ERRO'))
+        self.assertEqual(broken.miniatura_status, 'ERRO')
+        with Image.open(os.path.join(self.media.name, photo.miniatura)) as thumbnail:
+            self.assertLessEqual(max(thumbnail.size), 320)
+
+        anexos = authenticated_client(self.comum).get(f'/api/requests/{self.request.pk}/').data['anexos']
+        urls = {anexo['id']: anexo['miniatura_url'] for anexo in anexos}
+        self.assertTrue(urls[photo.pk].endswith(photo.miniatura))
+        self.assertIsNone(urls[broken.pk])
+
+        # Reexecução não reprocessa o que já foi resolvido
+        output = StringIO()
+        call_command('generate_thumbnails', workers=1, stdout=output)
+        self.assertIn('nenhum anexo pendente', output.getvalue())
+
+
+class StatusTransitionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.comum = create_user('comum')
+        self.tecnicos = [create_user(f'tecnico{i}', 'MANUTENCAO') for i in range(2)]
+        self.request = create_request(self.comum)
+
+    def post(self, user, action, data=None):
+        return authenticated_client(user).post(f'/api/requests/{self.request.pk}/{action}/', data or {}, format='json')
+
+    def test_concurrent_accept_has_a_single_winner(self):
+        first = MaintenanceRequest.objects.get(pk=self.request.pk)
+        second = MaintenanceRequest.objects.get(pk=self.request.pk)
+        with CaptureQueriesContext(connection) as ctx:
+            transitions.apply(first, 'ACEITA', self.tecnicos[0], responsavel_manutencao=self.tecnicos[0])
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "maintenance_maintenancerequest"')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"status" = ', updates[0].split('WHERE')[1])
+
+        with self.assertRaises(transitions.TransitionConflict) as conflict:
+            transitions.apply(second, 'ACEITA', self.tecnicos[1], responsavel_manutencao=self.tecnicos[1])
+        self.assertEqual(conflict.exception.current_status, 'ACEITA')
+        self.request.refresh_from_db()
+        self.assertEqual(self.request.responsavel_manutencao, self.tecnicos[0])
+        self.assertIsNotNone(self.request.hora_aceite)
+        self.assertEqual(self.request.historico.count(), 1)
+
+    def test_workflow_through_the_api(self):
+        tecnico = self.tecnicos[0]
+        self.assertEqual(self.post(tecnico, 'complete_maintenance').status_code, 409)
+        self.assertEqual(self.post(tecnico, 'mark_viewed').status_code, 200)
+        self.assertEqual(self.post(tecnico, 'accept').status_code, 200)
+        self.assertEqual(self.post(self.tecnicos[1], 'accept').status_code, 409)
+        self.assertEqual(self.post(tecnico, 'start_maintenance').status_code, 200)
+        self.assertEqual(self.post(tecnico, 'pause_maintenance').status_code, 400)
+        self.assertEqual(self.post(tecnico, 'pause_maintenance', {'motivo_parada': 'Aguardando peça'}).status_code, 200)
+        self.assertEqual(self.post(tecnico, 'resume_maintenance').status_code, 200)
+        response = self.post(tecnico, 'complete_maintenance', {'descricao_manutencao': 'Troca do retentor'})
+        self.assertEqual(response.status_code, 200)
+
+        self.request.refresh_from_db()
+        self.assertEqual(self.request.status, 'CONCLUIDA')
+        self.assertEqual(self.request.descricao_manutencao, 'Troca do retentor')
+        self.assertLessEqual(self.request.hora_aceite, self.request.hora_inicio)
+        self.assertLessEqual(self.request.hora_inicio, self.request.hora_termino)
+        self.assertEqual(self.request.historico.count(), 6)
+        self.assertEqual(MaintenanceRollup.objects.get(dimensao='GERAL').total_reparos, 1)
+        self.assertEqual(Notification.objects.filter(usuario=self.comum).count(), 2)
+
+    def test_paused_request_can_be_completed(self):
+        tecnico = self.tecnicos[0]
+        for target, fields in (('ACEITA', {}), ('EM_ATENDIMENTO', {}), ('PARADA', {'motivo_parada': 'Peça'})):
+            transitions.apply(self.request, target, tecnico, **fields)
+        self.assertEqual(self.post(tecnico, 'complete_maintenance').status_code, 200)
+        self.request.refresh_from_db()
+        self.assertEqual(self.request.status, 'CONCLUIDA')
+        self.assertIsNotNone(self.request.hora_termino)
+
+    def test_update_endpoint_follows_the_transition_table(self):
+        client = authenticated_client(self.comum)
+        url = f'/api/requests/{self.request.pk}/'
+        self.assertEqual(client.patch(url, {'status': 'CONCLUIDA'}, format='json').status_code, 409)
+        self.assertEqual(client.patch(url, {'status': 'CANCELADA'}, format='json').status_code, 400)
+        response = client.patch(url, {'status': 'CANCELADA', 'motivo_cancelamento': 'Aberta por engano'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.request.refresh_from_db()
+        self.assertEqual((self.request.status, self.request.motivo_cancelamento), ('CANCELADA', 'Aberta por engano'))
+        self.assertEqual(self.request.historico.get().descricao, 'Status alterado de ABERTA para CANCELADA')
+
+
+class DeadlineNotificationTests(TestCase):
+    today = date(2030, 1, 10)
+
+    def setUp(self):
+        cache.clear()
+        self.comum = create_user('comum')
+        self.tecnico = create_user('tecnico', 'MANUTENCAO')
+
+    def due_in(self, days, **kwargs):
+        return create_request(self.comum, prazo_limite=self.today + timedelta(days=days), **kwargs)
+
+    def run_scheduler(self, today=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return deadlines.notify_due_requests(window_days=2, today=today or self.today)
+
+    def test_only_newly_due_requests_are_notified_once(self):
+        soon = self.due_in(1)
+        later = self.due_in(5)
+        self.due_in(-3)
+        self.due_in(1, status='CONCLUIDA')
+        self.assertEqual(unread.get_unread_count(self.tecnico), 0)
+
+        self.assertEqual(self.run_scheduler(), 2)
+        self.assertEqual(self.run_scheduler(), 0)
+        notifications = Notification.objects.filter(request=soon)
+        self.assertEqual({(n.usuario_id, n.perfil_destino) for n in notifications},
+                         {(self.comum.pk, ''), (None, 'MANUTENCAO')})
+        self.assertEqual(unread.get_unread_count(self.tecnico), 1)
+
+        assigned = self.due_in(1, responsavel_manutencao=self.tecnico)
+        self.assertEqual(self.run_scheduler(), 2)
+        self.assertTrue(Notification.objects.filter(request=assigned, usuario=self.tecnico).exists())
+
+        self.assertEqual(self.run_scheduler(self.today + timedelta(days=4)), 2)
+        self.assertEqual(Notification.objects.filter(request=later).count(), 2)
+        self.assertEqual(Notification.objects.count(), 6)
+
+    def test_deadline_edited_into_covered_range_is_notified(self):
+        request = self.due_in(400)
+        self.assertEqual(self.run_scheduler(), 0)
+        request.prazo_limite = self.today + timedelta(days=1)
+        request.save()
+        self.assertEqual(self.run_scheduler(), 2)
+        self.assertEqual(self.run_scheduler(), 0)
+        self.assertEqual(Notification.objects.filter(request=request).count(), 2)
+
+    def test_duplicate_keys_are_ignored(self):
+        request = self.due_in(1)
+        self.run_scheduler()
+        SchedulerCheckpoint.objects.all().delete()
+        self.assertEqual(self.run_scheduler(), 0)
+        self.assertEqual(Notification.objects.filter(request=request).count(), 2)
+
+    async def test_notifications_reach_event_subscribers(self):
+        request = await sync_to_async(self.due_in)(1)
+        broker = events.InProcessBroker()
+        subscription = broker.subscribe([f'user:{self.comum.pk}', 'perfil:MANUTENCAO'])
+        with mock.patch.object(events, 'get_broker', return_value=broker):
+            self.assertEqual(await sync_to_async(self.run_scheduler)(), 2)
+        received = [await subscription.get(timeout=1) for _ in range(2)]
+        subscription.close()
+        ids = [notification.pk async for notification in Notification.objects.filter(request=request)]
+        self.assertEqual(sorted(event['id'] for event in received), sorted(ids))
+        self.assertEqual({event['request'] for event in received}, {request.pk})
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        settings = override_settings(ARCHIVE_DIR=self.directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.comum = create_user('comum')
+        self.tecnico = create_user('tecnico', 'MANUTENCAO')
+        self.now = timezone.now()
+
+    def closed_request(self, days_ago):
+        request = create_request(self.comum, status='CONCLUIDA')
+        for index, acao in enumerate(['CRIADA', 'STATUS_ALTERADO']):
+            entry = RequestHistory.objects.create(request=request, usuario=self.tecnico, acao=acao, descricao=acao)
+            RequestHistory.objects.filter(pk=entry.pk).update(
+                data_acao=self.now - timedelta(days=days_ago + 10 - index)
+            )
+        MaintenanceRequest.objects.filter(pk=request.pk).update(data_atualizacao=self.now - timedelta(days=days_ago))
+        request.refresh_from_db()
+        return request
+
+    def notification(self, days_ago, **kwargs):
+        notification = Notification.objects.create(titulo='Aviso', mensagem='Aviso', **kwargs)
+        Notification.objects.filter(pk=notification.pk).update(data_criacao=self.now - timedelta(days=days_ago))
+        return notification
+
+    def test_expired_rows_move_to_compressed_partitions(self):
+        old = self.closed_request(400)
+        recent = self.closed_request(30)
+        archived = self.notification(100, usuario=self.comum, lida=True)
+        kept = [
+            self.notification(100, usuario=self.comum),
+            self.notification(100, perfil_destino='MANUTENCAO'),
+            self.notification(10, usuario=self.comum, lida=True),
+        ]
+
+        self.assertEqual(archive.archive_expired(now=self.now, batch_size=1), (2, 1))
+        self.assertEqual(archive.archive_expired(now=self.now, batch_size=1), (0, 0))
+        self.assertFalse(old.historico.exists())
+        self.assertEqual(recent.historico.count(), 2)
+        self.assertEqual(set(Notification.objects.values_list('pk', flat=True)), {item.pk for item in kept})
+
+        old.refresh_from_db()
+        day = timezone.localdate(old.data_atualizacao)
+        self.assertEqual(old.arquivo_historico, f'historico/{day:%Y}/{day:%m}/{day:%Y-%m-%d}.jsonl.gz')
+        self.assertEqual(old.data_atualizacao, self.now - timedelta(days=400))
+        notifications = list(archive.read_records(archive.partition_path('notificacoes', self.now - timedelta(days=100))))
+        self.assertEqual([record['id'] for record in notifications], [archived.pk])
+
+    def test_history_endpoint_reads_archived_entries(self):
+        request = self.closed_request(400)
+        archive.archive_expired(now=self.now)
+        request.refresh_from_db()
+        RequestHistory.objects.create(request=request, usuario=self.tecnico, acao='COMENTARIO', descricao='Reaberta')
+        # Lote regravado após uma falha entre a escrita e a exclusão
+        archive.append_records(request.arquivo_historico, list(archive.read_records(request.arquivo_historico)))
+
+        response = authenticated_client(self.comum).get(f'/api/requests/{request.pk}/')
+        self.assertEqual([entry['acao'] for entry in response.data['historico']],
+                         ['COMENTARIO', 'STATUS_ALTERADO', 'CRIADA'])
+        self.assertEqual(response.data['historico'][1]['usuario']['username'], 'tecnico')
+
+    def test_export_includes_archived_history(self):
+        request = self.closed_request(400)
+        archive.archive_expired(now=self.now)
+        RequestHistory.objects.create(request=request, usuario=self.tecnico, acao='COMENTARIO', descricao='Reaberta')
+
+        response = authenticated_client(self.comum).get('/api/requests/export/')
+        rows = list(csv.reader(StringIO(b''.join(response.streaming_content).decode('utf-8-sig'))))
+        entries = rows[1][-1].split(' | ')
+        self.assertEqual([entry.split(' ')[3] for entry in entries], ['CRIADA:', 'STATUS_ALTERADO:', 'COMENTARIO:'])
+        self.assertIn('tecnico CRIADA: CRIADA', entries[0])
+
+    def test_equipment_history_flags_archived_entries(self):
+        prensa = Equipment.objects.create(codigo='PRENSA-03', nome='Prensa 3', tipo='PRENSA')
+        request = self.closed_request(400)
+        request.equipamentos.add(prensa)
+        client = authenticated_client(self.comum)
+        self.assertFalse(client.get(f'/api/equipment/{prensa.pk}/history/').data['arquivado'])
+
+        archive.archive_expired(now=self.now)
+        response = client.get(f'/api/equipment/{prensa.pk}/history/')
+        self.assertEqual(response.data['results'], [])
+        self.assertTrue(response.data['arquivado'])
+
+
+class BulkOperationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = create_user('admin', 'TI')
+        self.comum = create_user('comum')
+        self.tecnico = create_user('tecnico', 'MANUTENCAO')
+        self.prensa = Equipment.objects.create(codigo='PRENSA-03', nome='Prensa 3', tipo='PRENSA')
+
+    def row(self, **kwargs):
+        return {
+            'prazo_limite': '2030-01-01', 'setor_solicitante': 'Produção', 'tipo_manutencao': 'MECANICA',
+            'status_operacional': 'PARCIAL', 'titulo_curto': 'Vazamento de óleo',
+            'descricao_problema': 'Vazamento na prensa', **kwargs,
+        }
+
+    def test_import_uses_batched_writes(self):
+        client = authenticated_client(self.admin)
+        legacy = self.row(
+            solicitante='comum', status='CONCLUIDA', responsavel_manutencao='tecnico', equipamentos=['PRENSA-03'],
+            titulo_curto='Rolamento travado', data_criacao='2024-03-01T08:00:00Z',
+            hora_aceite='2024-03-01T09:00:00Z', hora_inicio='2024-03-01T10:00:00Z', hora_termino='2024-03-01T12:00:00Z',
+        )
+        response = client.post('/api/requests/bulk_import/', [legacy, self.row(solicitante='fantasma')], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(MaintenanceRequest.objects.exists())
+
+        rows = [legacy] + [self.row(equipamentos_impactados=['FRESA']) for _ in range(59)]
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as ctx:
+            response = client.post('/api/requests/bulk_import/', rows, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['importadas'], 60)
+        self.assertLess(len(ctx.captured_queries), 60)
+
+        imported = MaintenanceRequest.objects.get(pk=response.data['numeros_requisicao'][0])
+        self.assertEqual(imported.solicitante, self.comum)
+        self.assertEqual(imported.data_criacao.isoformat(), '2024-03-01T08:00:00+00:00')
+        self.assertEqual(imported.data_atualizacao.isoformat(), '2024-03-01T12:00:00+00:00')
+        self.assertEqual(list(imported.equipamentos.values_list('codigo', flat=True)), ['PRENSA-03'])
+        self.assertEqual(RequestHistory.objects.filter(acao='IMPORTADA').count(), 60)
+        self.assertEqual(MaintenanceRequest.objects.filter(equipamentos__tipo='FRESA').count(), 59)
+        self.assertEqual(get_search_backend().search(MaintenanceRequest.objects.all(), 'rolamento'), [imported.pk])
+        geral = MaintenanceRollup.objects.get(dimensao='GERAL')
+        self.assertEqual((geral.total_requisicoes, geral.total_reparos, geral.soma_tempo_reparo), (60, 1, 7200))
+        self.assertEqual(dashboard.get_status_counts()['ABERTA'], 59)
+        self.assertEqual(Notification.objects.get().perfil_destino, 'MANUTENCAO')
+
+    def test_import_csv_in_export_format(self):
+        content = 'numero_requisicao,solicitante,prazo_limite,setor_solicitante,tipo_manutencao,' \
+                  'status_operacional,titulo_curto,descricao_problema,equipamentos,responsavel_manutencao\n' \
+                  '7,comum,2030-01-01,Produção,ELETRICA,INOPERANTE,Painel,Painel sem energia,PRENSA-03,\n'
+        upload = SimpleUploadedFile('legado.csv', content.encode('utf-8-sig'), content_type='text/csv')
+        response = authenticated_client(self.admin).post('/api/requests/bulk_import/', {'arquivo': upload})
+        self.assertEqual(response.status_code, 201)
+        request = MaintenanceRequest.objects.get()
+        self.assertEqual((request.solicitante, request.tipo_manutencao), (self.comum, 'ELETRICA'))
+        self.assertEqual(authenticated_client(self.comum).post('/api/requests/bulk_import/', [], format='json').status_code, 403)
+
+    def test_bulk_transition_skips_ineligible_requests(self):
+        requests = [create_request(self.comum) for _ in range(3)]
+        MaintenanceRequest.objects.filter(pk=requests[2].pk).update(status='CONCLUIDA', responsavel_manutencao=self.tecnico)
+        dashboard.reconcile()
+        client = authenticated_client(self.tecnico)
+        ids = [request.pk for request in requests] + [999]
+        self.assertEqual(client.post('/api/requests/bulk_transition/', {'ids': ids, 'status': 'PARADA'},
+                                     format='json').status_code, 400)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post('/api/requests/bulk_transition/', {'ids': ids, 'status': 'ACEITA'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['alteradas'], [requests[0].pk, requests[1].pk])
+        self.assertEqual(response.data['ignoradas'], {requests[2].pk: 'CONCLUIDA', 999: None})
+        accepted = MaintenanceRequest.objects.filter(status='ACEITA')
+        self.assertEqual(set(accepted.values_list('responsavel_manutencao', flat=True)), {self.tecnico.pk})
+        self.assertFalse(accepted.filter(hora_aceite__isnull=True).exists())
+        self.assertEqual(RequestHistory.objects.filter(acao='STATUS_ALTERADO').count(), 2)
+        self.assertEqual(Notification.objects.filter(usuario=self.comum, titulo='Requisição Aceita').count(), 2)
+        self.assertEqual(unread.get_unread_count(self.comum), 2)
+        self.assertEqual(MaintenanceRollup.objects.get(dimensao='GERAL').total_respondidas, 2)
+        counts = dashboard.get_status_counts()
+        self.assertEqual((counts['ABERTA'], counts['ACEITA']), (0, 2))
+
+    def test_bulk_mark_as_read(self):
+        direct = [Notification.objects.create(usuario=self.tecnico, titulo='Aviso', mensagem='Aviso') for _ in range(2)]
+        broadcast = Notification.objects.create(perfil_destino='MANUTENCAO', titulo='Aviso', mensagem='Aviso')
+        other = Notification.objects.create(usuario=self.comum, titulo='Aviso', mensagem='Aviso')
+        self.assertEqual(unread.get_unread_count(self.tecnico), 3)
+
+        ids = [direct[0].pk, broadcast.pk, other.pk]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = authenticated_client(self.tecnico).post(
+                '/api/notifications/bulk_mark_as_read/', {'ids': ids}, format='json'
+            )
+        self.assertEqual(response.data['marcadas'], 2)
+        self.assertEqual(unread.get_unread_count(self.tecnico), 1)
+        self.assertEqual(unread.rebuild(self.tecnico), 1)
+        other.refresh_from_db()
+        self.assertFalse(other.lida)
+
+
+class DatabaseConnectionTests(TestCase):
+    def test_sqlite_pragmas_are_applied_to_new_connections(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 20000)
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+
+    def journal_mode_after_connecting(self, path, demo):
+        wrapper = type(connections['default'])({**connection.settings_dict, 'NAME': path}, alias='journal_mode')
+        with override_settings(SQLITE_DEMO_DATABASE=demo):
+            with wrapper.cursor() as cursor:
+                cursor.execute('CREATE TABLE IF NOT EXISTS exemplo (id integer)')
+        wrapper.close()
+        with open(path, 'rb') as database:
+            # Versões de escrita/leitura do cabeçalho: 1 = journal de rollback, 2 = WAL
+            return database.read(20)[18:20]
+
+    def test_demo_database_keeps_its_journal_mode(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        demo = os.path.join(directory.name, 'demo.sqlite3')
+        other = os.path.join(directory.name, 'outro.sqlite3')
+        self.assertEqual(self.journal_mode_after_connecting(demo, demo), b'\x01\x01')
+        self.assertEqual(self.journal_mode_after_connecting(other, demo), b'\x02\x02')
+
+
+class SeedDataTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_seed_data_creates_consistent_workload(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('seed_data', users=12, requests=60, batch_size=25, stdout=StringIO())
+        self.assertEqual(
+            set(UserProfile.objects.values_list('profile_type', flat=True)), {'COMUM', 'MANUTENCAO', 'GESTOR', 'TI'}
+        )
+        requests = MaintenanceRequest.objects.all()
+        self.assertEqual(requests.count(), 60)
+        self.assertGreater(requests.values('status').distinct().count(), 1)
+        self.assertEqual(RequestHistory.objects.filter(acao='CRIADA').count(), 60)
+        self.assertFalse(requests.filter(status='CONCLUIDA', hora_termino__isnull=True).exists())
+        self.assertTrue(requests.filter(data_criacao__lt=timezone.now() - timedelta(days=1)).exists())
+        self.assertTrue(RequestAttachment.objects.exists())
+        self.assertTrue(Notification.objects.filter(perfil_destino='MANUTENCAO').exists())
+        self.assertEqual(MaintenanceRollup.objects.get(dimensao='GERAL').total_requisicoes, 60)
+        self.assertEqual(sum(dashboard.get_status_counts().values()), 60)
+        self.assertEqual(len(get_search_backend().search(requests, 'vazamento')),
+                         requests.filter(titulo_curto__icontains='vazamento').count())
+
+    def test_same_seed_generates_same_data(self):
+        call_command('seed_data', users=8, requests=20, seed=7, stdout=StringIO())
+        first = list(MaintenanceRequest.objects.order_by('pk').values_list('status', 'titulo_curto', 'prioridade'))
+        MaintenanceRequest.objects.all().delete()
+        call_command('seed_data', users=8, requests=20, seed=7, stdout=StringIO())
+        self.assertEqual(
+            list(MaintenanceRequest.objects.order_by('pk').values_list('status', 'titulo_curto', 'prioridade')), first
+        )
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        profiling.registry.reset()
+        self.comum = create_user('comum')
+        self.admin = create_user('admin', 'TI')
+        create_request(self.comum)
+
+    def server_timing(self, response):
+        entries = {}
+        for entry in response['Server-Timing'].split(', '):
+            name, *params = entry.split(';')
+            entries[name] = dict(param.split('=', 1) for param in params)
+        return entries
+
+    def test_server_timing_header_breaks_down_request(self):
+        client = authenticated_client(self.comum)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/requests/')
+        timing = self.server_timing(response)
+        self.assertEqual(set(timing), {'db', 'auth', 'serializacao', 'total'})
+        self.assertEqual(timing['db']['desc'], f'"{len(queries)} consultas"')
+        self.assertGreaterEqual(float(timing['total']['dur']), float(timing['db']['dur']))
+
+    async def test_queries_are_counted_under_asgi(self):
+        token = await Token.objects.acreate(user=self.comum)
+        response = await AsyncClient().get('/api/requests/', headers={'Authorization': f'Token {token.key}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(self.server_timing(response)['db']['desc'], '"0 consultas"')
+
+    def test_metrics_endpoint_is_restricted_to_ti(self):
+        authenticated_client(self.comum).get('/api/requests/')
+        self.assertEqual(authenticated_client(self.comum).get('/metrics').status_code, 403)
+
+        response = authenticated_client(self.admin).get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        labels = 'view="maintenancerequest-list",method="GET"'
+        self.assertIn(f'maintenance_http_request_duration_seconds_count{{{labels}}} 1', body)
+        self.assertIn(f'maintenance_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1', body)
+        self.assertIn(f'maintenance_http_request_queries_count{{{labels}}} 1', body)
+        self.assertIn(f'maintenance_http_responses_total{{{labels},status="200"}} 1', body)
+        self.assertIn('maintenance_http_responses_total{view="metrics",method="GET",status="403"} 1', body)
+
+    def test_slow_queries_are_logged_with_view_name(self):
+        client = authenticated_client(self.comum)
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=0), self.assertLogs('maintenance.profiling', 'WARNING') as logs:
+            client.get('/api/requests/')
+        self.assertTrue(all('em maintenancerequest-list: SELECT' in line for line in logs.output))
+
+
+class UrgencyQueueTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.comum = create_user('comum')
+        self.tecnico = create_user('tecnico', 'MANUTENCAO')
+        self.today = timezone.localdate()
+
+    def test_score_is_kept_on_writes(self):
+        request = create_request(self.comum, prazo_limite=self.today + timedelta(days=30), prioridade=2)
+        self.assertEqual(request.urgencia, 200 + 100)
+        request.status_operacional = 'INOPERANTE'
+        request.prazo_limite = self.today
+        request.save(update_fields=['status_operacional', 'prazo_limite'])
+        request.refresh_from_db()
+        self.assertEqual(request.urgencia, 200 + 300 + 400)
+
+        transitions.apply(request, 'ACEITA', self.tecnico, responsavel_manutencao=self.tecnico)
+        self.assertEqual(MaintenanceRequest.objects.get(pk=request.pk).urgencia, 900)
+        transitions.apply(request, 'CANCELADA', self.comum, motivo_cancelamento='Duplicada')
+        self.assertIsNone(MaintenanceRequest.objects.get(pk=request.pk).urgencia)
+
+    def test_queue_is_ordered_by_urgency(self):
+        low = create_request(self.comum, prazo_limite=self.today + timedelta(days=30), status_operacional='FUNCIONANDO')
+        overdue = create_request(self.comum, prazo_limite=self.today - timedelta(days=1))
+        stopped = create_request(self.comum, prazo_limite=self.today + timedelta(days=30),
+                                 status_operacional='INOPERANTE', prioridade=4)
+        closed = create_request(self.comum, prazo_limite=self.today, prioridade=5)
+        transitions.apply(closed, 'CANCELADA', self.comum, motivo_cancelamento='Duplicada')
+
+        response = authenticated_client(self.tecnico).get('/api/requests/queue/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['numero_requisicao'] for row in response.data['results']],
+                         [stopped.pk, overdue.pk, low.pk])
+        self.assertEqual([row['urgencia'] for row in response.data['results']], [700, 600, 100])
+        self.assertEqual(authenticated_client(self.comum).get('/api/requests/queue/').status_code, 403)
+
+    def test_queue_reads_top_of_partial_index(self):
+        queue = MaintenanceRequest.objects.filter(urgencia__isnull=False).order_by('-urgencia', 'numero_requisicao')
+        plan = queue[:50].explain()
+        self.assertIn('req_urgencia_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_refresh_rescores_only_requests_entering_a_deadline_band(self):
+        near = create_request(self.comum, prazo_limite=self.today + timedelta(days=3))
+        far = create_request(self.comum, prazo_limite=self.today + timedelta(days=30))
+        self.assertEqual(urgency.refresh_urgency(self.today), 0)
+        self.assertEqual(MaintenanceRequest.objects.get(pk=near.pk).urgencia, 100 + 100 + 100)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(urgency.refresh_urgency(self.today + timedelta(days=2)), 1)
+        self.assertEqual(MaintenanceRequest.objects.get(pk=near.pk).urgencia, 100 + 100 + 300)
+        self.assertEqual(MaintenanceRequest.objects.get(pk=far.pk).urgencia, 100 + 100)
+        self.assertLess(len(queries), 10)
+
+    def test_refresh_invalidates_etags(self):
+        request = create_request(self.comum, prazo_limite=self.today + timedelta(days=3), prioridade=1)
+        urgency.refresh_urgency(self.today)
+        client = authenticated_client(self.comum)
+        url = f'/api/requests/{request.pk}/'
+        response = client.get(url)
+        self.assertEqual(response.data['urgencia'], 300)
+
+        urgency.refresh_urgency(self.today + timedelta(days=2))
+        changed = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.data['urgencia'], 500)
+
+
+class TechnicianWorkloadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.comum = create_user('comum')
+        self.eletricista = create_user('eletricista', 'MANUTENCAO')
+        self.mecanico = create_user('mecanico', 'MANUTENCAO')
+        TechnicianWorkload.objects.filter(usuario=self.eletricista).update(especialidade='ELETRICA')
+        TechnicianWorkload.objects.filter(usuario=self.mecanico).update(especialidade='MECANICA')
+
+    def load(self, user):
+        return TechnicianWorkload.objects.get(usuario=user).abertas
+
+    def create_via_api(self, tipo='ELETRICA'):
+        payload = {
+            'prazo_limite': '2030-01-01', 'setor_solicitante': 'Produção',
+            'tipo_manutencao': tipo, 'status_operacional': 'INOPERANTE',
+            'equipamentos_impactados': ['FRESA'], 'titulo_curto': 'Motor queimado',
+            'descricao_problema': 'Motor da fresa não liga',
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            response = authenticated_client(self.comum).post('/api/requests/', payload, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return MaintenanceRequest.objects.latest('pk')
+
+    def test_workload_follows_transitions(self):
+        request = create_request(self.comum)
+        transitions.apply(request, 'ACEITA', self.mecanico, responsavel_manutencao=self.mecanico)
+        transitions.apply(request, 'EM_ATENDIMENTO', self.mecanico)
+        self.assertEqual(self.load(self.mecanico), 1)
+        transitions.apply(request, 'PARADA', self.mecanico, motivo_parada='Aguardando peça')
+        self.assertEqual(self.load(self.mecanico), 0)
+        transitions.apply(request, 'EM_ATENDIMENTO', self.mecanico)
+        request.responsavel_manutencao = self.eletricista
+        request.save()
+        self.assertEqual((self.load(self.mecanico), self.load(self.eletricista)), (0, 1))
+
+        others = [create_request(self.comum) for _ in range(2)]
+        transitions.apply_many(MaintenanceRequest.objects.all(), [item.pk for item in others], 'ACEITA',
+                               self.mecanico, responsavel_manutencao=self.mecanico)
+        self.assertEqual(self.load(self.mecanico), 2)
+        MaintenanceRequest.objects.get(pk=others[0].pk).delete()
+        transitions.apply(request, 'CONCLUIDA', self.eletricista)
+        self.assertEqual((self.load(self.mecanico), self.load(self.eletricista)), (1, 0))
+
+        TechnicianWorkload.objects.update(abertas=7)
+        TechnicianWorkload.objects.rebuild()
+        self.assertEqual((self.load(self.mecanico), self.load(self.eletricista)), (1, 0))
+
+    def test_auto_assign_is_off_by_default(self):
+        request = self.create_via_api()
+        self.assertEqual((request.status, request.responsavel_manutencao), ('ABERTA', None))
+        self.assertTrue(Notification.objects.filter(perfil_destino='MANUTENCAO').exists())
+
+    @override_settings(AUTO_ASSIGN_REQUESTS=True)
+    def test_auto_assign_picks_least_loaded_then_specialty(self):
+        first = self.create_via_api('ELETRICA')
+        self.assertEqual((first.status, first.responsavel_manutencao), ('ACEITA', self.eletricista))
+        self.assertTrue(first.historico.filter(acao='ATRIBUICAO_AUTOMATICA').exists())
+        self.assertTrue(Notification.objects.filter(usuario=self.eletricista, request=first).exists())
+        self.assertTrue(Notification.objects.filter(usuario=self.comum, titulo='Requisição Aceita').exists())
+        self.assertFalse(Notification.objects.filter(perfil_destino='MANUTENCAO').exists())
+
+        # O eletricista está ocupado: menor carga vence a especialidade
+        second = self.create_via_api('ELETRICA')
+        self.assertEqual(second.responsavel_manutencao, self.mecanico)
+        self.assertEqual((self.load(self.eletricista), self.load(self.mecanico)), (1, 1))
+
+        TechnicianWorkload.objects.filter(usuario=self.eletricista).update(disponivel=False)
+        for _ in range(3):
+            create_request(self.comum)
+        request = create_request(self.comum, tipo_manutencao='ELETRICA')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(TechnicianWorkload.objects.claim(request, timezone.now()), self.mecanico.pk)
+        self.assertEqual(len(queries), 2)
@@ -0,0 +1,115 @@
+"""
+Miniaturas de fotos e quadros de capa de vídeos anexados.
+
+``generate_pending`` lê em lotes os anexos com ``miniatura_status='PENDENTE'``
+e distribui a renderização em um ``ProcessPoolExecutor``; os processos
+trabalhadores só leem e gravam arquivos, e os status são gravados pelo processo
+principal, que também avança ``data_atualizacao`` das requisições (o ETag do
+detalhe passa a refletir o novo status). As miniaturas ficam em ``miniaturas/``
+sob ``MEDIA_ROOT`` com nome derivado do SHA-256 do anexo, então arquivos
+repetidos (e reexecuções) reaproveitam a mesma imagem. Quadros de vídeo usam o ``ffmpeg``, se estiver instalado.
+"""
+import os
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from .models import MaintenanceRequest, RequestAttachment
+
+THUMBNAIL_SIZE = (320, 320)
+THUMBNAIL_QUALITY = 80
+VIDEO_FRAME_SECONDS = 1
+FFMPEG_TIMEOUT = 60
+
+
+def thumbnail_name(attachment):
+    key = attachment.sha256 or f'anexo-{attachment.pk}'
+    return f'miniaturas/{key[:2]}/{key}-{THUMBNAIL_SIZE[0]}.jpg'
+
+
+def render_image(source, target):
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(THUMBNAIL_SIZE)
+        image.convert('RGB').save(target, 'JPEG', quality=THUMBNAIL_QUALITY, optimize=True)
+
+
+def render_video_frame(source, target, ffmpeg):
+    # Sem -ss antes do início do vídeo, vídeos com menos de 1 s geram o primeiro quadro
+    for seek in (VIDEO_FRAME_SECONDS, 0):
+        subprocess.run(
+            [ffmpeg, '-v', 'error', '-y', '-ss', str(seek), '-i', source, '-frames:v', '1',
+             '-vf', f'scale={THUMBNAIL_SIZE[0]}:-2', target],
+            check=True, timeout=FFMPEG_TIMEOUT, stdin=subprocess.DEVNULL,
+        )
+        if os.path.exists(target) and os.path.getsize(target):
+            return
+    raise ValueError('ffmpeg não gerou nenhum quadro')
+
+
+def render(job):
+    """Executado nos processos trabalhadores: (pk, origem, destino, content_type) -> (pk, status)"""
+    pk, source, target, content_type = job
+    if os.path.exists(target):
+        return pk, 'PRONTA'
+    ffmpeg = shutil.which('ffmpeg')
+    if content_type.startswith('video/') and not ffmpeg:
+        return pk, 'SEM_PREVIA'
+    if not content_type.startswith(('image/', 'video/')):
+        return pk, 'SEM_PREVIA'
+
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    partial = f'{target}.{os.getpid()}.tmp'
+    try:
+        if content_type.startswith('video/'):
+            render_video_frame(source, partial, ffmpeg)
+        else:
+            render_image(source, partial)
+        os.replace(partial, target)
+    except Exception:
+        if os.path.exists(partial):
+            os.remove(partial)
+        return pk, 'ERRO'
+    return pk, 'PRONTA'
+
+
+def guess_content_type(attachment):
+    if attachment.content_type:
+        return attachment.content_type
+    extension = os.path.splitext(attachment.arquivo.name)[1].lower()
+    if extension in ('.mp4', '.mov', '.avi', '.mkv', '.webm', '.3gp'):
+        return 'video/*'
+    return 'image/*'
+
+
+def generate_pending(workers=None, batch_size=100, statuses=('PENDENTE',)):
+    """Processa os anexos nos ``statuses`` indicados; retorna um contador por status final"""
+    totals = {}
+    last_pk = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            batch = list(
+                RequestAttachment.objects.filter(miniatura_status__in=statuses, pk__gt=last_pk)
+                .order_by('pk')[:batch_size]
+            )
+            if not batch:
+                return totals
+            last_pk = batch[-1].pk
+            by_pk = {attachment.pk: attachment for attachment in batch}
+            jobs = [
+                (attachment.pk, attachment.arquivo.path, os.path.join(settings.MEDIA_ROOT, thumbnail_name(attachment)),
+                 guess_content_type(attachment))
+                for attachment in batch
+            ]
+            for pk, status in pool.map(render, jobs):
+                attachment = by_pk[pk]
+                attachment.miniatura_status = status
+                attachment.miniatura = thumbnail_name(attachment) if status == 'PRONTA' else ''
+                totals[status] = totals.get(status, 0) + 1
+            with transaction.atomic():
+                RequestAttachment.objects.bulk_update(batch, ['miniatura', 'miniatura_status'])
+                MaintenanceRequest.objects.filter(pk__in={attachment.request_id for attachment in batch}).touch()
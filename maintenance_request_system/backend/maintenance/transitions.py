@@ -0,0 +1,166 @@
+"""
+Fluxo de status das requisições.
+
+``TRANSITIONS`` lista, para cada status de destino, os status de origem
+permitidos e os campos obrigatórios:
+
+    ABERTA -> VISUALIZADA -> ACEITA -> EM_ATENDIMENTO <-> PARADA
+    EM_ATENDIMENTO ou PARADA -> CONCLUIDA
+    (qualquer status em aberto) -> CANCELADA
+
+``apply`` troca o status com um UPDATE condicional
+(``WHERE numero_requisicao = ... AND status = <status lido>``), então entre
+duas chamadas concorrentes só uma altera a linha; a outra recebe
+``TransitionConflict``. O UPDATE é a única ida ao banco que decide a
+transição; na mesma transação seguem o INSERT do histórico e as gravações de
+``MaintenanceRequest.record_change`` (análise, carga dos técnicos, índice de
+busca quando um campo pesquisável muda) e, após o commit, os contadores do
+dashboard e os eventos.
+
+``apply_many`` faz o mesmo para uma lista de requisições: as linhas são
+travadas com ``select_for_update``, gravadas com ``bulk_update`` e o histórico
+com ``bulk_create``; requisições em um status de origem inválido são ignoradas.
+"""
+from functools import partial
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import dashboard, events
+from .models import MaintenanceRequest, MaintenanceRollup, RequestHistory, TechnicianWorkload
+from .search import SEARCH_FIELDS, get_search_backend
+
+BATCH_SIZE = 500
+
+OPEN_STATUSES = ('ABERTA', 'VISUALIZADA', 'ACEITA', 'EM_ATENDIMENTO', 'PARADA')
+
+# destino: (origens permitidas, campos obrigatórios)
+TRANSITIONS = {
+    'VISUALIZADA': (('ABERTA',), ()),
+    'ACEITA': (('ABERTA', 'VISUALIZADA'), ()),
+    'EM_ATENDIMENTO': (('ACEITA', 'PARADA'), ()),
+    'PARADA': (('EM_ATENDIMENTO',), ('motivo_parada',)),
+    'CONCLUIDA': (('EM_ATENDIMENTO', 'PARADA'), ()),
+    'CANCELADA': (OPEN_STATUSES, ('motivo_cancelamento',)),
+}
+
+
+class TransitionError(Exception):
+    status_code = 409
+
+    def __init__(self, message, current_status=None):
+        super().__init__(message)
+        self.current_status = current_status
+
+
+class TransitionConflict(TransitionError):
+    """Outra gravação alterou o status entre a leitura e o UPDATE"""
+
+
+class MissingTransitionFields(TransitionError):
+    status_code = 400
+
+
+def allowed_targets(status):
+    return [target for target, (sources, _) in TRANSITIONS.items() if status in sources]
+
+
+def apply(request, target, user, **fields):
+    """Leva ``request`` (já carregada) para ``target`` se o status no banco ainda for o lido"""
+    expected = request.status
+    if target not in TRANSITIONS or expected not in TRANSITIONS[target][0]:
+        raise TransitionError(f'Transição de {expected} para {target} não permitida', expected)
+    for name, value in fields.items():
+        setattr(request, name, value)
+    missing = [name for name in TRANSITIONS[target][1] if not getattr(request, name)]
+    if missing:
+        raise MissingTransitionFields(f'Campos obrigatórios: {", ".join(missing)}', expected)
+
+    now = timezone.now()
+    request.status = target
+    accepted, completed = request.stamp_times(now)
+    request.data_atualizacao = now
+    values = {
+        'status': target, 'data_atualizacao': now, 'hora_aceite': request.hora_aceite,
+        'hora_inicio': request.hora_inicio, 'hora_termino': request.hora_termino,
+        'urgencia': request.score_urgency(timezone.localdate(now)), **fields,
+    }
+
+    with transaction.atomic():
+        updated = MaintenanceRequest.objects.filter(pk=request.pk, status=expected).update(**values)
+        if not updated:
+            request.status = expected
+            current = MaintenanceRequest.objects.filter(pk=request.pk).values_list('status', flat=True).first()
+            raise TransitionConflict(f'A requisição foi alterada para {current} por outro usuário', current)
+        RequestHistory.objects.create(
+            request=request,
+            usuario=user,
+            acao='STATUS_ALTERADO',
+            descricao=f'Status alterado de {expected} para {target}'
+        )
+        request.record_change(
+            False, expected, accepted, completed, reindex=any(name in SEARCH_FIELDS for name in fields)
+        )
+    return expected
+
+
+def apply_many(queryset, ids, target, user, **fields):
+    """
+    Leva as requisições de ``queryset`` com os ``ids`` indicados para ``target``.
+
+    Retorna (requisições alteradas, {id: status atual} das ignoradas); ids fora
+    de ``queryset`` aparecem nas ignoradas com status ``None``.
+    """
+    if target not in TRANSITIONS:
+        raise TransitionError(f'Status {target} inválido')
+    sources, required = TRANSITIONS[target]
+    missing = [name for name in required if not fields.get(name)]
+    if missing:
+        raise MissingTransitionFields(f'Campos obrigatórios: {", ".join(missing)}')
+    now = timezone.now()
+    today = timezone.localdate(now)
+
+    with transaction.atomic():
+        requests = list(
+            queryset.filter(pk__in=ids).order_by('pk').select_for_update(of=('self',)).prefetch_related('equipamentos')
+        )
+        skipped = dict.fromkeys(set(ids) - {request.pk for request in requests})
+        changed = []
+        for request in requests:
+            if request.status not in sources:
+                skipped[request.pk] = request.status
+                continue
+            old_status = request.status
+            request.status = target
+            for name, value in fields.items():
+                setattr(request, name, value)
+            accepted, completed = request.stamp_times(now)
+            request.score_urgency(today)
+            request.data_atualizacao = now
+            changed.append((request, old_status, accepted, completed))
+        if not changed:
+            return [], skipped
+
+        updated = [request for request, *_ in changed]
+        MaintenanceRequest.objects.bulk_update(updated, [
+            'status', 'data_atualizacao', 'hora_aceite', 'hora_inicio', 'hora_termino', 'urgencia', *fields
+        ], batch_size=BATCH_SIZE)
+        RequestHistory.objects.bulk_create([
+            RequestHistory(
+                request=request, usuario=user, acao='STATUS_ALTERADO',
+                descricao=f'Status alterado de {old_status} para {target}'
+            )
+            for request, old_status, _, _ in changed
+        ], batch_size=BATCH_SIZE)
+        if any(name in SEARCH_FIELDS for name in fields):
+            get_search_backend().index_many(updated)
+        MaintenanceRollup.objects.record_many(
+            (request, False, accepted, completed) for request, _, accepted, completed in changed
+        )
+        TechnicianWorkload.objects.record_many(request.workload_move(False) for request in updated)
+        status_changes = [(old_status, target) for _, old_status, _, _ in changed]
+        transaction.on_commit(lambda: dashboard.record_status_changes(status_changes))
+        for request, old_status, _, _ in changed:
+            request._loaded_status = target
+            transaction.on_commit(partial(events.publish_status_change, request, old_status))
+    return updated, skipped
@@ -0,0 +1,105 @@
+"""
+Contador de notificações não lidas por usuário, mantido no cache do Django.
+
+A criação de notificações incrementa o contador dos destinatários e as ações
+de leitura e as exclusões (inclusive em cascata) o decrementam, de modo que
+``get_unread_count`` custa uma consulta ao cache. Avisos ao perfil contam só
+para quem já era usuário quando foram criados, como em
+``Notification.objects.for_user``. Em caso de ausência (ou após
+``COUNTER_TIMEOUT``, que corrige desvios residuais) o valor é recalculado com
+um único COUNT.
+"""
+from bisect import bisect_left
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from .models import Notification, NotificationReceipt, UserProfile
+
+UNREAD_KEY = 'notifications:unread:{}'
+COUNTER_TIMEOUT = 900
+
+
+def _incr(user_id, delta):
+    try:
+        cache.incr(UNREAD_KEY.format(user_id), delta)
+    except ValueError:
+        # Contador ausente: será recalculado na próxima leitura
+        pass
+
+
+def rebuild(user):
+    count = Notification.objects.for_user(user).filter(lida_usuario=False).count()
+    cache.set(UNREAD_KEY.format(user.pk), count, timeout=COUNTER_TIMEOUT)
+    return count
+
+
+def get_unread_count(user):
+    count = cache.get(UNREAD_KEY.format(user.pk))
+    if count is None:
+        return rebuild(user)
+    return max(count, 0)
+
+
+def broadcast_recipients(perfil_destino, data_criacao):
+    """Usuários que recebem um aviso ao perfil criado em ``data_criacao``"""
+    return UserProfile.objects.filter(profile_type=perfil_destino, user__date_joined__lte=data_criacao)
+
+
+def record_created(notification):
+    """Chamado após o commit de uma nova notificação"""
+    if notification.lida:
+        return
+    if notification.usuario_id:
+        _incr(notification.usuario_id, 1)
+        return
+    recipients = broadcast_recipients(notification.perfil_destino, notification.data_criacao)
+    for user_id in recipients.values_list('user_id', flat=True):
+        _incr(user_id, 1)
+
+
+def record_bulk_created(notifications):
+    """Equivalente a ``record_created`` para notificações inseridas com bulk_create"""
+    totals = Counter(item.usuario_id for item in notifications if item.usuario_id and not item.lida)
+    broadcasts = {}
+    for item in notifications:
+        if not item.usuario_id and not item.lida:
+            broadcasts.setdefault(item.perfil_destino, []).append(item.data_criacao)
+    for profile, created in broadcasts.items():
+        created.sort()
+        recipients = broadcast_recipients(profile, created[-1]).values_list('user_id', 'user__date_joined')
+        for user_id, date_joined in recipients:
+            # Avisos criados a partir da entrada do usuário
+            totals[user_id] += len(created) - bisect_left(created, date_joined)
+    for user_id, total in totals.items():
+        _incr(user_id, total)
+
+
+@receiver(pre_delete, sender=Notification)
+def record_deleted(sender, instance, **kwargs):
+    """Antes da exclusão (os recibos ainda existem), agenda o decremento de quem não a leu"""
+    if instance.usuario_id:
+        pending = [] if instance.lida else [instance.usuario_id]
+    else:
+        pending = list(broadcast_recipients(instance.perfil_destino, instance.data_criacao).exclude(
+            user_id__in=NotificationReceipt.objects.filter(notification=instance).values('usuario_id')
+        ).values_list('user_id', flat=True))
+
+    def decrement():
+        for user_id in pending:
+            _incr(user_id, -1)
+
+    if pending:
+        transaction.on_commit(decrement)
+
+
+def record_read(user_id, count=1):
+    if count:
+        _incr(user_id, -count)
+
+
+def reset(user_id, count=0):
+    cache.set(UNREAD_KEY.format(user_id), count, timeout=COUNTER_TIMEOUT)
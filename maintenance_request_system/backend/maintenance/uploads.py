@@ -0,0 +1,129 @@
+"""
+Envio de anexos em partes, retomável, com armazenamento endereçado por conteúdo.
+
+O cliente abre o envio declarando nome, tipo e tamanho e manda o arquivo com
+``PATCH /api/uploads/<id>/`` e o cabeçalho ``Upload-Offset``. Cada parte é
+copiada em blocos para um arquivo temporário e o limite de tamanho é conferido
+durante a leitura. Se a conexão cair, ``GET /api/uploads/<id>/`` informa o
+deslocamento para retomar. Com o último byte, o arquivo é identificado pelo
+SHA-256 e guardado em ``anexos/sha256/<aa>/<hash><ext>``, de modo que o mesmo
+conteúdo anexado a várias requisições é armazenado uma só vez. O novo anexo
+avança ``data_atualizacao`` da requisição, invalidando o ETag do detalhe.
+"""
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AttachmentUpload, MaintenanceRequest, RequestAttachment
+
+READ_BLOCK_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    status_code = 400
+
+
+class UploadOffsetMismatch(UploadError):
+    status_code = 409
+
+
+class UploadTooLarge(UploadError):
+    status_code = 413
+
+
+def temp_path(upload):
+    return os.path.join(settings.ATTACHMENT_UPLOAD_TEMP_DIR, f'{upload.pk}.part')
+
+
+def content_path(digest, nome_original):
+    extension = os.path.splitext(nome_original)[1].lower()[:10]
+    return f'anexos/sha256/{digest[:2]}/{digest}{extension}'
+
+
+def append_chunk(upload, offset, stream, content_length=None):
+    """Grava a parte a partir de ``offset`` e avança ``upload.recebido``"""
+    if offset != upload.recebido:
+        raise UploadOffsetMismatch(f'Deslocamento esperado: {upload.recebido}')
+    remaining = upload.tamanho - offset
+    if content_length is not None and content_length > remaining:
+        raise UploadTooLarge('A parte excede o tamanho declarado do arquivo')
+
+    path = temp_path(upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    written = 0
+    with open(path, 'r+b' if os.path.exists(path) else 'w+b') as part:
+        # Descarta bytes de uma parte anterior que não chegou a ser confirmada
+        part.seek(offset)
+        part.truncate()
+        try:
+            while block := stream.read(READ_BLOCK_SIZE):
+                written += len(block)
+                if written > remaining:
+                    part.truncate(offset)
+                    written = 0
+                    raise UploadTooLarge('O arquivo excede o tamanho declarado')
+                part.write(block)
+        finally:
+            # Uma conexão interrompida ainda confirma o que chegou ao disco
+            if written:
+                part.flush()
+                updated = AttachmentUpload.objects.filter(pk=upload.pk, recebido=offset).update(
+                    recebido=offset + written, data_atualizacao=timezone.now()
+                )
+                if not updated:
+                    upload.refresh_from_db(fields=['recebido'])
+                    raise UploadOffsetMismatch(f'Deslocamento esperado: {upload.recebido}')
+                upload.recebido = offset + written
+    return upload
+
+
+def complete(upload):
+    """Move o arquivo recebido para o armazenamento por conteúdo e cria o anexo"""
+    path = temp_path(upload)
+    digest = hashlib.sha256()
+    with open(path, 'rb') as part:
+        while block := part.read(READ_BLOCK_SIZE):
+            digest.update(block)
+    digest = digest.hexdigest()
+
+    name = content_path(digest, upload.nome_original)
+    if not default_storage.exists(name):
+        with open(path, 'rb') as part:
+            name = default_storage.save(name, File(part))
+
+    # Conteúdo repetido reaproveita a miniatura já gerada
+    thumbnail = RequestAttachment.objects.filter(sha256=digest, miniatura_status='PRONTA').values_list(
+        'miniatura', flat=True
+    ).first()
+    with transaction.atomic():
+        attachment = RequestAttachment.objects.create(
+            request_id=upload.request_id, arquivo=name, nome_original=upload.nome_original,
+            content_type=upload.content_type, tamanho=upload.tamanho, sha256=digest,
+            miniatura=thumbnail or '', miniatura_status='PRONTA' if thumbnail else 'PENDENTE',
+        )
+        upload.delete()
+        MaintenanceRequest.objects.filter(pk=upload.request_id).touch()
+    os.remove(path)
+    return attachment
+
+
+def discard(upload):
+    path = temp_path(upload)
+    upload.delete()
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def purge_stale(before):
+    """Descarta envios sem atividade desde ``before``; retorna quantos foram removidos"""
+    stale = list(AttachmentUpload.objects.filter(data_atualizacao__lt=before))
+    for upload in stale:
+        discard(upload)
+    return len(stale)
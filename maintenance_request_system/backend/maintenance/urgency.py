@@ -0,0 +1,77 @@
+"""
+Pontuação de urgência da fila da manutenção (``/api/requests/queue/``).
+
+``MaintenanceRequest.urgencia`` guarda a pontuação das requisições em aberto
+(nula nas encerradas), com um índice parcial em ``(-urgencia,
+numero_requisicao)``: as primeiras posições da fila são lidas em ordem do
+índice, sem ordenar todas as requisições abertas. A pontuação soma:
+
+- prioridade x 100;
+- situação da máquina (``OPERATIONAL_POINTS``);
+- proximidade do ``prazo_limite`` (``DEADLINE_POINTS``).
+
+Ela é recalculada a cada gravação da requisição; como a proximidade do prazo
+muda com a data, ``refresh_urgency`` (comando ``refresh_urgency``) recalcula
+uma vez por dia só as requisições cujo prazo entrou em alguma faixa desde a
+última execução, marcada em ``SchedulerCheckpoint``.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import MaintenanceRequest, MaintenanceRequestQuerySet, SchedulerCheckpoint
+
+CHECKPOINT_NAME = 'urgencia'
+BATCH_SIZE = 1000
+OPERATIONAL_POINTS = {'INOPERANTE': 300, 'PARCIAL': 100, 'FUNCIONANDO': 0}
+# (dias até o prazo, pontos): vale a primeira faixa que contém os dias restantes
+DEADLINE_POINTS = ((0, 400), (1, 300), (2, 200), (7, 100))
+DEADLINE_DAYS = DEADLINE_POINTS[-1][0]
+FIELDS = ('numero_requisicao', 'status', 'prioridade', 'status_operacional', 'prazo_limite', 'urgencia')
+
+
+def score(status, prioridade, status_operacional, prazo_limite, today):
+    """Pontuação na data ``today``; ``None`` fora dos status da fila"""
+    if status not in MaintenanceRequestQuerySet.QUEUE_STATUSES:
+        return None
+    days = (prazo_limite - today).days
+    deadline = next((points for limit, points in DEADLINE_POINTS if days <= limit), 0)
+    return prioridade * 100 + OPERATIONAL_POINTS.get(status_operacional, 0) + deadline
+
+
+def refresh_urgency(today=None):
+    """Recalcula as pontuações que mudaram de faixa desde a última execução; retorna quantas mudaram"""
+    today = today or timezone.localdate()
+    with transaction.atomic():
+        checkpoint, _ = SchedulerCheckpoint.objects.select_for_update().get_or_create(nome=CHECKPOINT_NAME)
+        # Prazos além da última faixa valem 0 em qualquer data; os vencidos antes
+        # da última execução já estão na faixa máxima
+        requests = MaintenanceRequest.objects.filter(
+            status__in=MaintenanceRequestQuerySet.QUEUE_STATUSES,
+            prazo_limite__lte=today + timedelta(days=DEADLINE_DAYS),
+        )
+        if checkpoint.prazo_ate:
+            requests = requests.filter(prazo_limite__gte=min(checkpoint.prazo_ate, today))
+
+        total = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                requests.filter(pk__gt=last_pk).order_by('pk').select_for_update().only(*FIELDS)[:BATCH_SIZE]
+            )
+            if not batch:
+                break
+            changed = [request for request in batch if request.urgencia != request.score_urgency(today)]
+            # urgencia sai na API: a alteração precisa mudar os ETags
+            now = timezone.now()
+            for request in changed:
+                request.data_atualizacao = now
+            MaintenanceRequest.objects.bulk_update(changed, ['urgencia', 'data_atualizacao'])
+            total += len(changed)
+            last_pk = batch[-1].pk
+
+        # prazo_ate guarda a data de referência da última execução
+        checkpoint.prazo_ate = today
+        checkpoint.save()
+    return total
@@ -5,8 +5,12 @@ from . import views
 router = DefaultRouter()
 router.register(r'profiles', views.UserProfileViewSet, basename='userprofile')
 router.register(r'requests', views.MaintenanceRequestViewSet)
+router.register(r'equipment', views.EquipmentViewSet)
+router.register(r'uploads', views.AttachmentUploadViewSet, basename='upload')
 router.register(r'notifications', views.NotificationViewSet, basename='notification')
 
 urlpatterns = [
+    path('api/events/', views.event_stream, name='event-stream'),
+    path('metrics', views.metrics, name='metrics'),
     path('api/', include(router.urls)),
 ]
@@ -1,17 +1,64 @@
-from rest_framework import viewsets, status, permissions
-from rest_framework.decorators import action
+import asyncio
+import hashlib
+import json
+from datetime import datetime, time, timedelta
+from functools import partial
+from io import BytesIO
+
+from rest_framework import mixins, viewsets, status, permissions
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
-from django.contrib.auth.models import User
-from django.db.models import Q
-from .models import UserProfile, MaintenanceRequest, RequestAttachment, RequestHistory, Notification
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.utils.dateparse import parse_date
+from django.db.models import Count, Max, Q
+from rest_framework.authtoken.models import Token
+from .models import (
+    UserProfile, Equipment, MaintenanceRequest, RequestAttachment, AttachmentUpload, RequestHistory, Notification,
+    NotificationReceipt, MaintenanceRollup
+)
 from .serializers import (
-    UserProfileSerializer, MaintenanceRequestSerializer,
+    UserProfileSerializer, MaintenanceRequestSerializer, MaintenanceRequestListSerializer,
     MaintenanceRequestCreateSerializer, MaintenanceRequestUpdateSerializer,
-    RequestAttachmentSerializer, NotificationSerializer
+    RequestAttachmentSerializer, AttachmentUploadSerializer, NotificationSerializer, MaintenanceRollupSerializer,
+    EquipmentSerializer, EquipmentHistorySerializer, MaintenanceRequestImportSerializer, BulkIdsSerializer,
+    BulkTransitionSerializer, split_query_param
 )
-from .permissions import IsOwnerOrAssignedOrAdmin, IsMaintenanceUser, IsAdminUser
+from .permissions import (
+    IsAdminOrReadOnly, IsOwnerOrAssignedOrAdmin, IsMaintenanceUser, IsAdminUser, IsManagerUser, get_profile_type
+)
+from . import assignment, dashboard, events, export, imports, transitions, unread, uploads
+from .profiling import ProfiledViewMixin, render_metrics
+from .search import get_search_backend
+from .pagination import MaintenanceRequestPagination, NotificationPagination, QueuePagination, RequestHistoryPagination
+
+
+def start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def conditional_response(request, etag, last_modified, render):
+    """Responde 304 se os validadores casarem; senão chama ``render()`` e anexa ETag/Last-Modified"""
+    etag = quote_etag(etag)
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = render()
+    if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+    # O conteúdo depende de quem pergunta
+    patch_vary_headers(response, ['Authorization'])
+    return response
 
-class UserProfileViewSet(viewsets.ModelViewSet):
+
+class UserProfileViewSet(ProfiledViewMixin, viewsets.ModelViewSet):
     serializer_class = UserProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -20,7 +67,7 @@ class UserProfileViewSet(viewsets.ModelViewSet):
         Admins can see all profiles.
         Other users can only see their own profile.
         """
-        if self.request.user.is_staff or (hasattr(self.request.user, 'userprofile') and self.request.user.userprofile.profile_type == 'TI'):
+        if self.request.user.is_staff or get_profile_type(self.request.user) == 'TI':
             return UserProfile.objects.all()
         return UserProfile.objects.filter(user=self.request.user)
 
@@ -35,40 +82,78 @@ class UserProfileViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Perfil não encontrado'}, status=status.HTTP_404_NOT_FOUND)
 
 
-class MaintenanceRequestViewSet(viewsets.ModelViewSet):
+class MaintenanceRequestViewSet(ProfiledViewMixin, viewsets.ModelViewSet):
     queryset = MaintenanceRequest.objects.all()
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrAssignedOrAdmin]
+    pagination_class = MaintenanceRequestPagination
+    max_page_size = 100
+    list_actions = ('list', 'my_requests', 'search', 'queue')
+    transition_actions = (
+        'mark_viewed', 'accept', 'start_maintenance', 'pause_maintenance', 'resume_maintenance',
+        'complete_maintenance', 'cancel'
+    )
+    search_limit = 20
 
     def get_serializer_class(self):
         if self.action == 'create':
             return MaintenanceRequestCreateSerializer
         elif self.action in ['update', 'partial_update']:
             return MaintenanceRequestUpdateSerializer
+        elif self.action in self.list_actions:
+            return MaintenanceRequestListSerializer
         return MaintenanceRequestSerializer
 
+    def get_nested_fields(self):
+        """Listagens só carregam as relações pedidas via ?expand="""
+        if self.action in self.list_actions:
+            return split_query_param(self.request, 'expand')
+        elif self.action == 'export':
+            return ('historico',)
+        elif self.action in self.transition_actions or self.action in ('uploads', 'bulk_import', 'bulk_transition'):
+            return ()
+        return ('anexos', 'historico')
+
     def get_queryset(self):
         """Filtrar requisições baseado no perfil do usuário"""
-        user = self.request.user
-        try:
-            # Check if user has a profile, otherwise default to a safe queryset
-            profile = getattr(user, 'userprofile', None)
-            if not profile:
-                return MaintenanceRequest.objects.filter(solicitante=user)
-
-            if profile.profile_type == 'COMUM':
-                # Usuários comuns só veem suas próprias requisições
-                return MaintenanceRequest.objects.filter(solicitante=user)
-            elif profile.profile_type == 'MANUTENCAO':
-                # Manutenção vê requisições abertas ou atribuídas a eles
-                return MaintenanceRequest.objects.filter(
-                    Q(status__in=['ABERTA', 'VISUALIZADA', 'ACEITA', 'EM_ATENDIMENTO', 'PARADA']) |
-                    Q(responsavel_manutencao=user)
-                )
-            else: # Gestores e TI veem todas
-                return MaintenanceRequest.objects.all()
-        except UserProfile.DoesNotExist:
-            # Fallback for safety, should not happen if profiles are created with users
-            return MaintenanceRequest.objects.filter(solicitante=user)
+        requests = MaintenanceRequest.objects.with_related(
+            self.get_nested_fields()
+        ).visible_to(self.request.user)
+
+        equipamento = self.request.query_params.get('equipamento')
+        if equipamento and equipamento.isdigit():
+            requests = requests.filter(equipamentos=equipamento)
+        return requests
+
+    def list(self, request, *args, **kwargs):
+        """
+        O ETag resume a própria página: os parâmetros da consulta e, para as linhas
+        da janela do cursor, chave e ``data_atualizacao`` (lidas sem relações).
+        """
+        requests = self.filter_queryset(self.get_queryset()).select_related(None).prefetch_related(None).only(
+            'numero_requisicao', 'data_criacao', 'data_atualizacao'
+        )
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(requests, request, view=self)
+        validators = [
+            sorted(request.query_params.lists()), paginator.has_next, paginator.has_previous,
+            [(item.pk, item.data_atualizacao.timestamp()) for item in page],
+        ]
+        digest = hashlib.sha1(json.dumps(validators).encode()).hexdigest()
+        modified = max((item.data_atualizacao for item in page), default=None)
+        etag = f'requests-{request.user.pk}-{digest}'
+        return conditional_response(request, etag, modified, partial(super().list, request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        render = partial(super().retrieve, request, *args, **kwargs)
+        # Consulta enxuta para os validadores; as permissões de objeto valem antes do 304
+        validators = MaintenanceRequest.objects.visible_to(request.user).filter(pk=kwargs['pk']).only(
+            'data_atualizacao', 'solicitante', 'responsavel_manutencao'
+        ).annotate(historico_total=Count('historico')).first()
+        if validators is None:
+            return render()
+        self.check_object_permissions(request, validators)
+        etag = f'request-{validators.pk}-{validators.data_atualizacao.timestamp()}-{validators.historico_total}'
+        return conditional_response(request, etag, validators.data_atualizacao, render)
 
     def perform_create(self, serializer):
         """Criar requisição com o usuário atual como solicitante"""
@@ -82,134 +167,494 @@ class MaintenanceRequestViewSet(viewsets.ModelViewSet):
             descricao='Requisição criada'
         )
 
-        # Notificar equipe de manutenção
-        self.notify_maintenance_team(request)
+        technician = settings.AUTO_ASSIGN_REQUESTS and assignment.auto_assign(request)
+        if technician:
+            self.notify_status_change(request, 'ABERTA')
+            Notification.objects.create(
+                usuario=technician,
+                titulo='Requisição Atribuída',
+                mensagem=f'A requisição #{request.numero_requisicao} foi atribuída a você: {request.titulo_curto}',
+                request=request
+            )
+        else:
+            # Notificar equipe de manutenção
+            self.notify_maintenance_team(request)
 
     def perform_update(self, serializer):
-        """Atualizar requisição e criar histórico"""
-        old_status = self.get_object().status
-        request = serializer.save()
-
-        # Criar histórico se status mudou
-        if old_status != request.status:
-            RequestHistory.objects.create(
-                request=request,
-                usuario=self.request.user,
-                acao='STATUS_ALTERADO',
-                descricao=f'Status alterado de {old_status} para {request.status}'
-            )
+        """Atualizar requisição; mudanças de status seguem o fluxo de ``transitions``"""
+        instance = serializer.instance
+        fields = dict(serializer.validated_data)
+        new_status = fields.pop('status', instance.status)
+        if new_status == instance.status:
+            serializer.save()
+            return
+        old_status = transitions.apply(instance, new_status, self.request.user, **fields)
+        self.notify_status_change(instance, old_status)
 
-            # Notificar baseado no novo status
-            self.notify_status_change(request, old_status)
+    def transition(self, target, success_message, **fields):
+        """Aplica a transição à requisição da URL e notifica os interessados"""
+        maintenance_request = self.get_object()
+        old_status = transitions.apply(maintenance_request, target, self.request.user, **fields)
+        self.notify_status_change(maintenance_request, old_status)
+        return Response({'status': success_message})
+
+    def handle_exception(self, exc):
+        if isinstance(exc, transitions.TransitionError):
+            return Response({'error': str(exc), 'status': exc.current_status}, status=exc.status_code)
+        return super().handle_exception(exc)
 
     def notify_maintenance_team(self, request):
-        """Notificar equipe de manutenção sobre nova requisição"""
-        maintenance_users = User.objects.filter(
-            userprofile__profile_type='MANUTENCAO'
+        """Notificar equipe de manutenção sobre nova requisição (uma linha para todo o perfil)"""
+        Notification.objects.create(
+            perfil_destino='MANUTENCAO',
+            titulo='Nova Requisição de Manutenção',
+            mensagem=f'Nova requisição #{request.numero_requisicao}: {request.titulo_curto}',
+            request=request
         )
 
-        for user in maintenance_users:
-            Notification.objects.create(
-                usuario=user,
-                titulo='Nova Requisição de Manutenção',
-                mensagem=f'Nova requisição #{request.numero_requisicao}: {request.titulo_curto}',
-                request=request
-            )
-
     def notify_status_change(self, request, old_status):
         """Notificar sobre mudanças de status"""
+        notification = self.status_notification(request)
+        if notification:
+            notification.save()
+
+    def status_notification(self, request):
+        """Notificação (não gravada) ao solicitante para o status atual, se houver"""
         if request.status == 'ACEITA':
-            # Notificar solicitante
-            Notification.objects.create(
+            return Notification(
                 usuario=request.solicitante,
                 titulo='Requisição Aceita',
                 mensagem=f'Sua requisição #{request.numero_requisicao} foi aceita',
                 request=request
             )
         elif request.status == 'CONCLUIDA':
-            # Notificar solicitante
-            Notification.objects.create(
+            return Notification(
                 usuario=request.solicitante,
                 titulo='Manutenção Concluída',
                 mensagem=f'A manutenção da requisição #{request.numero_requisicao} foi concluída',
                 request=request
             )
+        return None
+
+    @action(detail=True, methods=['post'], permission_classes=[IsMaintenanceUser])
+    def mark_viewed(self, request, pk=None):
+        """Marcar requisição como visualizada pela manutenção"""
+        return self.transition('VISUALIZADA', 'Requisição visualizada')
 
     @action(detail=True, methods=['post'], permission_classes=[IsMaintenanceUser])
     def accept(self, request, pk=None):
         """Aceitar uma requisição"""
-        maintenance_request = self.get_object()
-        maintenance_request.status = 'ACEITA'
-        maintenance_request.responsavel_manutencao = request.user
-        maintenance_request.save()
-
-        return Response({'status': 'Requisição aceita'})
+        return self.transition('ACEITA', 'Requisição aceita', responsavel_manutencao=request.user)
 
     @action(detail=True, methods=['post'], permission_classes=[IsMaintenanceUser])
     def start_maintenance(self, request, pk=None):
         """Iniciar manutenção"""
-        maintenance_request = self.get_object()
-        maintenance_request.status = 'EM_ATENDIMENTO'
-        maintenance_request.save()
+        return self.transition('EM_ATENDIMENTO', 'Manutenção iniciada')
 
-        return Response({'status': 'Manutenção iniciada'})
+    @action(detail=True, methods=['post'], permission_classes=[IsMaintenanceUser])
+    def pause_maintenance(self, request, pk=None):
+        """Parar manutenção (ex.: aguardando peça)"""
+        return self.transition('PARADA', 'Manutenção parada', motivo_parada=request.data.get('motivo_parada', ''))
+
+    @action(detail=True, methods=['post'], permission_classes=[IsMaintenanceUser])
+    def resume_maintenance(self, request, pk=None):
+        """Retomar manutenção parada"""
+        return self.transition('EM_ATENDIMENTO', 'Manutenção retomada')
 
     @action(detail=True, methods=['post'], permission_classes=[IsMaintenanceUser])
     def complete_maintenance(self, request, pk=None):
         """Concluir manutenção"""
+        return self.transition(
+            'CONCLUIDA', 'Manutenção concluída',
+            descricao_manutencao=request.data.get('descricao_manutencao', ''),
+            materiais_utilizados=request.data.get('materiais_utilizados', ''),
+        )
+
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        """Cancelar requisição"""
+        return self.transition(
+            'CANCELADA', 'Requisição cancelada', motivo_cancelamento=request.data.get('motivo_cancelamento', '')
+        )
+
+    @action(detail=True, methods=['post'])
+    def uploads(self, request, pk=None):
+        """Inicia o envio em partes de um anexo (foto ou vídeo)"""
         maintenance_request = self.get_object()
-        maintenance_request.status = 'CONCLUIDA'
-        maintenance_request.descricao_manutencao = request.data.get('descricao_manutencao', '')
-        maintenance_request.materiais_utilizados = request.data.get('materiais_utilizados', '')
-        maintenance_request.save()
+        serializer = AttachmentUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.save(request=maintenance_request, usuario=request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers={
+            'Location': f'/api/uploads/{upload.pk}/', 'Upload-Offset': '0'
+        })
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
+    def bulk_import(self, request):
+        """Importa várias requisições: lista JSON ou CSV (campo ``arquivo``) no formato da exportação"""
+        rows = list(imports.read_csv(request.FILES['arquivo'])) if 'arquivo' in request.FILES else request.data
+        serializer = MaintenanceRequestImportSerializer(
+            data=rows, many=True, max_length=imports.MAX_ROWS, context=self.get_serializer_context()
+        )
+        serializer.is_valid(raise_exception=True)
+        created = serializer.save()
+        return Response(
+            {'importadas': len(created), 'numeros_requisicao': [item.pk for item in created]},
+            status=status.HTTP_201_CREATED
+        )
+
+    @action(detail=False, methods=['post'], permission_classes=[IsMaintenanceUser])
+    def bulk_transition(self, request):
+        """Aplica a mesma mudança de status a várias requisições; as que não podem mudar são ignoradas"""
+        serializer = BulkTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        fields = dict(serializer.validated_data)
+        ids = fields.pop('ids')
+        target = fields.pop('status')
+        if target == 'ACEITA':
+            fields['responsavel_manutencao'] = request.user
+        with transaction.atomic():
+            updated, skipped = transitions.apply_many(
+                MaintenanceRequest.objects.visible_to(request.user).select_related('solicitante'),
+                ids, target, request.user, **fields
+            )
+            notifications = Notification.objects.bulk_create(
+                [notification for notification in map(self.status_notification, updated) if notification]
+            )
+            transaction.on_commit(lambda: unread.record_bulk_created(notifications))
+            for notification in notifications:
+                transaction.on_commit(partial(events.publish_notification, notification))
+        return Response({'alteradas': [item.pk for item in updated], 'ignoradas': skipped})
 
-        return Response({'status': 'Manutenção concluída'})
+    @action(detail=False, methods=['get'], permission_classes=[IsMaintenanceUser], pagination_class=QueuePagination)
+    def queue(self, request):
+        """Requisições em aberto da mais à menos urgente (índice parcial em urgencia)"""
+        requests = MaintenanceRequest.objects.with_related(
+            self.get_nested_fields()
+        ).filter(urgencia__isnull=False)
+        page = self.paginate_queryset(requests)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     @action(detail=False, methods=['get'])
     def my_requests(self, request):
         """Retorna as requisições do usuário atual"""
-        requests = MaintenanceRequest.objects.filter(solicitante=request.user)
-        serializer = self.get_serializer(requests, many=True)
-        return Response(serializer.data)
+        requests = MaintenanceRequest.objects.with_related(
+            self.get_nested_fields()
+        ).filter(solicitante=request.user)
+        page = self.paginate_queryset(requests)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Busca ranqueada por prefixo (?q=) em título, descrições e materiais"""
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', self.search_limit)), self.max_page_size))
+        except ValueError:
+            limit = self.search_limit
+        requests = self.get_queryset()
+        ids = get_search_backend().search(requests, request.query_params.get('q', ''), limit=limit)
+        found = {req.pk: req for req in requests.filter(pk__in=ids)}
+        serializer = self.get_serializer([found[pk] for pk in ids if pk in found], many=True)
+        return Response({'results': serializer.data})
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Exporta as requisições visíveis em CSV (padrão) ou XLSX (?formato=xlsx), em streaming.
+
+        Filtros opcionais: ?status=ABERTA,CONCLUIDA, ?data_inicio=AAAA-MM-DD e ?data_fim=AAAA-MM-DD
+        (data de criação, inclusive).
+        """
+        formato = request.query_params.get('formato', 'csv')
+        if formato not in ('csv', 'xlsx'):
+            return Response({'error': 'Formato inválido'}, status=status.HTTP_400_BAD_REQUEST)
+
+        requests = self.get_queryset().order_by('data_criacao', 'numero_requisicao')
+        statuses = split_query_param(request, 'status')
+        if statuses:
+            requests = requests.filter(status__in=statuses)
+        try:
+            data_inicio = parse_date(request.query_params.get('data_inicio', ''))
+            data_fim = parse_date(request.query_params.get('data_fim', ''))
+        except ValueError:
+            return Response({'error': 'Data inválida'}, status=status.HTTP_400_BAD_REQUEST)
+        # Intervalos em datetime para aproveitar o índice de data_criacao
+        if data_inicio:
+            requests = requests.filter(data_criacao__gte=start_of_day(data_inicio))
+        if data_fim:
+            requests = requests.filter(data_criacao__lt=start_of_day(data_fim + timedelta(days=1)))
+
+        rows = export.export_rows(requests)
+        if formato == 'xlsx':
+            content = export.stream_xlsx(rows)
+            content_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        else:
+            content = export.stream_csv(rows)
+            content_type = 'text/csv; charset=utf-8'
+        # Cada servidor só transmite sem acumular o iterador do seu próprio tipo
+        if isinstance(request._request, ASGIRequest):
+            content = export.aiterate(content)
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="requisicoes.{formato}"'
+        return response
 
     @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
     def dashboard_data(self, request):
-        """Retorna dados para o dashboard"""
+        """Retorna dados para o dashboard a partir dos contadores em cache"""
         # A lógica original foi movida para um endpoint mais seguro e específico para admin/TI.
         # A lógica de dashboard para usuários comuns pode ser exposta em outro endpoint se necessário.
-        total_requests = MaintenanceRequest.objects.count()
-        open_requests = MaintenanceRequest.objects.filter(
-            status__in=['ABERTA', 'VISUALIZADA', 'ACEITA', 'EM_ATENDIMENTO']
-        ).count()
-        completed_requests = MaintenanceRequest.objects.filter(status='CONCLUIDA').count()
-
-        return Response({
-            'total_requests': total_requests,
-            'open_requests': open_requests,
-            'completed_requests': completed_requests,
-            'recent_requests': MaintenanceRequestSerializer(
-                MaintenanceRequest.objects.all().order_by('-data_criacao')[:5], many=True
-            ).data
-        })
+        version, payload = dashboard.get_dashboard()
+        return conditional_response(request, f'dashboard-{version}', None, partial(Response, payload))
+
+    @action(detail=False, methods=['get'], permission_classes=[IsManagerUser])
+    def analytics(self, request):
+        """
+        Tempos médios de resposta e de reparo (em segundos) lidos das tabelas pré-agregadas.
+
+        ``?dimensao=TIPO`` (ou GERAL, SETOR, EQUIPAMENTO, EQUIPAMENTO_TIPO) restringe a uma dimensão.
+        """
+        rollups = MaintenanceRollup.objects.all()
+        dimensao = request.query_params.get('dimensao')
+        if dimensao:
+            if dimensao not in dict(MaintenanceRollup.DIMENSION_CHOICES):
+                return Response({'error': 'Dimensão inválida'}, status=status.HTTP_400_BAD_REQUEST)
+            rollups = rollups.filter(dimensao=dimensao)
+
+        data = {}
+        for row in MaintenanceRollupSerializer(rollups, many=True).data:
+            data.setdefault(row['dimensao'], []).append(row)
+        return Response(data)
+
+
+class EquipmentViewSet(ProfiledViewMixin, viewsets.ModelViewSet):
+    queryset = Equipment.objects.all()
+    serializer_class = EquipmentSerializer
+    permission_classes = [permissions.IsAuthenticated, IsAdminOrReadOnly]
+
+    @action(detail=True, methods=['get'])
+    def requests(self, request, pk=None):
+        """Requisições que envolvem este equipamento (via índice da tabela de ligação)"""
+        equipment = self.get_object()
+        requests = MaintenanceRequest.objects.with_related(nested=()).visible_to(
+            request.user
+        ).filter(equipamentos=equipment)
+        paginator = MaintenanceRequestPagination()
+        page = paginator.paginate_queryset(requests, request, view=self)
+        serializer = MaintenanceRequestListSerializer(page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def history(self, request, pk=None):
+        """
+        Histórico de todas as requisições deste equipamento.
+
+        Só lista o que está no banco; ``arquivado`` indica que parte do histórico foi
+        arquivada e está no detalhe de cada requisição.
+        """
+        equipment = self.get_object()
+        visible = MaintenanceRequest.objects.visible_to(request.user).filter(equipamentos=equipment)
+        history = RequestHistory.objects.filter(request__in=visible.values('pk')).select_related('usuario', 'request')
+        paginator = RequestHistoryPagination()
+        page = paginator.paginate_queryset(history, request, view=self)
+        serializer = EquipmentHistorySerializer(page, many=True)
+        response = paginator.get_paginated_response(serializer.data)
+        response.data['arquivado'] = visible.exclude(arquivo_historico='').exists()
+        return response
+
+
+class AttachmentUploadViewSet(
+    ProfiledViewMixin, mixins.RetrieveModelMixin, mixins.DestroyModelMixin, viewsets.GenericViewSet
+):
+    """Envios em andamento do usuário: GET informa o deslocamento, PATCH envia a próxima parte"""
+    serializer_class = AttachmentUploadSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return AttachmentUpload.objects.filter(usuario=self.request.user)
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        response['Upload-Offset'] = response.data['recebido']
+        response['Cache-Control'] = 'no-store'
+        return response
+
+    def partial_update(self, request, pk=None):
+        """Recebe o corpo bruto da requisição a partir do cabeçalho Upload-Offset"""
+        upload = self.get_object()
+        offset = request.headers.get('Upload-Offset', '')
+        if not offset.isdigit():
+            return Response({'error': 'Cabeçalho Upload-Offset ausente ou inválido'}, status=status.HTTP_400_BAD_REQUEST)
+        content_length = request.META.get('CONTENT_LENGTH')
+        content_length = int(content_length) if content_length and content_length.isdigit() else None
+        try:
+            uploads.append_chunk(upload, int(offset), request.stream or BytesIO(), content_length)
+        except uploads.UploadError as exc:
+            return Response(
+                {'error': str(exc), 'recebido': upload.recebido}, status=exc.status_code,
+                headers={'Upload-Offset': str(upload.recebido)}
+            )
 
+        if upload.recebido < upload.tamanho:
+            return Response(self.get_serializer(upload).data, headers={'Upload-Offset': str(upload.recebido)})
+        attachment = uploads.complete(upload)
+        return Response(
+            RequestAttachmentSerializer(attachment, context=self.get_serializer_context()).data,
+            status=status.HTTP_201_CREATED
+        )
+
+    def perform_destroy(self, instance):
+        uploads.discard(instance)
+
+
+class NotificationViewSet(ProfiledViewMixin, mixins.DestroyModelMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Notificações do usuário: leitura, ações de marcar como lida e exclusão.
 
-class NotificationViewSet(viewsets.ModelViewSet):
+    Avisos por perfil são compartilhados pela equipe; o estado de leitura de
+    cada usuário fica em ``NotificationReceipt`` e só as notificações diretas
+    do próprio usuário podem ser excluídas.
+    """
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NotificationPagination
+    max_page_size = 200
 
     def get_queryset(self):
-        return Notification.objects.filter(usuario=self.request.user)
+        if self.action == 'destroy':
+            return Notification.objects.filter(usuario=self.request.user)
+        return Notification.objects.for_user(self.request.user).select_related('usuario', 'request')
+
+    def get_etag(self, notifications):
+        """
+        Total, última notificação, não lidas e última alteração das requisições
+        ligadas (o status delas aparece na resposta)
+        """
+        summary = notifications.aggregate(
+            total=Count('pk'), last=Max('pk'), unread=Count('pk', filter=Q(lida_usuario=False)),
+            request_modified=Max('request__data_atualizacao'),
+        )
+        if not summary['total']:
+            return None
+        modified = summary['request_modified']
+        return (
+            f"notifications-{self.request.user.pk}-{summary['total']}-{summary['last']}-{summary['unread']}-"
+            f"{modified.timestamp() if modified else 0}"
+        )
+
+    def list(self, request, *args, **kwargs):
+        render = partial(super().list, request, *args, **kwargs)
+        etag = self.get_etag(self.filter_queryset(self.get_queryset()))
+        return conditional_response(request, etag, None, render) if etag else render()
+
+    def retrieve(self, request, *args, **kwargs):
+        render = partial(super().retrieve, request, *args, **kwargs)
+        etag = self.get_etag(self.get_queryset().filter(pk=kwargs['pk']))
+        return conditional_response(request, etag, None, render) if etag else render()
 
     @action(detail=True, methods=['post'])
     def mark_as_read(self, request, pk=None):
         """Marcar notificação como lida"""
         notification = self.get_object()
-        notification.lida = True
-        notification.save()
+        if notification.is_broadcast:
+            _, marked = NotificationReceipt.objects.get_or_create(notification=notification, usuario=request.user)
+        else:
+            marked = Notification.objects.filter(pk=notification.pk, lida=False).update(lida=True)
+        if marked:
+            transaction.on_commit(lambda: unread.record_read(request.user.pk))
         return Response({'status': 'Notificação marcada como lida'})
 
     @action(detail=False, methods=['post'])
     def mark_all_as_read(self, request):
         """Marcar todas as notificações como lidas"""
-        Notification.objects.filter(usuario=request.user, lida=False).update(lida=True)
+        with transaction.atomic():
+            Notification.objects.filter(usuario=request.user, lida=False).update(lida=True)
+            unread_broadcasts = self.get_queryset().filter(usuario__isnull=True, lida_usuario=False)
+            NotificationReceipt.objects.bulk_create(
+                [NotificationReceipt(notification_id=pk, usuario=request.user)
+                 for pk in unread_broadcasts.values_list('pk', flat=True)],
+                ignore_conflicts=True
+            )
+            transaction.on_commit(lambda: unread.reset(request.user.pk))
         return Response({'status': 'Todas as notificações marcadas como lidas'})
+
+    @action(detail=False, methods=['post'])
+    def bulk_mark_as_read(self, request):
+        """Marcar como lidas as notificações com os ids informados"""
+        serializer = BulkIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        unread_items = self.get_queryset().filter(
+            pk__in=serializer.validated_data['ids'], lida_usuario=False
+        ).values_list('pk', 'usuario_id')
+        direct = []
+        broadcasts = []
+        for pk, usuario_id in unread_items:
+            (direct if usuario_id else broadcasts).append(pk)
+        with transaction.atomic():
+            marked = Notification.objects.filter(pk__in=direct, lida=False).update(lida=True)
+            marked += len(NotificationReceipt.objects.bulk_create(
+                [NotificationReceipt(notification_id=pk, usuario=request.user) for pk in broadcasts],
+                ignore_conflicts=True
+            ))
+            transaction.on_commit(lambda: unread.record_read(request.user.pk, marked))
+        return Response({'status': 'Notificações marcadas como lidas', 'marcadas': marked})
+
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        """Quantidade de notificações não lidas, servida do cache"""
+        return Response({'unread_count': unread.get_unread_count(request.user)})
+
+
+EVENT_KEEPALIVE_SECONDS = 25
+
+
+async def authenticate_event_stream(request):
+    """Token pelo cabeçalho Authorization ou por ?token= (o EventSource não envia cabeçalhos)"""
+    header = request.headers.get('Authorization', '')
+    key = header[len('Token '):] if header.startswith('Token ') else request.GET.get('token')
+    if not key:
+        return None, None
+    try:
+        token = await Token.objects.select_related('user').aget(key=key)
+    except Token.DoesNotExist:
+        return None, None
+    if not token.user.is_active:
+        return None, None
+    profile_type = await UserProfile.objects.filter(user_id=token.user_id).values_list(
+        'profile_type', flat=True
+    ).afirst()
+    return token.user, profile_type
+
+
+async def event_stream(request):
+    """Server-Sent Events com notificações e mudanças de status do usuário"""
+    user, profile_type = await authenticate_event_stream(request)
+    if user is None:
+        return JsonResponse({'detail': 'Credenciais de autenticação inválidas.'}, status=401)
+
+    subscription = events.get_broker().subscribe(events.user_channels(user, profile_type))
+
+    async def stream():
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    event = await subscription.get(timeout=EVENT_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def metrics(request):
+    """Histogramas de latência e consultas por view, no formato texto do Prometheus"""
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
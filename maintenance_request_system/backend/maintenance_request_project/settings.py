@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+from corsheaders.defaults import default_headers
 from dotenv import load_dotenv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -49,6 +50,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primeiro da lista para que o tempo total inclua os demais middlewares
+    'maintenance.profiling.ProfilingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -82,14 +85,86 @@ WSGI_APPLICATION = 'maintenance_request_project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE=sqlite (padrão) ou postgresql. No SQLite, os PRAGMAs de
+# SQLITE_PRAGMAS são aplicados a cada nova conexão (maintenance/db.py), exceto
+# journal_mode no banco de demonstração versionado (SQLITE_DEMO_DATABASE).
+
+if os.getenv('DB_ENGINE', 'sqlite') == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('DB_NAME', 'maintenance_db'),
+            'USER': os.getenv('DB_USER', 'maintenance_user'),
+            'PASSWORD': os.getenv('DB_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', 'localhost'),
+            'PORT': os.getenv('DB_PORT', '5432'),
+            # Conexões persistentes, verificadas antes de cada requisição
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+        }
     }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '0')),
+            'OPTIONS': {
+                # Segundos aguardando o lock de escrita antes de "database is locked"
+                'timeout': 20,
+            },
+        }
+    }
+
+SQLITE_DEMO_DATABASE = BASE_DIR / 'db.sqlite3'
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',  # leitores não bloqueiam o escritor
+    'synchronous': 'NORMAL',  # seguro com WAL; fsync só nos checkpoints
+    'busy_timeout': 20000,
+    'cache_size': -20000,  # ~20 MB por conexão
+    'temp_store': 'MEMORY',
+    'mmap_size': 128 * 1024 * 1024,
 }
 
 
+# Cache
+# Contadores do dashboard e demais dados em cache. Em produção com vários
+# processos, defina REDIS_URL para compartilhar o cache entre eles.
+
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'maintenance',
+        }
+    }
+
+# Segundos que um token resolvido (usuário e perfil) fica no cache
+AUTH_CACHE_TIMEOUT = int(os.getenv('AUTH_CACHE_TIMEOUT', '300'))
+
+# Requisições novas vão direto para o técnico menos ocupado (maintenance/assignment.py)
+AUTO_ASSIGN_REQUESTS = os.getenv('AUTO_ASSIGN_REQUESTS', 'False') == 'True'
+
+# Dias antes do prazo_limite em que o aviso de "Prazo Final Próximo" é enviado
+DEADLINE_WARNING_DAYS = int(os.getenv('DEADLINE_WARNING_DAYS', '2'))
+
+# Retenção (comando archive_records): notificações lidas e histórico de
+# requisições encerradas saem do banco para arquivos .jsonl.gz em ARCHIVE_DIR
+NOTIFICATION_RETENTION_DAYS = int(os.getenv('NOTIFICATION_RETENTION_DAYS', '90'))
+HISTORY_RETENTION_MONTHS = int(os.getenv('HISTORY_RETENTION_MONTHS', '12'))
+ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', os.path.join(BASE_DIR, 'arquivo'))
+
+# Consultas mais lentas que isto (ms) vão para o log maintenance.profiling com o nome da view
+SLOW_QUERY_THRESHOLD_MS = int(os.getenv('SLOW_QUERY_THRESHOLD_MS', '200'))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -135,7 +210,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication', # Changed to TokenAuthentication
+        'maintenance.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -148,7 +223,16 @@ CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1:3000",
 ]
 CORS_ALLOW_CREDENTIALS = True
+# Cabeçalho do envio de anexos em partes (/api/uploads/)
+CORS_ALLOW_HEADERS = (*default_headers, 'upload-offset')
+CORS_EXPOSE_HEADERS = ['Upload-Offset', 'Server-Timing']
 
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Anexos: fotos e vídeos curtos, enviados em partes para um diretório
+# temporário e movidos para anexos/sha256/ ao final
+ATTACHMENT_MAX_SIZE = int(os.getenv('ATTACHMENT_MAX_SIZE', str(100 * 1024 * 1024)))
+ATTACHMENT_CONTENT_TYPES = ('image/', 'video/')
+ATTACHMENT_UPLOAD_TEMP_DIR = os.getenv('ATTACHMENT_UPLOAD_TEMP_DIR', os.path.join(BASE_DIR, 'uploads_parciais'))
@@ -43,16 +43,70 @@ export const requestsAPI = {
   update: (id, data) => api.patch(`/requests/${id}/`, data),
   delete: (id) => api.delete(`/requests/${id}/`),
   getMyRequests: () => api.get('/requests/my_requests/'),
+  // Requisições em aberto ordenadas por urgência (Manutenção e T.I)
+  getQueue: (params) => api.get('/requests/queue/', { params }),
   getDashboardData: () => api.get('/requests/dashboard_data/'),
+  markViewed: (id) => api.post(`/requests/${id}/mark_viewed/`),
   accept: (id) => api.post(`/requests/${id}/accept/`),
   startMaintenance: (id) => api.post(`/requests/${id}/start_maintenance/`),
+  pauseMaintenance: (id, data) => api.post(`/requests/${id}/pause_maintenance/`, data),
+  resumeMaintenance: (id) => api.post(`/requests/${id}/resume_maintenance/`),
   completeMaintenance: (id, data) => api.post(`/requests/${id}/complete_maintenance/`, data),
+  cancel: (id, data) => api.post(`/requests/${id}/cancel/`, data),
+  // Lote: { ids, status, motivo_parada?, motivo_cancelamento?, ... }
+  bulkTransition: (data) => api.post('/requests/bulk_transition/', data),
+  // Lista de linhas (JSON) ou arquivo CSV no formato da exportação (apenas T.I)
+  bulkImport: (rowsOrFile) => {
+    if (rowsOrFile instanceof File) {
+      const form = new FormData()
+      form.append('arquivo', rowsOrFile)
+      return api.post('/requests/bulk_import/', form, { headers: { 'Content-Type': 'multipart/form-data' } })
+    }
+    return api.post('/requests/bulk_import/', rowsOrFile)
+  },
+}
+
+const UPLOAD_CHUNK_SIZE = 2 * 1024 * 1024
+
+export const attachmentsAPI = {
+  // Envia o arquivo em partes; passe uploadId para retomar um envio interrompido
+  upload: async (requestId, file, { uploadId, onProgress } = {}) => {
+    let offset = 0
+    if (uploadId) {
+      offset = (await api.get(`/uploads/${uploadId}/`)).data.recebido
+    } else {
+      const { data } = await api.post(`/requests/${requestId}/uploads/`, {
+        nome_original: file.name, content_type: file.type, tamanho: file.size,
+      })
+      uploadId = data.id
+    }
+    let response
+    while (offset < file.size) {
+      response = await api.patch(`/uploads/${uploadId}/`, file.slice(offset, offset + UPLOAD_CHUNK_SIZE), {
+        headers: { 'Content-Type': 'application/offset+octet-stream', 'Upload-Offset': offset },
+      })
+      offset = response.status === 201 ? file.size : response.data.recebido
+      onProgress?.(offset / file.size, uploadId)
+    }
+    return response.data
+  },
 }
 
 export const notificationsAPI = {
   getAll: () => api.get('/notifications/'),
   markAsRead: (id) => api.post(`/notifications/${id}/mark_as_read/`),
   markAllAsRead: () => api.post('/notifications/mark_all_as_read/'),
+  bulkMarkAsRead: (ids) => api.post('/notifications/bulk_mark_as_read/', { ids }),
+  getUnreadCount: () => api.get('/notifications/unread_count/'),
+  // EventSource não envia cabeçalhos, então o token vai na query string
+  subscribe: (handlers) => {
+    const user = JSON.parse(localStorage.getItem('user') || '{}')
+    const source = new EventSource(`${API_BASE_URL}/events/?token=${encodeURIComponent(user.token || '')}`)
+    Object.entries(handlers).forEach(([type, handler]) => {
+      source.addEventListener(type, (event) => handler(JSON.parse(event.data)))
+    })
+    return () => source.close()
+  },
 }
 
 export default api